@@ -1,26 +1,137 @@
 # alpha_vantage_api.py
+import numpy as np
+import pandas as pd
 import requests
 from alpha_vantage_test.config_av import API_KEY, BASE_URL
+from fetch_scheduler import get_scheduler, RateLimitError
 
-def get_intraday(symbol: str, interval: str = "60min", output_size: str = "compact"):
+
+# Eine Session für alle Anfragen: Verbindungen bleiben offen (Keep-Alive), kein neuer TCP/TLS-Handshake je Abruf
+_session = requests.Session()
+
+
+def check_status(status, headers):
+    """Wirft RateLimitError bei HTTP 429, sonst eine Exception bei Status != 200"""
+    if status == 429:
+        retry_after = headers.get("Retry-After", "")
+        raise RateLimitError("Alpha Vantage: HTTP 429", retry_after=float(retry_after) if retry_after.isdigit() else None)
+    if status != 200:
+        raise Exception(f"API-Anfrage fehlgeschlagen: {status}")
+
+
+# Formulierungen der Drosselungsmeldungen ("... API call frequency is 5 calls per minute ...",
+# "... standard API rate limit is 25 requests per day ...")
+RATE_LIMIT_MARKERS = ("call frequency", "rate limit", "calls per", "requests per")
+
+
+def check_payload(data):
+    # Alpha Vantage drosselt mit Status 200 und einer "Note"- bzw. "Information"-Meldung statt Daten.
+    # "Information" meldet aber auch ungültige API-Keys oder Premium-Endpunkte; die nicht wiederholen.
+    message = data.get("Note") or data.get("Information")
+    if message is None:
+        return data
+    if any(marker in message.lower() for marker in RATE_LIMIT_MARKERS):
+        raise RateLimitError(f"Alpha Vantage: {message}")
+    raise Exception(f"Alpha Vantage: {message}")
+
+
+def _request(params):
+    response = _session.get(BASE_URL, params=params, timeout=30)
+    check_status(response.status_code, response.headers)
+    return check_payload(response.json())
+
+
+INTRADAY_FIELDS = {"1. open": "Open", "2. high": "High", "3. low": "Low", "4. close": "Close", "5. volume": "Volume"}
+
+
+def intraday_params(symbol, interval="60min", output_size="compact", month=None, api_key=API_KEY):
     params = {
         "function": "TIME_SERIES_INTRADAY",
         "symbol": symbol,
         "interval": interval,
         "outputsize": output_size,
-        "apikey": API_KEY
+        "apikey": api_key
     }
+    # Historischer Monat im Format YYYY-MM (mit outputsize=full der ganze Monat)
+    if month:
+        params["month"] = month
+    return params
+
 
-    response = requests.get(BASE_URL, params=params)
-    if response.status_code != 200:
-        raise Exception(f"API-Anfrage fehlgeschlagen: {response.status_code}")
+# outputsize=compact liefert die letzten 100 Bars, full ohne month die letzten 30 Tage
+COMPACT_BARS = 100
+FULL_DAYS = 30
 
-    data = response.json()
 
+def _utc(ts):
+    ts = pd.Timestamp(ts)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+
+def intraday_requests(latest, interval="60min", now=None):
+    """
+    Welche Abrufe (output_size, month) nötig sind, um die Bars seit latest (jüngster gespeicherter
+    Zeitstempel oder None) lückenlos zu laden: compact, solange die Lücke sicher in 100 Bars passt,
+    sonst full (letzte 30 Tage) und bei längeren Lücken je Monat seit latest ein full-Abruf mit month.
+    """
+    if latest is None:
+        return [("full", None)]
+    latest = _utc(latest)
+    now = pd.Timestamp.now(tz="UTC") if now is None else _utc(now)
+    gap = now - latest
+    # 100 Bars decken mindestens 100 Intervalle ab (Nächte und Wochenenden haben keine Bars)
+    if gap <= pd.Timedelta(minutes=COMPACT_BARS * int(interval.removesuffix("min"))):
+        return [("compact", None)]
+    if gap < pd.Timedelta(days=FULL_DAYS):
+        return [("full", None)]
+    months = pd.period_range(latest.tz_localize(None).to_period("M"), now.tz_localize(None).to_period("M"), freq="M")
+    return [("full", str(month)) for month in months]
+
+
+def combine_intraday(frames):
+    """Fügt die geparsten Antworten mehrerer Abrufe zusammen (doppelte Zeitstempel: der jüngste Abruf gilt)"""
+    if len(frames) == 1:
+        return frames[0]
+    df = pd.concat(frames)
+    return df[~df.index.duplicated(keep="last")].sort_index()
+
+
+def check_time_series(data):
     # DEBUG-Ausgabe bei Problemen
     if not any("Time Series" in key for key in data.keys()):
         print("⚠️ Debug-Ausgabe der API-Antwort:")
         print(data)
-        raise Exception(f"Fehler in der Antwort: {data.get('Note') or data.get('Error Message') or 'Unbekannter Fehler'}")
-
+        raise Exception(f"Fehler in der Antwort: {data.get('Error Message') or 'Unbekannter Fehler'}")
     return data
+
+
+def get_intraday(symbol: str, interval: str = "60min", output_size: str = "compact", month: str = None):
+    # Über den gemeinsamen Scheduler: Rate-Limit, Wiederholung mit Backoff bei Drosselung
+    data = get_scheduler().call("alphavantage", _request, intraday_params(symbol, interval, output_size, month))
+    return check_time_series(data)
+
+
+def parse_intraday(data):
+    """
+    Wandelt die TIME_SERIES_INTRADAY-Antwort in einen DataFrame mit Spalten Open/High/Low/Close/Volume
+    und einem aufsteigenden DatetimeIndex in UTC um. Werte und Zeitstempel werden direkt aus den
+    Schlüsseln und Werten der Antwort spaltenweise geparst (ein Array je Feld), ohne Zwischen-DataFrame.
+    """
+    key = next(k for k in data if "Time Series" in k)
+    series = data[key]
+    tz = data.get("Meta Data", {}).get("6. Time Zone", "US/Eastern")
+    if not series:
+        return pd.DataFrame(columns=list(INTRADAY_FIELDS.values()),
+                            index=pd.DatetimeIndex([], tz="UTC"))
+
+    bars = list(series.values())
+    columns = {name: np.array([bar[field] for bar in bars], dtype="float64")
+               for field, name in INTRADAY_FIELDS.items()}
+    index = pd.to_datetime(list(series), format="%Y-%m-%d %H:%M:%S")
+    # Zeitstempel sind Ortszeit der Börse; Sommerzeit-Lücken/-Doppelungen nicht raten, sondern verwerfen
+    index = index.tz_localize(tz, ambiguous="NaT", nonexistent="NaT").tz_convert("UTC")
+
+    df = pd.DataFrame(columns, index=index)
+    df = df[df.index.notna()]
+    df.index.name = "ts"
+    return df.sort_index()
@@ -0,0 +1,61 @@
+# alpha_vantage_async.py
+# Asynchroner Alpha-Vantage-Provider: eine gemeinsame aiohttp-Session mit Verbindungs-Pool
+# (Keep-Alive, Begrenzung je Host) für beliebig viele gleichzeitige Abrufe.
+import json
+
+import aiohttp
+
+from alpha_vantage_test.alpha_vantage_api import (
+    check_status, check_payload, check_time_series, intraday_params, parse_intraday
+)
+from alpha_vantage_test.config_av import API_KEY, BASE_URL
+from data_provider import DataProvider, DEFAULT_TIMEOUT
+from instrumentation import count
+
+
+class AlphaVantageProvider(DataProvider):
+    """
+    Intraday-Kurse von Alpha Vantage über eine gemeinsame aiohttp-Session.
+
+    base_url lässt sich für Tests auf einen lokalen Stub-Server umstellen. Die Session hält
+    höchstens limit_per_host offene Verbindungen je Host und verwendet sie wieder; sie wird beim
+    ersten Abruf angelegt (in der laufenden Event-Loop) und mit close() geschlossen.
+    """
+
+    name = "alphavantage"
+
+    def __init__(self, base_url=BASE_URL, api_key=API_KEY, concurrency=10, limit_per_host=10,
+                 timeout=DEFAULT_TIMEOUT, **kwargs):
+        super().__init__(concurrency=concurrency, timeout=timeout, **kwargs)
+        self.base_url = base_url
+        self.api_key = api_key
+        self.limit_per_host = limit_per_host
+        self._session = None
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.limit_per_host,
+                                             ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector,
+                                                  timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self._session
+
+    async def _request(self, params):
+        async with self._get_session().get(self.base_url, params=params) as response:
+            # Antwort immer vollständig lesen, sonst wird die Verbindung (z.B. nach HTTP 429) geschlossen
+            # statt in den Pool zurückzugehen
+            body = await response.read()
+        count("bytes_received.alphavantage", len(body))
+        check_status(response.status, response.headers)
+        # Alpha Vantage liefert JSON teils mit falschem Content-Type, daher selbst dekodieren
+        return check_payload(json.loads(body))
+
+    async def intraday(self, symbol, interval="60min", output_size="compact", month=None):
+        params = intraday_params(symbol, interval, output_size, month, api_key=self.api_key)
+        data = await self._call(self._request, params)
+        return parse_intraday(check_time_series(data))
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
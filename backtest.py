@@ -0,0 +1,160 @@
+# backtest.py
+# Vektorisiertes Backtesting regelbasierter Strategien auf der Kursmatrix (Symbole x Tage).
+# Positionen, Renditen, Equity-Kurven und Drawdowns sind Array-Operationen über alle Symbole,
+# Parameter-Sweeps laufen optional parallel in einem Prozess-Pool.
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from db.queries import load_closes
+from indicators import sma, rsi, to_matrix, _as_2d
+
+TRADING_DAYS = 252
+# Transaktionskosten je Positionswechsel als Anteil des Kurses (0.1 %)
+DEFAULT_COST = 0.001
+
+
+def ma_crossover_positions(close, fast, slow, sma_cache=None):
+    """Long (1), solange der schnelle über dem langsamen Durchschnitt liegt, sonst flat (0)"""
+    close = _as_2d(close)
+    cache = sma_cache if sma_cache is not None else {}
+    for window in (fast, slow):
+        if window not in cache:
+            cache[window] = sma(close, window)
+    with np.errstate(invalid="ignore"):
+        return (cache[fast] > cache[slow]).astype("float64")
+
+
+def _hold(events):
+    """Setzt Ereignisse (1 = Einstieg, 0 = Ausstieg, NaN = nichts) bis zum nächsten Ereignis fort"""
+    idx = np.where(np.isnan(events), 0, np.arange(events.shape[1]))
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    held = np.take_along_axis(events, idx, axis=1)
+    return np.nan_to_num(held, nan=0.0)
+
+
+def rsi_positions(close, window=14, lower=30, upper=70, rsi_cache=None):
+    """Einstieg, wenn der RSI unter lower fällt, Ausstieg, wenn er über upper steigt"""
+    close = _as_2d(close)
+    cache = rsi_cache if rsi_cache is not None else {}
+    if window not in cache:
+        cache[window] = rsi(close, window)
+    values = cache[window]
+    events = np.full(values.shape, np.nan)
+    with np.errstate(invalid="ignore"):
+        events[values < lower] = 1.0
+        events[values > upper] = 0.0
+    return _hold(events)
+
+
+def run_backtest(close, positions, cost=DEFAULT_COST):
+    """
+    Simuliert Positionen (Symbole x Tage, 0..1) auf Schlusskursen: die am Tag t festgelegte Position
+    gilt für die Rendite von t nach t+1, jeder Positionswechsel kostet cost.
+    Gibt ein Dict mit Kennzahlen je Symbol (1D-Arrays) und der Equity-Kurve (Symbole x Tage) zurück.
+    """
+    close = _as_2d(close)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        asset_returns = np.nan_to_num(close[:, 1:] / close[:, :-1] - 1.0)
+    held = positions[:, :-1]
+    turnover = np.abs(np.diff(positions, axis=1, prepend=0.0))[:, :-1]
+    strategy_returns = held * asset_returns - cost * turnover
+
+    equity = np.cumprod(1.0 + strategy_returns, axis=1)
+    drawdown = equity / np.maximum.accumulate(equity, axis=1) - 1.0
+    mean, std = strategy_returns.mean(axis=1), strategy_returns.std(axis=1, ddof=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(std > 0, mean / std * np.sqrt(TRADING_DAYS), np.nan)
+
+    return {
+        "total_return": equity[:, -1] - 1.0,
+        "sharpe": sharpe,
+        "max_drawdown": drawdown.min(axis=1),
+        "trades": (turnover > 0).sum(axis=1),
+        "exposure": held.mean(axis=1),
+        "equity": equity,
+    }
+
+
+# --------------------------
+# PARAMETER-SWEEPS
+# --------------------------
+STRATEGIES = {
+    "ma_crossover": ma_crossover_positions,
+    "rsi": rsi_positions,
+}
+# Name des Indikator-Cache-Arguments je Strategie
+_CACHE_ARG = {"ma_crossover": "sma_cache", "rsi": "rsi_cache"}
+
+
+def parameter_grid(**ranges):
+    """Alle Kombinationen der Parameterbereiche, z.B. parameter_grid(fast=[10, 20], slow=[50, 100])"""
+    names = list(ranges)
+    return [dict(zip(names, values)) for values in itertools.product(*ranges.values())]
+
+
+def sweep(close, strategy, grid, symbols=None, cost=DEFAULT_COST):
+    """
+    Testet alle Parameter aus grid für alle Symbole. Indikatoren mit gleichem Fenster werden nur
+    einmal berechnet. Gibt eine lange Tabelle (Parameter, Symbol, Kennzahlen) zurück.
+    """
+    close = _as_2d(close)
+    symbols = np.arange(close.shape[0]) if symbols is None else np.asarray(symbols)
+    make_positions = STRATEGIES[strategy]
+    cache = {}
+    frames = []
+    for params in grid:
+        if strategy == "ma_crossover" and params["fast"] >= params["slow"]:
+            continue
+        result = run_backtest(close, make_positions(close, **params, **{_CACHE_ARG[strategy]: cache}), cost)
+        result.pop("equity")
+        frame = pd.DataFrame({"symbol": symbols, **result})
+        for name, value in reversed(params.items()):
+            frame.insert(0, name, value)
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+# Kursmatrix je Worker-Prozess, wird einmal beim Start übergeben statt mit jedem Auftrag
+_worker_close = None
+
+
+def _init_worker(close):
+    global _worker_close
+    _worker_close = close
+
+
+def _sweep_chunk(strategy, grid, symbols, cost):
+    return sweep(_worker_close, strategy, grid, symbols, cost)
+
+
+def parallel_sweep(close, strategy, grid, symbols=None, cost=DEFAULT_COST, workers=None, chunks_per_worker=2):
+    """
+    Wie sweep, verteilt das Parametergitter aber auf einen Prozess-Pool.
+    Gitterpunkte mit gleichen Fenstern landen möglichst im selben Block (Indikator-Cache je Prozess).
+    """
+    workers = workers or os.cpu_count() or 1
+    close = np.ascontiguousarray(_as_2d(close))
+    n_chunks = max(1, min(len(grid), workers * chunks_per_worker))
+    chunks = [chunk.tolist() for chunk in np.array_split(np.array(grid, dtype=object), n_chunks) if len(chunk)]
+    if workers == 1 or len(chunks) == 1:
+        return sweep(close, strategy, grid, symbols, cost)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(close,)) as executor:
+        futures = [executor.submit(_sweep_chunk, strategy, chunk, symbols, cost) for chunk in chunks]
+        frames = [f.result() for f in futures]
+    return pd.concat(frames, ignore_index=True)
+
+
+def summarize(results, by):
+    """Kennzahlen je Parameterkombination über alle Symbole gemittelt, beste Sharpe Ratio zuerst"""
+    metrics = ["total_return", "sharpe", "max_drawdown", "trades", "exposure"]
+    return results.groupby(by)[metrics].mean().sort_values("sharpe", ascending=False).reset_index()
+
+
+def load_close_matrix(conn, symbols, start=None, end=None):
+    """Schlusskurse aus prices_daily als (symbols, dates, Matrix Symbole x Tage)"""
+    return to_matrix(load_closes(conn, symbols, start, end), "price")
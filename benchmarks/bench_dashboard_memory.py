@@ -0,0 +1,69 @@
+# benchmarks/bench_dashboard_memory.py
+# Vergleicht den Speicherbedarf des früheren Dashboard-Datenmodells (Kurse und Fundamentaldaten
+# in einem gemergten Frame) mit dem kompakten Modell aus dashboard_daten (ohne Datenbank).
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from dashboard_daten import compact_prices, compact_fundamentals
+
+FUNDAMENTAL_COLUMNS = ["marktkapitalisierung", "unternehmenswert", "umsatz", "ebitda",
+                       "kgv", "dividendenrendite", "dividende_je_aktie", "beta"]
+
+
+def synthetic_frames(n_symbols, n_days, seed=0):
+    """Kurse und Fundamentaldaten so, wie sie pd.read_sql aus der Datenbank liefert"""
+    rng = np.random.default_rng(seed)
+    symbols = [f"S{i:04d}" for i in range(n_symbols)]
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=n_days).date
+
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (n_symbols, n_days)), axis=1))
+    prices = pd.DataFrame({
+        "symbol": np.repeat(symbols, n_days).astype(object),
+        "datum": np.tile(dates, n_symbols),
+        "price": close.ravel(),
+        "volume": rng.integers(1e4, 1e8, n_symbols * n_days),
+        "open": close.ravel() * 0.999,
+        "high": close.ravel() * 1.01,
+        "low": close.ravel() * 0.99,
+    })
+    fundamentals = pd.DataFrame(rng.random((n_symbols, len(FUNDAMENTAL_COLUMNS))) * 1e9,
+                                columns=FUNDAMENTAL_COLUMNS)
+    fundamentals.insert(0, "symbol", symbols)
+    return prices, fundamentals
+
+
+def mb(df):
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Speichervergleich Dashboard-Datenmodell")
+    parser.add_argument("--symbols", type=int, default=770)
+    parser.add_argument("--days", type=int, default=252)
+    args = parser.parse_args()
+
+    prices, fundamentals = synthetic_frames(args.symbols, args.days)
+
+    # Bisher: Fundamentaldaten per Left-Merge auf jede Kurszeile kopiert
+    merged = pd.merge(prices, fundamentals, on="symbol", how="left")
+
+    compact = compact_prices(prices)
+    per_symbol = compact_fundamentals(fundamentals)
+
+    old_mb = mb(merged)
+    new_mb = mb(compact) + mb(per_symbol)
+    print(f"{args.symbols} Symbole x {args.days} Tage = {len(prices)} Kurszeilen")
+    print(f"Gemergter Frame:         {old_mb:8.1f} MB")
+    print(f"Kurse kompakt:           {mb(compact):8.1f} MB")
+    print(f"Fundamentaldaten/Symbol: {mb(per_symbol):8.3f} MB")
+    print(f"Ersparnis:               {old_mb / new_mb:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# benchmarks/bench_fetch_scheduler.py
+# Testet den Fetch-Scheduler gegen einen lokalen Fake-Anbieter, der wie yfinance/Alpha Vantage
+# drosselt: mehr als --provider-rate Anfragen pro Sekunde werden mit RateLimitError abgelehnt.
+# Geprüft wird, dass kein Symbol verloren geht und interaktive Anfragen vor dem Backfill laufen:
+# nach ihrem Eintreffen dürfen höchstens die bereits laufenden Backfill-Abrufe (einer je Worker)
+# vor ihr fertig werden.
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import threading
+import time
+
+from fetch_scheduler import FetchScheduler, RateLimitError, PRIORITY_BULK, PRIORITY_INTERACTIVE
+
+
+class FakeProvider:
+    """Erlaubt höchstens rate Anfragen pro gleitender Sekunde, darüber RateLimitError."""
+
+    def __init__(self, rate, latency=0.01):
+        self.rate = rate
+        self.latency = latency
+        self.calls = []
+        self.throttled = 0
+        self.completed = []
+        self._lock = threading.Lock()
+
+    def fetch(self, symbol):
+        with self._lock:
+            now = time.monotonic()
+            self.calls = [t for t in self.calls if now - t < 1.0]
+            if len(self.calls) >= self.rate:
+                self.throttled += 1
+                raise RateLimitError("Too Many Requests")
+            self.calls.append(now)
+        time.sleep(self.latency)
+        with self._lock:
+            self.completed.append((time.monotonic(), symbol))
+        return {"symbol": symbol}
+
+
+def run(n_symbols, provider_rate, scheduler_rate, workers):
+    provider = FakeProvider(provider_rate)
+    scheduler = FetchScheduler(limits={"fake": (scheduler_rate, max(1, int(scheduler_rate)))}, workers=workers,
+                               base_delay=0.2, max_delay=2.0, max_retries=8)
+
+    start = time.perf_counter()
+    bulk = [scheduler.submit("fake", provider.fetch, f"BULK{i}", priority=PRIORITY_BULK) for i in range(n_symbols)]
+    # Interaktive Anfrage kommt erst nach dem ganzen Backfill in die Warteschlange
+    time.sleep(0.1)
+    submitted = time.monotonic()
+    interactive = scheduler.submit("fake", provider.fetch, "DASHBOARD", priority=PRIORITY_INTERACTIVE)
+
+    interactive.result()
+    interactive_seconds = time.perf_counter() - start
+    results = [f.result() for f in bulk]
+    elapsed = time.perf_counter() - start
+    scheduler.shutdown()
+
+    assert len(results) == n_symbols, "Symbole verloren"
+    answered = next(t for t, symbol in provider.completed if symbol == "DASHBOARD")
+    overtaken = sum(1 for t, symbol in provider.completed if submitted < t < answered)
+    print(f"{n_symbols} Symbole in {elapsed:.2f}s ({n_symbols / elapsed:.1f}/s), "
+          f"Anbieter-Drosselungen: {provider.throttled}")
+    print(f"Interaktive Anfrage nach {interactive_seconds:.2f}s beantwortet, "
+          f"{overtaken} Backfill-Abrufe in der Zwischenzeit fertig")
+    print(f"Scheduler: {scheduler.stats()['fake']}")
+    assert overtaken <= workers, "Interaktive Anfrage wurde vom Backfill überholt"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch-Scheduler gegen einen drosselnden Fake-Anbieter")
+    parser.add_argument("--symbols", type=int, default=60)
+    parser.add_argument("--provider-rate", type=int, default=20, help="Anfragen/s, ab denen der Anbieter drosselt")
+    parser.add_argument("--scheduler-rate", type=float, default=18.0, help="Token-Bucket-Rate des Schedulers")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    print("Scheduler-Rate unter dem Anbieterlimit:")
+    run(args.symbols, args.provider_rate, args.scheduler_rate, args.workers)
+    print("\nScheduler-Rate über dem Anbieterlimit (Backoff muss Drosselungen auffangen):")
+    run(args.symbols, args.provider_rate, args.provider_rate * 3, args.workers)
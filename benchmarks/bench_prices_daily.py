@@ -0,0 +1,124 @@
+# benchmarks/bench_prices_daily.py
+# Misst die Latenz der Dashboard-Abfragen auf prices_daily mit synthetischen Daten:
+# ohne Index, mit (stock_symbol, date)-Index und jahresweise partitioniert.
+# Läuft in einem eigenen Schema, die echten Tabellen werden nicht angefasst.
+# Wegen SET search_path eine Session-Verbindung nutzen (z.B. DB_PORT=5432 statt Transaction-Pooler).
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import statistics
+import time
+
+from db.connection import connect
+from db.schema import create_tables
+
+SCHEMA = "bench_prices"
+
+QUERIES = {
+    # Abfrage aus dashboard_aktien_v2.load_stock_data
+    "dashboard_1y": """
+        SELECT stock_symbol, date, close, volume, open, high, low
+        FROM prices_daily
+        WHERE date >= CURRENT_DATE - INTERVAL '1 year'
+          AND stock_symbol = ANY(%(symbols)s)
+        ORDER BY stock_symbol, date
+    """,
+    "latest_date": """
+        SELECT stock_symbol, MAX(date)
+        FROM prices_daily
+        WHERE stock_symbol = ANY(%(symbols)s)
+        GROUP BY stock_symbol
+    """,
+}
+
+
+def reset_schema(conn):
+    cur = conn.cursor()
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;")
+    cur.execute(f"CREATE SCHEMA {SCHEMA};")
+    cur.execute(f"SET search_path TO {SCHEMA};")
+    conn.commit()
+
+
+def fill_synthetic(conn, n_symbols, years):
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO stocks (symbol, name)
+        SELECT 'S' || i, 'Synthetic ' || i FROM generate_series(1, %s) AS i;
+    """, (n_symbols,))
+    cur.execute("""
+        INSERT INTO prices_daily (stock_symbol, date, open, high, low, close, volume)
+        SELECT 'S' || i, d::date, p, p * 1.01, p * 0.99, p, (random() * 1e6)::bigint
+        FROM generate_series(1, %s) AS i,
+             generate_series(CURRENT_DATE - make_interval(years => %s), CURRENT_DATE, INTERVAL '1 day') AS d,
+             LATERAL (SELECT 100 + random() * 10 AS p) AS x
+        WHERE EXTRACT(ISODOW FROM d) < 6;
+    """, (n_symbols, years))
+    rows = cur.rowcount
+    cur.execute("ANALYZE prices_daily;")
+    conn.commit()
+    return rows
+
+
+def time_queries(conn, symbols, repeat):
+    cur = conn.cursor()
+    results = {}
+    for name, query in QUERIES.items():
+        durations = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            cur.execute(query, {"symbols": symbols})
+            cur.fetchall()
+            durations.append((time.perf_counter() - start) * 1000)
+        results[name] = statistics.median(durations)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark für Index/Partitionierung von prices_daily")
+    parser.add_argument("--symbols", type=int, default=770)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--selected", type=int, default=2, help="Anzahl abgefragter Symbole")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    symbols = [f"S{i}" for i in range(1, args.selected + 1)]
+    conn = connect()
+    try:
+        reset_schema(conn)
+        create_tables(conn)
+        # Zustand vor der Migration: kein Index auf (stock_symbol, date)
+        cur = conn.cursor()
+        cur.execute("DROP INDEX prices_daily_symbol_date_uidx;")
+        conn.commit()
+        rows = fill_synthetic(conn, args.symbols, args.years)
+        print(f"{rows} synthetische Zeilen ({args.symbols} Symbole, {args.years} Jahre)")
+
+        runs = {"ohne Index": time_queries(conn, symbols, args.repeat)}
+
+        cur.execute("CREATE UNIQUE INDEX prices_daily_symbol_date_uidx ON prices_daily (stock_symbol, date);")
+        cur.execute("ANALYZE prices_daily;")
+        conn.commit()
+        runs["mit Index"] = time_queries(conn, symbols, args.repeat)
+
+        reset_schema(conn)
+        create_tables(conn, partition_by_year=True,
+                      years=range(time.localtime().tm_year - args.years, time.localtime().tm_year + 1))
+        fill_synthetic(conn, args.symbols, args.years)
+        runs["partitioniert"] = time_queries(conn, symbols, args.repeat)
+
+        print(f"\n{'Variante':<15}" + "".join(f"{name:>16}" for name in QUERIES))
+        for variant, timings in runs.items():
+            print(f"{variant:<15}" + "".join(f"{timings[name]:>13.1f} ms" for name in QUERIES))
+    finally:
+        conn.rollback()
+        cur = conn.cursor()
+        cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;")
+        conn.commit()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+# correlation.py
+# Korrelations- und Kovarianzmatrizen der Tagesrenditen für viele Symbole.
+# Arbeitet wie indicators.py auf Matrizen (Symbole x Tage) mit NaN für fehlende Kurse; jedes Paar
+# nutzt nur die Tage, an denen beide Symbole Kurse haben (paarweise vollständige Beobachtungen).
+# Alles wird aus Summen über Masken-Matrixprodukten berechnet, ohne Schleife über Paare.
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from indicators import to_matrix
+
+# Mindestanzahl gemeinsamer Tage, darunter ist ein Paar NaN
+MIN_PERIODS = 20
+
+
+def returns(close):
+    """Einfache Tagesrenditen (Symbole x Tage-1), NaN wenn einer der beiden Kurse fehlt"""
+    close = np.asarray(close, dtype="float64")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return close[:, 1:] / close[:, :-1] - 1.0
+
+
+class PairStats:
+    """
+    Suffiziente Statistiken aller Paare über ein Zeitfenster: Anzahl gemeinsamer Tage n und die
+    Summen sx, sxx, sxy (jeweils N x N, sx[i, j] = Summe von x_i über die mit j gemeinsamen Tage).
+    Tage können einzeln hinzugefügt und entfernt werden (inkrementelles Update in O(N^2) je Tag).
+    """
+
+    def __init__(self, n_symbols):
+        shape = (n_symbols, n_symbols)
+        self.n = np.zeros(shape)
+        self.sx = np.zeros(shape)
+        self.sxx = np.zeros(shape)
+        self.sxy = np.zeros(shape)
+
+    @classmethod
+    def from_returns(cls, r, chunk_size=None):
+        """Statistiken für eine Renditematrix (Symbole x Tage); chunk_size Zeilen je Block begrenzt den Speicher"""
+        r = np.asarray(r, dtype="float64")
+        stats = cls(r.shape[0])
+        mask = ~np.isnan(r)
+        m = mask.astype("float64")
+        x = np.where(mask, r, 0.0)
+        step = chunk_size or r.shape[0]
+        for start in range(0, r.shape[0], step):
+            rows = slice(start, start + step)
+            stats.n[rows] = m[rows] @ m.T
+            stats.sx[rows] = x[rows] @ m.T
+            stats.sxx[rows] = (x[rows] ** 2) @ m.T
+            stats.sxy[rows] = x[rows] @ x.T
+        return stats
+
+    def _apply(self, r, sign):
+        r = np.asarray(r, dtype="float64").reshape(self.n.shape[0], -1)
+        mask = ~np.isnan(r)
+        m = mask.astype("float64")
+        x = np.where(mask, r, 0.0)
+        self.n += sign * (m @ m.T)
+        self.sx += sign * (x @ m.T)
+        self.sxx += sign * ((x ** 2) @ m.T)
+        self.sxy += sign * (x @ x.T)
+
+    def add(self, r):
+        """Einen Tag (Rendite je Symbol, NaN = fehlt) oder mehrere (Symbole x Tage) hinzufügen"""
+        self._apply(r, 1.0)
+
+    def remove(self, r):
+        """Zuvor hinzugefügte Tage wieder entfernen (Fenster verschieben)"""
+        self._apply(r, -1.0)
+
+    def cov(self, min_periods=MIN_PERIODS):
+        """Kovarianzmatrix (Stichprobe, ddof=1) über die gemeinsamen Tage jedes Paares"""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out = (self.sxy - self.sx * self.sx.T / self.n) / (self.n - 1)
+        out[self.n < max(min_periods, 2)] = np.nan
+        return out
+
+    def corr(self, min_periods=MIN_PERIODS):
+        """Korrelationsmatrix (Pearson) über die gemeinsamen Tage jedes Paares"""
+        sx, sy = self.sx, self.sx.T
+        with np.errstate(divide="ignore", invalid="ignore"):
+            num = self.n * self.sxy - sx * sy
+            den = np.sqrt((self.n * self.sxx - sx ** 2) * (self.n * self.sxx.T - sy ** 2))
+            out = np.clip(num / den, -1.0, 1.0)
+        out[self.n < max(min_periods, 2)] = np.nan
+        return out
+
+
+def cov_corr(r, min_periods=MIN_PERIODS, chunk_size=None):
+    """Kovarianz- und Korrelationsmatrix einer Renditematrix über den ganzen Zeitraum"""
+    stats = PairStats.from_returns(r, chunk_size)
+    return stats.cov(min_periods), stats.corr(min_periods)
+
+
+def rolling_corr(r, window, pairs, min_periods=MIN_PERIODS, chunk_size=10000):
+    """
+    Gleitende Korrelation über window Tage für ausgewählte Paare.
+    pairs: Liste von (i, j)-Zeilenindizes. Gibt eine Matrix (Paare x Tage) zurück.
+    Die Fenstersummen laufen über kumulierte Summen, Paare werden in Blöcken verarbeitet.
+    """
+    r = np.asarray(r, dtype="float64")
+    pairs = np.asarray(pairs, dtype=int).reshape(-1, 2)
+    out = np.full((len(pairs), r.shape[1]), np.nan)
+
+    def window_sum(values):
+        csum = np.cumsum(values, axis=1)
+        csum[:, window:] = csum[:, window:] - csum[:, :-window]
+        return csum
+
+    for start in range(0, len(pairs), chunk_size):
+        i, j = pairs[start:start + chunk_size].T
+        both = ~np.isnan(r[i]) & ~np.isnan(r[j])
+        x = np.where(both, r[i], 0.0)
+        y = np.where(both, r[j], 0.0)
+        n = window_sum(both.astype("float64"))
+        sx, sy = window_sum(x), window_sum(y)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            num = n * window_sum(x * y) - sx * sy
+            den = np.sqrt((n * window_sum(x * x) - sx ** 2) * (n * window_sum(y * y) - sy ** 2))
+            block = np.clip(num / den, -1.0, 1.0)
+        block[n < max(min_periods, 2)] = np.nan
+        out[start:start + chunk_size] = block
+    return out
+
+
+def returns_from_prices(df):
+    """Renditematrix aus einer langen Kurstabelle (symbol, datum, price): (symbols, dates, returns)"""
+    symbols, dates, close = to_matrix(df, "price")
+    return symbols, dates[1:], returns(close)
+
+
+class CorrelationCache:
+    """
+    Hält die Paarstatistiken je (Symbolmenge, Fenster) mit den zugehörigen Renditen im Speicher.
+    Kommt genau ein neuer Tag hinzu, wird das Fenster inkrementell verschoben statt alles neu zu
+    berechnen; Tage, die vorne aus dem Fenster bzw. dem Datumsbereich fallen, werden dabei entfernt.
+    """
+
+    def __init__(self, maxsize=16):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def stats(self, symbols, dates, r, window=None, chunk_size=None):
+        """
+        PairStats für die letzten window Tage (None = ganzer Zeitraum) der Renditematrix r.
+        symbols/dates beschriften Zeilen und Spalten von r.
+        """
+        key = (tuple(symbols), window)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        expected = _window_dates(dates, window)
+        start = max(0, r.shape[1] - window) if window else 0
+        if entry is not None:
+            cached_dates, cached_r, stats = entry
+            if cached_dates == expected:
+                return stats
+            # Genau ein neuer Tag: hinzufügen und die Tage entfernen, die vorne aus dem Fenster bzw. dem
+            # verschobenen Datumsbereich fallen (deren Renditen stehen nur noch im Zwischenspeicher).
+            # Nur wenn sich die übrigen Renditen nicht geändert haben: die Pipeline schreibt den letzten
+            # gespeicherten Tag erneut, eine korrigierte Rendite würde sonst in den Summen bleiben.
+            dropped = len(cached_dates) + 1 - len(expected)
+            if (expected and dropped >= 0 and expected[:-1] == cached_dates[dropped:]
+                    and np.array_equal(cached_r[:, dropped:], r[:, start:-1], equal_nan=True)):
+                stats = _copy_stats(stats)
+                stats.add(r[:, -1])
+                if dropped:
+                    stats.remove(cached_r[:, :dropped])
+                self._store(key, expected, r[:, start:], stats)
+                return stats
+
+        stats = PairStats.from_returns(r[:, start:], chunk_size)
+        self._store(key, expected, r[:, start:], stats)
+        return stats
+
+    def _store(self, key, dates, r, stats):
+        with self._lock:
+            self._entries[key] = (dates, r, stats)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _window_dates(dates, window):
+    return list(dates[-window:]) if window else list(dates)
+
+
+def _copy_stats(stats):
+    copy = PairStats(stats.n.shape[0])
+    copy.n, copy.sx, copy.sxx, copy.sxy = stats.n.copy(), stats.sx.copy(), stats.sxx.copy(), stats.sxy.copy()
+    return copy
+
+
+correlation_cache = CorrelationCache()
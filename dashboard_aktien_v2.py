@@ -1,9 +1,8 @@
 import psycopg2
 import streamlit as st
-import pandas as pd
 from dotenv import load_dotenv
-import os
 import time
+from db.connection import pooled_connection
 from dashboard_inhalte_v2 import show_dashboard
 
 ##
@@ -11,9 +10,9 @@ from dashboard_inhalte_v2 import show_dashboard
 # 1. DATENBANKVERBINDUNG
 # --------------------------
 def init_db_connection():
-    """Initialisiert und verwaltet die Datenbankverbindung"""
-    if 'db_connection' not in st.session_state:
-        st.session_state.db_connection = None
+    """Prüft die Verbindung über den gemeinsamen Connection-Pool (eine Verbindung je Abfrage, nicht je Session)"""
+    if 'db_connected' not in st.session_state:
+        st.session_state.db_connected = False
     if 'connection_start_time' not in st.session_state:
         st.session_state.connection_start_time = None
     if 'show_success_msg' not in st.session_state:
@@ -21,14 +20,10 @@ def init_db_connection():
 
     # Verbindungsaufbau
     try:
-        if st.session_state.db_connection is None:
-            st.session_state.db_connection = psycopg2.connect(
-                host=os.getenv("DB_HOST", "aws-0-eu-central-1.pooler.supabase.com"),
-                database=os.getenv("DB_NAME", "postgres"),
-                user=os.getenv("DB_USER", "postgres.txhiyzcswuftqgazbuan"),
-                password=os.getenv("DB_PASSWORD"),
-                port=os.getenv("DB_PORT", "6543")
-            )
+        if not st.session_state.db_connected:
+            with pooled_connection() as conn:
+                conn.cursor().execute("SELECT 1;")
+            st.session_state.db_connected = True
             st.session_state.connection_start_time = time.time()
             st.session_state.show_success_msg = True
             st.rerun()
@@ -50,10 +45,10 @@ def setup_ui():
     with col1:
         st.title("📈 Aktienanalyse Dashboard")
     with col2:
-        if st.session_state.db_connection:
+        if st.session_state.db_connected:
             if st.button("Verbinden/\nTrennen"):
-                st.session_state.db_connection.close()
-                st.session_state.db_connection = None
+                # Der Pool bleibt für andere Sessions bestehen, nur diese Session trennt sich
+                st.session_state.db_connected = False
                 st.session_state.show_success_msg = False
                 st.session_state.connection_start_time = None
 
@@ -68,61 +63,6 @@ def setup_ui():
         st.session_state.show_success_msg = False
 
 
-# --------------------------
-# 3. DATENABFRAGE
-# --------------------------
-def load_stock_data():
-    """Lädt Aktiendaten aus der Datenbank"""
-    try:
-        if not st.session_state.db_connection:
-            return None
-
-        # Tägliche Preisdaten laden - KORREKTE SPALTENNAMEN!
-        price_query = """
-                      SELECT stock_symbol as symbol, date as datum, close as price, volume, open, high, low
-                      FROM prices_daily
-                      WHERE date >= CURRENT_DATE - INTERVAL '1 year'
-                      ORDER BY stock_symbol, date
-                      """
-        price_df = pd.read_sql(price_query, st.session_state.db_connection)
-
-        # Fundamentaldaten laden
-        fundamental_query = """
-                            SELECT stock_symbol       as symbol, \
-                                   market_cap         as marktkapitalisierung,
-                                   enterprise_value   as unternehmenswert, \
-                                   revenue            as umsatz,
-                                   ebitda, \
-                                   pe_ratio           as kgv, \
-                                   dividend_yield     as dividendenrendite,
-                                   dividend_per_share as dividende_je_aktie, \
-                                   beta
-                            FROM fundamentals \
-                            """
-        try:
-            fundamental_df = pd.read_sql(fundamental_query, st.session_state.db_connection)
-
-            # Daten zusammenführen falls beide Datensätze vorhanden
-            if not price_df.empty and not fundamental_df.empty:
-                merged_df = pd.merge(
-                    price_df,
-                    fundamental_df,
-                    on="symbol",
-                    how="left"
-                )
-                return merged_df
-        except Exception as fund_error:
-            print(f"Warnung: Fundamentaldaten konnten nicht geladen werden: {fund_error}")
-            # Wenn Fundamentaldaten fehlen, nur Preisdaten zurückgeben
-            pass
-
-        return price_df if not price_df.empty else None
-
-    except Exception as e:
-        st.error(f"Fehler beim Laden der Aktiendaten: {e}")
-        print(f"Detaillierter Fehler: {e}")
-        return None
-
 # --------------------------
 # HAUPTPROGRAMM
 # --------------------------
@@ -134,13 +74,8 @@ if __name__ == "__main__":
     # 2. UI aufbauen
     setup_ui()
 
-    # 3. Daten laden und Dashboard anzeigen
-    if st.session_state.db_connection:
-        df = load_stock_data()
-        if df is not None:
-            show_dashboard(df)
-        else:
-            empty_df = pd.DataFrame(columns=["symbol", "datum", "price", "open", "high", "low", "volume"])
-            show_dashboard(empty_df)
+    # 3. Dashboard anzeigen, die Seiten laden ihre Daten gefiltert selbst (dashboard_daten)
+    if st.session_state.db_connected:
+        show_dashboard(st.session_state.get("analysed_symbols", []))
     else:
         st.warning("Bitte mit der Datenbank verbinden")
\ No newline at end of file
@@ -0,0 +1,233 @@
+import time
+from typing import NamedTuple
+import pandas as pd
+import streamlit as st
+from datetime import timedelta
+from db.connection import pooled_connection
+from db.persistence import get_data_version, get_stocks_version
+from db import queries
+from price_cache import price_cache
+import screener
+from symbol_search import build_index
+from correlation import correlation_cache, returns_from_prices
+import portfolio
+from db.persistence import get_portfolio_transactions
+
+###
+# --------------------------
+# DATENZUGRIFF FÜR DAS DASHBOARD
+# --------------------------
+# Alle Abfragen filtern Symbole und Zeitraum bereits in der Datenbank. Die Ergebnisse werden
+# pro Parameter und Datenstand (data_version) gecacht, damit Reruns nicht erneut abfragen.
+#
+# Datenmodell: Kurse liegen spaltenweise in einer kompakten Tabelle (Symbol als Kategorie,
+# Kurse als float32), Fundamentaldaten als genau ein Datensatz je Symbol (Index = Symbol).
+# Fundamentaldaten werden nicht mehr auf jede Kurszeile kopiert.
+
+# float32 reicht für Kurse (~7 signifikante Stellen), Volumen bleibt 64 Bit
+PRICE_DTYPES = {"price": "float32", "open": "float32", "high": "float32", "low": "float32"}
+# Kennzahlen mit kleinem Wertebereich; Marktkapitalisierung, Umsatz etc. bleiben float64
+FUNDAMENTAL_DTYPES = {"kgv": "float32", "dividendenrendite": "float32",
+                      "dividende_je_aktie": "float32", "beta": "float32"}
+
+
+class StockData(NamedTuple):
+    prices: pd.DataFrame
+    fundamentals: pd.DataFrame
+
+
+def compact_prices(df):
+    """Kurstabelle mit kompakten Datentypen (Symbol als Kategorie, Kurse als float32)"""
+    df = df.astype(PRICE_DTYPES)
+    df["symbol"] = df["symbol"].astype("category")
+    df["datum"] = pd.to_datetime(df["datum"])
+    return df
+
+
+def compact_fundamentals(df):
+    """Ein Datensatz je Symbol, Index ist das Symbol"""
+    df = df.astype(FUNDAMENTAL_DTYPES)
+    return df.set_index("symbol")
+
+
+@st.cache_data(ttl=5, show_spinner=False)
+def current_data_version():
+    """Aktueller Datenstand, kurz gecacht damit nicht jede Abfrage einen eigenen Roundtrip braucht"""
+    with pooled_connection() as conn:
+        version = get_data_version(conn)
+    # Ohne Tabelle data_version wird sekundengenau neu geladen statt veraltete Daten zu zeigen
+    return version if version is not None else f"t{int(time.time())}"
+
+
+@st.cache_data(ttl=5, show_spinner=False)
+def current_stocks_version():
+    """Stand der Stammdaten in stocks; Kurs-Updates ändern ihn nicht"""
+    with pooled_connection() as conn:
+        return get_stocks_version(conn)
+
+
+def invalidate():
+    """Nach dem Schreiben neuer Daten aufrufen, damit der nächste Rerun neu lädt"""
+    current_data_version.clear()
+    current_stocks_version.clear()
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _date_bounds(symbols, data_version):
+    with pooled_connection() as conn:
+        return queries.get_price_date_bounds(conn, symbols)
+
+
+def _prices_from_cache(symbols, start, end):
+    """Kurse aus dem lokalen Parquet-Cache, wenn er den Zeitraum für alle Symbole abdeckt"""
+    if not price_cache.enabled or not all(price_cache.covers(s, start, end) for s in symbols):
+        return None
+    frames = []
+    for symbol in symbols:
+        df = price_cache.read_range(symbol, start, end)
+        frames.append(pd.DataFrame({
+            "symbol": symbol,
+            "datum": df.index,
+            "price": df["Close"].to_numpy(),
+            "volume": df["Volume"].to_numpy(),
+            "open": df["Open"].to_numpy(),
+            "high": df["High"].to_numpy(),
+            "low": df["Low"].to_numpy(),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _prices(symbols, start, end, data_version):
+    # Zuerst der lokale Cache, nur bei Lücken die Datenbank
+    df = _prices_from_cache(symbols, start, end)
+    if df is not None:
+        return compact_prices(df)
+    with pooled_connection() as conn:
+        return compact_prices(queries.load_prices(conn, symbols, start, end))
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _indicators(symbols, start, end, data_version):
+    with pooled_connection() as conn:
+        df = queries.load_indicators(conn, symbols, start, end)
+    df["symbol"] = df["symbol"].astype("category")
+    df["datum"] = pd.to_datetime(df["datum"])
+    return df
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _fundamentals(symbols, data_version):
+    with pooled_connection() as conn:
+        return compact_fundamentals(queries.load_fundamentals(conn, symbols))
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _screen(filters, order_by, descending, limit, data_version):
+    with pooled_connection() as conn:
+        return screener.screen(conn, list(filters), order_by, descending, limit)
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _correlation(symbols, start, end, window, data_version):
+    with pooled_connection() as conn:
+        df = queries.load_closes(conn, symbols, start, end)
+    if df.empty:
+        return pd.DataFrame(), pd.DataFrame()
+    row_symbols, dates, r = returns_from_prices(df)
+    # Paarstatistiken werden bei genau einem neuen Handelstag inkrementell fortgeschrieben
+    stats = correlation_cache.stats(row_symbols, dates, r, window, chunk_size=256)
+    return (pd.DataFrame(stats.corr(), index=row_symbols, columns=row_symbols),
+            pd.DataFrame(stats.cov(), index=row_symbols, columns=row_symbols))
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _symbol_index(stocks_version):
+    # Als Ressource gecacht: der Index wird geteilt statt bei jedem Zugriff kopiert
+    with pooled_connection() as conn:
+        return build_index(conn)
+
+
+def load_date_bounds(symbols):
+    """(erstes, letztes) gespeichertes Datum der Symbole"""
+    if not symbols:
+        return None, None
+    return _date_bounds(tuple(sorted(symbols)), current_data_version())
+
+
+def default_date_range(symbols):
+    """Standardzeitraum: das letzte Jahr der vorhandenen Daten"""
+    min_date, max_date = load_date_bounds(symbols)
+    if max_date is None:
+        return None, None
+    return max(min_date, max_date - timedelta(days=365)), max_date
+
+
+def load_prices(symbols, start=None, end=None):
+    """Kurse der Symbole im Zeitraum [start, end]"""
+    return _prices(tuple(sorted(symbols)), start, end, current_data_version())
+
+
+def load_indicators(symbols, start=None, end=None):
+    """Kurse mit den von der Pipeline vorberechneten Indikatoren (sma_20, sma_50, rsi_14, ...)"""
+    return _indicators(tuple(sorted(symbols)), start, end, current_data_version())
+
+
+def load_fundamentals(symbols):
+    """Eine Zeile Fundamentaldaten je Symbol, Index ist das Symbol"""
+    return _fundamentals(tuple(sorted(symbols)), current_data_version())
+
+
+def load_stock_data(symbols, start=None, end=None):
+    """Kurse im Zeitraum und Fundamentaldaten der Symbole als StockData"""
+    return StockData(load_prices(symbols, start, end), load_fundamentals(symbols))
+
+
+def load_screen(filters, order_by="marktkapitalisierung", descending=True, limit=100):
+    """Screener-Treffer über alle Symbole (filters: Liste von screener.Filter)"""
+    return _screen(tuple(filters), order_by, descending, limit, current_data_version())
+
+
+def load_correlation(symbols, start=None, end=None, window=None):
+    """
+    Korrelations- und Kovarianzmatrix der Tagesrenditen (DataFrames Symbol x Symbol) im Zeitraum,
+    mit window nur über die letzten window Handelstage.
+    """
+    return _correlation(tuple(sorted(symbols)), start, end, window, current_data_version())
+
+
+@st.cache_data(show_spinner=False)
+def _portfolios(data_version):
+    with pooled_connection() as conn:
+        metrics = portfolio.portfolio_metrics(conn)
+        transactions = get_portfolio_transactions(conn)
+    names = transactions.drop_duplicates("portfolio_id").set_index("portfolio_id")["name"]
+    if not metrics.empty:
+        metrics.insert(1, "name", metrics["portfolio_id"].map(names))
+    return metrics, transactions
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _portfolio_detail(portfolio_id, data_version):
+    _, transactions = _portfolios(data_version)
+    tx = transactions[transactions["portfolio_id"] == portfolio_id]
+    with pooled_connection() as conn:
+        values = queries.load_portfolio_values(conn, portfolio_id)
+        latest = queries.load_latest_closes(conn, tx["symbol"].unique())
+    values["datum"] = pd.to_datetime(values["datum"])
+    return values, portfolio.holdings(tx, latest.set_index("symbol")["price"])
+
+
+def load_portfolios():
+    """(Kennzahlen je Portfolio, alle Transaktionen)"""
+    return _portfolios(current_data_version())
+
+
+def load_portfolio_detail(portfolio_id):
+    """(Wertreihe, aktuelle Bestände mit Gewichten) eines Portfolios"""
+    return _portfolio_detail(portfolio_id, current_data_version())
+
+
+def load_symbol_index():
+    """Suchindex über alle Aktien in stocks, neu aufgebaut nur bei geänderten Stammdaten (nicht bei neuen Kursen)"""
+    return _symbol_index(current_stocks_version())
@@ -3,22 +3,40 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
-from db.connection import connect
-from db.persistence import clear_old_data, get_symbol_name_mapping
-from pipeline import run_data_pipeline
+from dashboard_daten import (
+    load_date_bounds, load_prices, load_fundamentals, load_stock_data, load_indicators, default_date_range, invalidate,
+    load_screen, load_correlation, load_portfolios, load_portfolio_detail, load_symbol_index
+)
+from indicators import indicators_frame
+from downsampling import MIN_BAR_PX, choose_resolution, downsample_lines, max_points, payload_metrics, resample_ohlcv
+from pipeline import run_batch_pipeline
+from correlation import rolling_corr, returns_from_prices
+from screener import FIELDS as SCREENER_FIELDS, parse_filters
+from fetch_scheduler import PRIORITY_INTERACTIVE
+
+# Kalendertage Vorlauf für gleitende Indikatoren (50 Handelstage)
+INDICATOR_WARMUP_DAYS = 100
+# Angenommene Chartbreiten in Pixeln (volle Breite bzw. halbe Spalte) für das Ausdünnen
+CHART_WIDTH_PX = 1200
+HALF_CHART_WIDTH_PX = 600
+# Anzahl Einträge in den Auswahllisten der Aktiensuche
+SEARCH_RESULTS = 50
+# Fenster der gleitenden Korrelation im Kursverlauf (Handelstage)
+CORRELATION_WINDOW = 60
+RESOLUTION_LABELS = {"1D": "täglich", "W": "wöchentlich", "M": "monatlich", "Q": "quartalsweise", "Y": "jährlich"}
 
 ###
 # --------------------------
 # DASHBOARD INHALTE
 # --------------------------
-def show_dashboard(df):
-    """Zeigt das eigentliche Dashboard an"""
+def show_dashboard(symbols):
+    """Zeigt das eigentliche Dashboard für die analysierten Symbole an"""
     # Seitenleiste mit Navigation
     with st.sidebar:
         st.title("📊 Navigation")
 
         # Statusanzeige
-        if 'db_connection' in st.session_state and st.session_state.db_connection:
+        if st.session_state.get('db_connected'):
             st.markdown('<p style="font-size:14px; color:green;">🟢 Verbunden</p>',
                         unsafe_allow_html=True)
         else:
@@ -31,7 +49,8 @@ def show_dashboard(df):
         st.subheader("📌 Hauptmenü")
         selected_page = st.radio(
             "Optionen",
-            ["Dashboard", "Technische Analyse", "Fundamentaldaten", "Tabellarische Datenansicht"],
+            ["Dashboard", "Technische Analyse", "Fundamentaldaten", "Screener", "Portfolios",
+             "Tabellarische Datenansicht"],
             index=0,
             key="nav_menu"
         )
@@ -43,28 +62,46 @@ def show_dashboard(df):
 
     # Hauptinhalt basierend auf ausgewählter Seite
     if selected_page == "Dashboard":
-        show_main_dashboard(df)
+        show_main_dashboard(symbols)
     elif selected_page == "Technische Analyse":
-        show_technical_analysis(df)
+        show_technical_analysis(symbols)
     elif selected_page == "Fundamentaldaten":
-        show_fundamental_analysis(df)
+        show_fundamental_analysis(symbols)
+    elif selected_page == "Screener":
+        show_screener()
+    elif selected_page == "Portfolios":
+        show_portfolios()
     else:
-        show_tabellarische_datenansicht(df)
+        show_tabellarische_datenansicht(symbols)
 
 
-def show_main_dashboard(df):
+def selected_date_range(symbols):
+    """Zeitraum aus dem Schieberegler des Hauptdashboards, sonst das letzte Jahr"""
+    date_range = st.session_state.get("main_dash_date_selector")
+    if date_range and len(date_range) == 2:
+        return date_range
+    return default_date_range(symbols)
+
+
+def show_main_dashboard(symbols):
     """Zeigt das Hauptdashboard mit allen Elementen"""
     st.markdown("---")
     st.subheader("🔍 Welche Aktien möchtest du analysieren?")
 
-    #Symbol-Namen aus Datenbank laden für Dropdown
-    conn = connect()
-    symbol_to_name = get_symbol_name_mapping(conn)
-    conn.close()
+    # Suchindex über alle Aktien (einmal aufgebaut, nur bei neuem Datenstand neu)
+    symbol_index = load_symbol_index()
+    query = st.text_input("Aktie suchen", placeholder="Symbol, Name, Sektor oder Branche", key="symbol_search")
 
-    # Mapping und Optionen aufbauen
-    options = [f"{symbol} – {symbol_to_name[symbol]}" for symbol in sorted(symbol_to_name)]
-    symbol_map = {f"{symbol} – {symbol_to_name[symbol]}": symbol for symbol in symbol_to_name}
+    # Nur die besten Treffer in die Auswahllisten, ohne Suche die ersten Symbole alphabetisch
+    if query:
+        options = [symbol_index.label(match.symbol) for match in symbol_index.search(query, k=SEARCH_RESULTS)]
+    else:
+        options = symbol_index.labels(limit=SEARCH_RESULTS)
+    # Bereits gewählte Aktien bleiben auswählbar, auch wenn sie nicht mehr zur Suche passen
+    for key in ("symbol1_select", "symbol2_select"):
+        selected = st.session_state.get(key)
+        if selected and selected not in options:
+            options.append(selected)
 
     with st.form("aktien_eingabe_formular"):
         col1, col2, col3, col4, col5 = st.columns([1, 2, 1, 2, 2])
@@ -93,8 +130,8 @@ def show_main_dashboard(df):
             submitted = st.form_submit_button("Analysieren & Speichern")
 
     # Symbol aus Mapping extrahieren
-    symbol1 = symbol_map.get(auswahl1, "").upper()
-    symbol2 = symbol_map.get(auswahl2, "").upper()
+    symbol1 = symbol_index.symbol_for(auswahl1)
+    symbol2 = symbol_index.symbol_for(auswahl2)
 
 
     if submitted:
@@ -102,43 +139,37 @@ def show_main_dashboard(df):
         new_symbols = [s for s in new_symbols if s]
 
         with st.spinner("Verarbeite Aktien..."):
-            conn = connect()
-            try:
-                clear_old_data(conn)
-                for symbol in new_symbols:
-                    try:
-                        run_data_pipeline(conn, symbol)
-                        st.success(f"{symbol} erfolgreich analysiert und gespeichert.")
-                    except ValueError as ve:
-                        st.warning(str(ve))
-                    except Exception as e:
-                        st.error(f"Fehler bei {symbol}: {str(e)}")
-            finally:
-                conn.close()
+            # Symbole parallel und inkrementell abrufen und speichern
+            analysed = []
+            for result in run_batch_pipeline(new_symbols, max_workers=2, pool_size=2,
+                                             priority=PRIORITY_INTERACTIVE):
+                symbol = result["symbol"]
+                if result["ok"]:
+                    analysed.append(symbol)
+                    st.success(f"{symbol} erfolgreich analysiert und gespeichert.")
+                elif isinstance(result["error"], ValueError):
+                    st.warning(str(result["error"]))
+                else:
+                    st.error(f"Fehler bei {symbol}: {str(result['error'])}")
+            st.session_state.analysed_symbols = analysed
+            invalidate()
         st.rerun()
 
-    # Anzeige vorhandener Aktien
-    if not df.empty:
-        conn = connect()
-        symbol_to_name = get_symbol_name_mapping(conn)
-        conn.close()
+    # Zeitraum der gespeicherten Kurse (ohne die Kurse selbst zu laden)
+    min_date, max_date = load_date_bounds(symbols)
 
-        available_symbols = sorted(df["symbol"].unique())
-        display_names = [symbol_to_name.get(s, s) for s in available_symbols]
+    # Anzeige vorhandener Aktien
+    if max_date is not None:
+        available_symbols = sorted(symbols)
+        display_names = [symbol_index.name(s) for s in available_symbols]
         st.markdown(f"**Aktuell analysierte Aktien:** {', '.join(display_names)}")
     else:
         st.info("Noch keine Aktien analysiert.")
 
     # Zeitfilter
-    if 'datum' in df.columns:
-        # Datetime-Konvertierung für PostgreSQL date-Felder
-        df['datum'] = pd.to_datetime(df['datum'])
-
-        min_date = df['datum'].min().date()  # .date() statt .to_pydatetime()
-        max_date = df['datum'].max().date()  # .date() statt .to_pydatetime()
-
-        # Standardwerte für date_range
-        default_start = max_date - timedelta(days=365)
+    date_range = ()
+    if max_date is not None:
+        default_start, _ = default_date_range(symbols)
         date_range = st.slider(
             "Zeitraum auswählen",
             min_value=min_date,
@@ -148,14 +179,18 @@ def show_main_dashboard(df):
             key="main_dash_date_selector"
         )
 
-    # Gefilterte Daten
-    filtered_df = df.copy()
-    if 'datum' in df.columns and len(date_range) == 2:
-        # Datum-Vergleich korrigiert
-        filtered_df = filtered_df[
-            (filtered_df['datum'].dt.date >= date_range[0]) &
-            (filtered_df['datum'].dt.date <= date_range[1])
-            ]
+    # Gefilterte Daten (Filter auf Symbole und Zeitraum läuft in der Datenbank)
+    if len(date_range) == 2:
+        filtered_df = load_prices(symbols, date_range[0], date_range[1])
+    else:
+        filtered_df = pd.DataFrame(columns=["symbol", "datum", "price", "volume", "open", "high", "low"])
+        filtered_df['datum'] = pd.to_datetime(filtered_df['datum'])
+
+    # Volumen und Kerzen auf eine zur Chartbreite passende Auflösung aggregieren
+    resolution = "1D"
+    if len(date_range) == 2:
+        resolution = choose_resolution(date_range[0], date_range[1], max_points(HALF_CHART_WIDTH_PX, MIN_BAR_PX))
+    bars_df = filtered_df if resolution == "1D" else resample_ohlcv(filtered_df, resolution)
 
     # OBERES LAYOUT: Kursverlauf
     st.subheader("📈 Kursverlauf")
@@ -172,6 +207,12 @@ def show_main_dashboard(df):
             selected_symbols.append(aktie2)
 
         df_plot = filtered_df[filtered_df["symbol"].isin(selected_symbols)].sort_values(['symbol', 'datum'])
+        if isinstance(df_plot["symbol"].dtype, pd.CategoricalDtype):
+            # Keine leeren Linien für nicht gewählte Kategorien
+            df_plot["symbol"] = df_plot["symbol"].cat.remove_unused_categories()
+        # Höchstens ein Punkt je Pixel und Linie (LTTB erhält Spitzen und Täler)
+        raw_plot = df_plot
+        df_plot = downsample_lines(df_plot, max_points(CHART_WIDTH_PX))
 
         fig = px.line(
             df_plot,
@@ -205,6 +246,15 @@ def show_main_dashboard(df):
 
         st.plotly_chart(fig, use_container_width=True)
 
+        if aktie2 and len(date_range) == 2:
+            show_pair_correlation(raw_plot, aktie1, aktie2, date_range)
+
+        metrics = payload_metrics(raw_plot, df_plot)
+        st.caption(
+            f"Dargestellt: {metrics['points_after']:,} von {metrics['points_before']:,} Punkten "
+            f"(Nutzlast −{metrics['reduction']:.0%}), Volumen/Kerzen {RESOLUTION_LABELS.get(resolution, resolution)}"
+        )
+
     # UNTERES LAYOUT: Handelsvolumen und Candlestick
     lower_col1, lower_col2 = st.columns(2)
 
@@ -212,7 +262,7 @@ def show_main_dashboard(df):
     with lower_col1:
         st.subheader("📦 Handelsvolumen")
         fig_vol = px.bar(
-            filtered_df,
+            bars_df,
             x='datum',
             y='volume',
             color='symbol',
@@ -231,7 +281,7 @@ def show_main_dashboard(df):
         selected_candle_symbol = st.session_state.get("candle_symbol_select", unique_symbols[0] if unique_symbols else None)
 
         if selected_candle_symbol:
-            symbol_df = filtered_df[filtered_df['symbol'] == selected_candle_symbol]
+            symbol_df = bars_df[bars_df['symbol'] == selected_candle_symbol]
             fig = go.Figure(data=[go.Candlestick(
                 x=symbol_df['datum'],
                 open=symbol_df['open'],
@@ -251,22 +301,56 @@ def show_main_dashboard(df):
             key="candle_symbol_select"
         )
 
-def show_technical_analysis(df):
+def show_pair_correlation(df, aktie1, aktie2, date_range):
+    """Korrelation der Tagesrenditen zweier Aktien im Zeitraum und gleitend über CORRELATION_WINDOW Tage"""
+    corr, cov = load_correlation([aktie1, aktie2], date_range[0], date_range[1])
+    if corr.empty or pd.isna(corr.loc[aktie1, aktie2]):
+        return
+
+    col1, col2 = st.columns(2)
+    col1.metric("Korrelation der Tagesrenditen", f"{corr.loc[aktie1, aktie2]:.2f}")
+    col2.metric("Kovarianz (täglich)", f"{cov.loc[aktie1, aktie2]:.2e}")
+
+    symbols, dates, r = returns_from_prices(df)
+    index = {symbol: i for i, symbol in enumerate(symbols)}
+    rolling = rolling_corr(r, CORRELATION_WINDOW, [(index[aktie1], index[aktie2])])[0]
+    fig = go.Figure(go.Scatter(x=dates, y=rolling, name="Korrelation", line=dict(color="teal", width=1)))
+    fig.update_layout(title=f"Gleitende Korrelation ({CORRELATION_WINDOW} Tage)", yaxis=dict(range=[-1, 1]),
+                      height=250)
+    st.plotly_chart(fig, use_container_width=True)
+
+
+def show_technical_analysis(symbols):
     """Zeigt technische Analyse-Tools"""
     st.header("📊 Technische Analyse")
 
-    symbols = sorted(df["symbol"].unique())
+    symbols = sorted(symbols)
     selected_symbol = st.selectbox(
         "Aktie auswählen",
         symbols,
         key="tech_analysis_symbol"
     )
+    if not selected_symbol:
+        st.info("Noch keine Aktien analysiert.")
+        return
+
+    # Nur das gewählte Symbol im gewählten Zeitraum laden, mit Vorlauf damit MA50 ab Beginn gefüllt ist
+    start, end = selected_date_range([selected_symbol])
+    if end is None:
+        st.info("Keine Daten vorhanden.")
+        return
+    show_bollinger = st.checkbox("Bollinger-Bänder (20 Tage, 2σ)", key="tech_bollinger")
 
-    symbol_df = df[df['symbol'] == selected_symbol].sort_values('datum')
+    # Von der Pipeline vorberechnete Indikatoren lesen
+    symbol_df = load_indicators([selected_symbol], start, end)
+    if symbol_df.empty:
+        # Noch nicht materialisiert: mit Vorlauf laden, vektorisiert berechnen und zuschneiden
+        prices_df = load_prices([selected_symbol], start - timedelta(days=INDICATOR_WARMUP_DAYS), end)
+        symbol_df = indicators_frame(prices_df, config={"sma": [20, 50], "ema": None, "macd": None, "atr": None})
+        symbol_df = symbol_df[symbol_df['datum'] >= pd.Timestamp(start)]
 
-    # Gleitende Durchschnitte berechnen
-    symbol_df['MA20'] = symbol_df['price'].rolling(window=20).mean()
-    symbol_df['MA50'] = symbol_df['price'].rolling(window=50).mean()
+    if not symbol_df.empty and pd.notna(symbol_df['volatility_20'].iloc[-1]):
+        st.metric("Volatilität (20 Tage, annualisiert)", f"{symbol_df['volatility_20'].iloc[-1]:.1%}")
 
     # Plot mit gleitenden Durchschnitten
     fig = go.Figure()
@@ -278,26 +362,105 @@ def show_technical_analysis(df):
     ))
     fig.add_trace(go.Scatter(
         x=symbol_df['datum'],
-        y=symbol_df['MA20'],
+        y=symbol_df['sma_20'],
         name='20-Tage Durchschnitt',
         line=dict(color='orange', width=1)
     ))
     fig.add_trace(go.Scatter(
         x=symbol_df['datum'],
-        y=symbol_df['MA50'],
+        y=symbol_df['sma_50'],
         name='50-Tage Durchschnitt',
         line=dict(color='green', width=1)
     ))
+    if show_bollinger:
+        for column, label in [('bb_upper', 'Bollinger oben'), ('bb_lower', 'Bollinger unten')]:
+            fig.add_trace(go.Scatter(
+                x=symbol_df['datum'],
+                y=symbol_df[column],
+                name=label,
+                line=dict(color='gray', width=1, dash='dot')
+            ))
     fig.update_layout(title=f"Technische Analyse - {selected_symbol}")
     st.plotly_chart(fig, use_container_width=True)
 
+    # RSI mit den üblichen Schwellen 30/70
+    fig_rsi = go.Figure(go.Scatter(
+        x=symbol_df['datum'],
+        y=symbol_df['rsi_14'],
+        name='RSI (14)',
+        line=dict(color='purple', width=1)
+    ))
+    fig_rsi.add_hline(y=70, line_dash="dash", line_color="red")
+    fig_rsi.add_hline(y=30, line_dash="dash", line_color="green")
+    fig_rsi.update_layout(title="RSI (14 Tage)", yaxis=dict(range=[0, 100]), height=250)
+    st.plotly_chart(fig_rsi, use_container_width=True)
+
+
+def show_screener():
+    """Filtert und sortiert alle gespeicherten Aktien nach Fundamentaldaten und Momentum"""
+    st.header("🔎 Screener")
+
+    expression = st.text_input(
+        "Filter",
+        value="kgv < 15, dividendenrendite > 3, beta < 1",
+        key="screener_filter",
+        help="Bedingungen mit Komma trennen, z.B. momentum_dezil = 10. Felder: " + ", ".join(SCREENER_FIELDS),
+    )
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        order_by = st.selectbox("Sortieren nach", list(SCREENER_FIELDS),
+                                index=list(SCREENER_FIELDS).index("marktkapitalisierung"), key="screener_order")
+    with col2:
+        descending = st.checkbox("Absteigend", value=True, key="screener_desc")
+    with col3:
+        limit = st.number_input("Max. Treffer", min_value=10, max_value=1000, value=100, step=10, key="screener_limit")
+
+    try:
+        filters = parse_filters(expression)
+    except ValueError as e:
+        st.warning(str(e))
+        return
+
+    result = load_screen(filters, order_by, descending, int(limit))
+    st.markdown(f"**{len(result)} Treffer**")
+    st.dataframe(result, use_container_width=True, hide_index=True)
+
+
+def show_portfolios():
+    """Kennzahlen aller Portfolios, Wertverlauf und Bestände des gewählten Portfolios"""
+    st.header("💼 Portfolios")
+
+    metrics, _ = load_portfolios()
+    if metrics.empty:
+        st.info("Noch keine Portfolio-Werte vorhanden (Pipeline ausführen, nachdem Transaktionen gebucht wurden).")
+        return
+
+    st.dataframe(
+        metrics.drop(columns=["portfolio_id"]).rename(columns={
+            "name": "Portfolio", "value": "Wert", "total_return": "Rendite", "volatility": "Volatilität",
+            "sharpe": "Sharpe", "max_drawdown": "Max. Drawdown", "var": "VaR 95 % (1 Tag)", "days": "Tage",
+        }),
+        use_container_width=True, hide_index=True
+    )
+
+    names = dict(zip(metrics["portfolio_id"], metrics["name"]))
+    portfolio_id = st.selectbox("Portfolio auswählen", list(names), format_func=names.get, key="portfolio_select")
+    values, holdings = load_portfolio_detail(portfolio_id)
+
+    fig = px.line(values, x="datum", y="wert", labels={"wert": "Wert ($)", "datum": "Datum"},
+                  title=f"Wertverlauf - {names[portfolio_id]}")
+    st.plotly_chart(fig, use_container_width=True)
+    st.dataframe(holdings, use_container_width=True)
+
 
-def show_fundamental_analysis(df):
+def show_fundamental_analysis(symbols):
     """Vergleicht zwei Aktien anhand von Fundamentaldaten nebeneinander"""
 
     st.header("📊 Fundamentaldaten Vergleich")
 
-    symbols = sorted(df["symbol"].dropna().unique())
+    # Eine Zeile je Symbol statt Fundamentaldaten auf jeder Kurszeile
+    fundamentals_df = load_fundamentals(symbols)
+    symbols = sorted(symbols)
 
     col_select1, col_select2 = st.columns(2)
     with col_select1:
@@ -307,8 +470,8 @@ def show_fundamental_analysis(df):
         symbol2 = st.selectbox("Aktie 2 auswählen:", remaining, key="symbol_2")
 
     try:
-        df1 = df[df['symbol'] == symbol1].iloc[0]
-        df2 = df[df['symbol'] == symbol2].iloc[0]
+        # Fehlende Symbole ergeben leere Zeilen (Anzeige "N/A")
+        df1, df2 = (row for _, row in fundamentals_df.reindex([symbol1, symbol2]).iterrows())
 
         def fmt(value, typ="raw"):
             try:
@@ -364,19 +527,28 @@ def show_fundamental_analysis(df):
             with col3:
                 st.markdown(f"<div style='font-size: 18px; font-weight: bold'>{fmt(val2, typ)}</div>", unsafe_allow_html=True)
 
+        # Datum des jeweils gültigen Snapshots
+        stand = [row.get("stand") for row in (df1, df2)]
+        st.caption(" · ".join(f"Stand {s}: {d if pd.notnull(d) else 'N/A'}" for s, d in zip((symbol1, symbol2), stand)))
+
     except Exception as e:
         st.error(f"Fehler beim Vergleich: {e}")
 
-def show_tabellarische_datenansicht(df):
+def show_tabellarische_datenansicht(symbols):
     st.header("📋 Tabellarische Datenansicht")
 
-    if df.empty:
+    start, end = selected_date_range(symbols)
+    if end is None:
         st.info("Keine Daten vorhanden.")
         return
 
-    # Sicherstellen, dass datum als datetime vorliegt
-    display_df = df.copy()
-    display_df['datum'] = pd.to_datetime(display_df['datum'], errors='coerce')
+    data = load_stock_data(symbols, start, end)
+
+    # Datum für die Anzeige formatieren
+    display_df = data.prices.copy()
     display_df['datum'] = display_df['datum'].dt.strftime('%Y-%m-%d')
 
-    st.dataframe(display_df.sort_values(['symbol', 'datum']))
\ No newline at end of file
+    st.dataframe(display_df)
+
+    st.subheader("Fundamentaldaten")
+    st.dataframe(data.fundamentals)
\ No newline at end of file
@@ -0,0 +1,117 @@
+# data_provider.py
+# Gemeinsame asynchrone Schnittstelle der Datenquellen (yfinance, Alpha Vantage).
+# Viele Abrufe laufen gleichzeitig in einer Event-Loop: Anzahl gleichzeitiger Anfragen je Anbieter
+# begrenzt, Rate-Limit über einen Token-Bucket, Abbruch nach timeout Sekunden und Wiederholung
+# mit Backoff wie im Fetch-Scheduler.
+import asyncio
+import random
+
+from fetch_scheduler import DEFAULT_LIMITS, RateLimitError, TokenBucket, is_transient
+
+# Sekunden bis ein einzelner Abruf abgebrochen wird
+DEFAULT_TIMEOUT = 30.0
+
+
+class AsyncRateLimiter:
+    """Token-Bucket für asyncio: acquire() wartet, bis ein Token verfügbar ist."""
+
+    def __init__(self, rate, capacity):
+        self._bucket = TokenBucket(rate, capacity)
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while (delay := self._bucket.wait_time()) > 0:
+                await asyncio.sleep(delay)
+            self._bucket.take()
+
+
+class DataProvider:
+    """
+    Basisklasse der asynchronen Datenquellen.
+
+    Unterklassen setzen name und implementieren die unterstützten Abrufe (history, intraday) über
+    _call: höchstens concurrency Abrufe gleichzeitig, Rate-Limit nach limit = (Anfragen/s, Burst)
+    (None = DEFAULT_LIMITS des Anbieters, False = keins), Abbruch nach timeout Sekunden.
+    Drosselungen und vorübergehende Fehler werden bis zu max_retries Mal nach
+    base_delay * 2^Versuch Sekunden (voller Jitter, höchstens max_delay) wiederholt.
+    Als async Kontextmanager verwenden, damit offene Verbindungen geschlossen werden.
+    """
+
+    name = None
+
+    def __init__(self, concurrency=10, limit=None, timeout=DEFAULT_TIMEOUT, max_retries=3,
+                 base_delay=1.0, max_delay=60.0):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        limit = DEFAULT_LIMITS.get(self.name) if limit is None else limit
+        self._limiter = AsyncRateLimiter(*limit) if limit else None
+        self._slots = asyncio.Semaphore(concurrency)
+        self._stats = {"requests": 0, "retries": 0, "throttled": 0, "timeouts": 0, "failures": 0}
+
+    async def history(self, symbol, start=None):
+        """Tageskurse (Open/High/Low/Close/Volume) ab start, ohne start das letzte Jahr"""
+        raise NotImplementedError(f"{self.name} liefert keine Tageskurse")
+
+    async def intraday(self, symbol, interval="60min", output_size="compact", month=None):
+        """Intraday-Bars (Open/High/Low/Close/Volume) mit DatetimeIndex in UTC"""
+        raise NotImplementedError(f"{self.name} liefert keine Intraday-Kurse")
+
+    async def _call(self, fn, *args, **kwargs):
+        """Führt den Abruf fn(*args, **kwargs) (Coroutine-Funktion) mit Limits, Timeout und Wiederholungen aus"""
+        attempt = 0
+        while True:
+            try:
+                async with self._slots:
+                    if self._limiter:
+                        await self._limiter.acquire()
+                    self._stats["requests"] += 1
+                    # Bei Zeitüberschreitung wird der Abruf abgebrochen (offene Verbindung wird geschlossen)
+                    return await asyncio.wait_for(fn(*args, **kwargs), self.timeout)
+            except Exception as exc:
+                throttled = isinstance(exc, RateLimitError)
+                timed_out = isinstance(exc, asyncio.TimeoutError)
+                if throttled:
+                    self._stats["throttled"] += 1
+                if timed_out:
+                    self._stats["timeouts"] += 1
+                if not (throttled or timed_out or is_transient(exc)) or attempt >= self.max_retries:
+                    self._stats["failures"] += 1
+                    raise
+                self._stats["retries"] += 1
+                delay = min(self.max_delay, self.base_delay * 2 ** attempt) * random.random()
+                if throttled and exc.retry_after:
+                    delay = max(delay, exc.retry_after)
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    def stats(self):
+        return dict(self._stats)
+
+    async def close(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+async def fetch_many(fetch, symbols, **kwargs):
+    """
+    Startet fetch(symbol, **kwargs) für alle Symbole gleichzeitig (die Begrenzung übernimmt der Provider).
+    Gibt (Ergebnisse je Symbol, Fehler je Symbol) zurück; ein fehlgeschlagenes Symbol bricht die anderen nicht ab.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    outcomes = await asyncio.gather(*(fetch(symbol, **kwargs) for symbol in symbols), return_exceptions=True)
+    results, errors = {}, {}
+    for symbol, outcome in zip(symbols, outcomes):
+        if isinstance(outcome, BaseException):
+            errors[symbol] = outcome
+        else:
+            results[symbol] = outcome
+    return results, errors
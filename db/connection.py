@@ -1,15 +1,157 @@
 # db/connection.py
 import psycopg2
+import psycopg2.extensions
+from psycopg2.pool import ThreadedConnectionPool
+from contextlib import contextmanager
 from dotenv import load_dotenv
 import os
+import threading
+import time
 
 load_dotenv()
 
-def connect():
-    return psycopg2.connect(
-        host=os.getenv("DB_HOST"),
-        database=os.getenv("DB_NAME"),
-        user=os.getenv("DB_USER"),
+def _connection_params():
+    return dict(
+        host=os.getenv("DB_HOST", "aws-0-eu-central-1.pooler.supabase.com"),
+        database=os.getenv("DB_NAME", "postgres"),
+        user=os.getenv("DB_USER", "postgres.txhiyzcswuftqgazbuan"),
         password=os.getenv("DB_PASSWORD"),
-        port=int(os.getenv("DB_PORT"))
+        port=int(os.getenv("DB_PORT", "6543"))
     )
+
+def connect():
+    return psycopg2.connect(**_connection_params())
+
+
+class ConnectionPool:
+    """
+    Thread-sicherer Connection-Pool mit fester Ober- und Untergrenze.
+
+    Ist der Pool ausgeschöpft, wartet getconn() auf eine freie Verbindung statt einen Fehler
+    zu werfen. Verbindungen, die länger als health_check_interval Sekunden unbenutzt waren,
+    werden vor der Ausgabe mit SELECT 1 geprüft und bei Bedarf ersetzt.
+    """
+
+    def __init__(self, minconn=1, maxconn=4, health_check_interval=30, **params):
+        self.maxconn = maxconn
+        self.health_check_interval = health_check_interval
+        self._pool = ThreadedConnectionPool(minconn, maxconn, **(params or _connection_params()))
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._last_used = {}
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.replaced = 0
+        self.in_use = 0
+
+    def _is_healthy(self, conn):
+        if conn.closed:
+            return False
+        last_used = self._last_used.get(id(conn))
+        if last_used is None or time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1;")
+            cur.fetchone()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self, timeout=None):
+        if not self._slots.acquire(blocking=False):
+            start = time.perf_counter()
+            acquired = self._slots.acquire(timeout=timeout) if timeout is not None else self._slots.acquire()
+            with self._lock:
+                self.waits += 1
+                self.wait_seconds += time.perf_counter() - start
+            if not acquired:
+                raise TimeoutError("Keine freie Datenbankverbindung im Pool.")
+
+        try:
+            conn = self._pool.getconn()
+            if not self._is_healthy(conn):
+                self._last_used.pop(id(conn), None)
+                self._pool.putconn(conn, close=True)
+                conn = self._pool.getconn()
+                with self._lock:
+                    self.replaced += 1
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+        return conn
+
+    def putconn(self, conn, close=False):
+        try:
+            if not conn.closed and conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                # Offene oder abgebrochene Transaktionen nicht an den nächsten Nutzer weitergeben
+                conn.rollback()
+        except psycopg2.Error:
+            close = True
+        finally:
+            close = close or bool(conn.closed)
+            if close:
+                self._last_used.pop(id(conn), None)
+            else:
+                self._last_used[id(conn)] = time.monotonic()
+            self._pool.putconn(conn, close=close)
+            with self._lock:
+                self.in_use -= 1
+            self._slots.release()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        conn = self.getconn(timeout=timeout)
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def closeall(self):
+        self._pool.closeall()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max": self.maxconn,
+                "in_use": self.in_use,
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "wait_seconds": self.wait_seconds,
+                "replaced": self.replaced,
+            }
+
+
+def create_pool(minconn=1, maxconn=4):
+    """Eigener Connection-Pool, z.B. für parallele Pipeline-Läufe in einem separaten Prozess."""
+    return ConnectionPool(minconn, maxconn)
+
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+def get_pool():
+    """
+    Gemeinsamer Pool für Dashboard, Pipeline und Persistenz (einmal pro Prozess, d.h. auch
+    über Streamlit-Sessions hinweg). Größe über DB_POOL_MIN / DB_POOL_MAX konfigurierbar.
+    """
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = ConnectionPool(
+                int(os.getenv("DB_POOL_MIN", "1")),
+                int(os.getenv("DB_POOL_MAX", "8"))
+            )
+        return _shared_pool
+
+@contextmanager
+def pooled_connection(timeout=None):
+    """Leiht eine Verbindung aus dem gemeinsamen Pool aus und gibt sie danach zurück."""
+    with get_pool().connection(timeout=timeout) as conn:
+        yield conn
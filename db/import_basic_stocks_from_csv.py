@@ -2,33 +2,143 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import pandas as pd
+import psycopg2
 from db.connection import connect
-from db.persistence import save_stock_basic
+from db.persistence import upsert_stocks_basic, get_fresh_symbols, bump_data_version
 from stock_data_yfinance import get_basic_data
 
 # Absoluter Pfad zur symbols.csv
 csv_path = os.path.join(os.path.dirname(__file__), "symbols.csv")
-# Daten aus der CSV lesen
-symbol_list = pd.read_csv(csv_path, header=None)[0].tolist()
+# Fortschritt eines abgebrochenen Imports (wird nach erfolgreichem Lauf gelöscht)
+CHECKPOINT_PATH = os.path.join(os.path.dirname(__file__), ".import_checkpoint.json")
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return {"done": [], "failed": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_checkpoint(path, checkpoint):
+    # Erst in eine temporäre Datei schreiben, damit ein Absturz keine halbe Datei hinterlässt
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
 
-# Verbindung zur Datenbank aufbauen
-conn = connect()
 
-# Durch alle Symbole iterieren und speichern
-for symbol in symbol_list:
+def fetch_basic(symbol):
     basic_data = get_basic_data(symbol)
-    if basic_data:  # Nur wenn Daten vorhanden sind
-        save_stock_basic(
-            conn,
-            symbol=symbol.upper(),
-            name=basic_data.get("name"),
-            sector=basic_data.get("sector"),
-            industry=basic_data.get("industry")
-        )
-        print(f"{symbol} erfolgreich gespeichert.")
-    else:
-        print(f"{symbol} übersprungen (keine Daten).")
-
-conn.close()
-print("✅ Import abgeschlossen.")
+    if not basic_data or not basic_data.get("name"):
+        raise ValueError("keine Daten")
+    return (symbol, basic_data.get("name"), basic_data.get("sector"), basic_data.get("industry"))
+
+
+def import_symbols(conn, symbols, max_workers=8, batch_size=100, max_age_days=30, checkpoint_path=CHECKPOINT_PATH):
+    """
+    Importiert die Stammdaten der Symbole: Abruf parallel mit max_workers Threads, geschrieben wird
+    in Batches von batch_size Symbolen (ein mehrzeiliger Upsert und ein Commit je Batch). Scheitert
+    ein Batch an einzelnen Zeilen, wird er Zeile für Zeile wiederholt; fehlerhafte Zeilen landen in failed.
+    Symbole mit frischen Stammdaten (jünger als max_age_days) und die laut Checkpoint bereits
+    importierten werden übersprungen. Gibt ein Dict mit Zählern, Fehlern und Dauer zurück.
+    """
+    symbols = list(dict.fromkeys(s.strip().upper() for s in symbols if s and s.strip()))
+    checkpoint = load_checkpoint(checkpoint_path)
+    skip = get_fresh_symbols(conn, max_age_days) | set(checkpoint["done"])
+    pending = [s for s in symbols if s not in skip]
+    print(f"{len(symbols)} Symbole, {len(symbols) - len(pending)} aktuell oder bereits importiert, "
+          f"{len(pending)} zu laden.")
+
+    start = time.perf_counter()
+    batch, failed, written = [], {}, 0
+
+    def flush():
+        nonlocal batch, written
+        try:
+            written += upsert_stocks_basic(conn, batch)
+            done = [row[0] for row in batch]
+        except (psycopg2.DataError, psycopg2.IntegrityError, ValueError):
+            # Eine fehlerhafte Zeile (z.B. zu langer Name, NUL-Zeichen) lässt den ganzen Batch scheitern:
+            # zurückrollen und einzeln schreiben, damit nur die fehlerhaften Symbole ausfallen
+            conn.rollback()
+            done = []
+            for row in batch:
+                try:
+                    written += upsert_stocks_basic(conn, [row])
+                    done.append(row[0])
+                except (psycopg2.DataError, psycopg2.IntegrityError, ValueError) as e:
+                    conn.rollback()
+                    failed[row[0]] = str(e)
+        checkpoint["done"].extend(done)
+        checkpoint["failed"] = failed
+        save_checkpoint(checkpoint_path, checkpoint)
+        batch = []
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(fetch_basic, symbol): symbol for symbol in pending}
+        for i, future in enumerate(as_completed(futures), start=1):
+            symbol = futures[future]
+            try:
+                batch.append(future.result())
+            except Exception as e:
+                failed[symbol] = str(e)
+            if len(batch) >= batch_size:
+                flush()
+            if i % batch_size == 0:
+                elapsed = time.perf_counter() - start
+                print(f"  {i}/{len(pending)} geladen ({i / elapsed:.1f} Symbole/s)")
+    flush()
+    if written:
+        # Dashboard-Caches neu laden (der Symbol-Suchindex folgt dem Stand von stocks selbst)
+        bump_data_version(conn)
+
+    # Vollständig durchgelaufen: nächster Start beginnt von vorn (bis auf frische Symbole)
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    return {
+        "total": len(symbols),
+        "skipped": len(symbols) - len(pending),
+        "written": written,
+        "failed": failed,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stammdaten aller Symbole aus symbols.csv importieren")
+    parser.add_argument("--workers", type=int, default=8, help="Anzahl paralleler Abrufe")
+    parser.add_argument("--batch-size", type=int, default=100, help="Symbole je Schreib-Transaktion")
+    parser.add_argument("--max-age-days", type=int, default=30, help="Jüngere Stammdaten nicht neu laden")
+    parser.add_argument("--restart", action="store_true", help="Checkpoint verwerfen und neu beginnen")
+    args = parser.parse_args()
+
+    if args.restart and os.path.exists(CHECKPOINT_PATH):
+        os.remove(CHECKPOINT_PATH)
+
+    # Daten aus der CSV lesen
+    symbol_list = pd.read_csv(csv_path, header=None)[0].tolist()
+
+    # Verbindung zur Datenbank aufbauen
+    conn = connect()
+    try:
+        stats = import_symbols(conn, symbol_list, max_workers=args.workers, batch_size=args.batch_size,
+                               max_age_days=args.max_age_days)
+    finally:
+        conn.close()
+
+    loaded = stats["written"] + len(stats["failed"])
+    rate = loaded / stats["seconds"] if stats["seconds"] else 0.0
+    print(f"✅ Import abgeschlossen: {stats['written']} gespeichert, {stats['skipped']} übersprungen, "
+          f"{len(stats['failed'])} fehlgeschlagen in {stats['seconds']:.1f}s ({rate:.1f} Symbole/s).")
+    if stats["failed"]:
+        print("Fehlgeschlagen:")
+        for symbol, error in sorted(stats["failed"].items()):
+            print(f"  {symbol}: {error}")
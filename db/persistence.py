@@ -1,47 +1,218 @@
 # db/persistence.py
 # schreiben in die Datenbank
 
+import io
+import time
+
 import pandas as pd
-import yfinance as yf
+import psycopg2
+import psycopg2.errors
+import stock_data_yfinance
+from psycopg2.extras import execute_values
 from .connection import connect
+from .schema import ensure_intraday_partitions
+from instrumentation import count
 
 def save_stock_basic(conn, symbol, name=None, sector=None, industry=None):
+    """
+    Legt das Symbol in stocks an. Existiert es schon (z.B. vom Intraday-Abruf ohne Stammdaten),
+    werden nur fehlende Felder ergänzt; vorhandene Stammdaten bleiben unverändert.
+    """
     cur = conn.cursor()
     cur.execute("""
         INSERT INTO stocks (symbol, name, sector, industry)
         VALUES (%s, %s, %s, %s)
-        ON CONFLICT (symbol) DO NOTHING;
+        ON CONFLICT (symbol) DO UPDATE SET
+            name = COALESCE(stocks.name, EXCLUDED.name),
+            sector = COALESCE(stocks.sector, EXCLUDED.sector),
+            industry = COALESCE(stocks.industry, EXCLUDED.industry),
+            updated_at = now()
+        WHERE (stocks.name IS NULL AND EXCLUDED.name IS NOT NULL)
+           OR (stocks.sector IS NULL AND EXCLUDED.sector IS NOT NULL)
+           OR (stocks.industry IS NULL AND EXCLUDED.industry IS NOT NULL);
     """, (symbol, name, sector, industry))
     conn.commit()
 
-def insert_fundamentals(conn, symbol, data):
+def upsert_stocks_basic(conn, rows, page_size=500):
+    """
+    Schreibt Stammdaten vieler Symbole in einer Transaktion per mehrzeiligem Upsert.
+    rows: Tupel (symbol, name, sector, industry); vorhandene Werte werden nur durch neue
+    Nicht-NULL-Werte ersetzt, updated_at wird gesetzt.
+    """
+    if not rows:
+        return 0
     cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO fundamentals (
-            stock_symbol, market_cap, enterprise_value, revenue, ebitda,
-            pe_ratio, dividend_yield, dividend_per_share, beta
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s);
-    """, (
-        symbol,
-        data.get("Marktkapitalisierung (Market Cap)"),
-        data.get("Unternehmenswert (Enterprise Value)"),
-        data.get("Umsatz (Revenue)"),
-        data.get("EBITDA"),
-        data.get("KGV (PE Ratio)"),
-        data.get("Dividendenrendite (%)"),
-        data.get("Dividende je Aktie"),
-        data.get("Beta")
-    ))
+    execute_values(cur, """
+        INSERT INTO stocks (symbol, name, sector, industry, updated_at) VALUES %s
+        ON CONFLICT (symbol) DO UPDATE SET
+            name = COALESCE(EXCLUDED.name, stocks.name),
+            sector = COALESCE(EXCLUDED.sector, stocks.sector),
+            industry = COALESCE(EXCLUDED.industry, stocks.industry),
+            updated_at = EXCLUDED.updated_at
+    """, list(rows), template="(%s, %s, %s, %s, now())", page_size=page_size)
     conn.commit()
+    return len(rows)
 
-def insert_prices(conn, symbol, df):
+def get_fresh_symbols(conn, max_age_days):
+    """Symbole, deren Stammdaten vollständig sind und jünger als max_age_days Tage"""
     cur = conn.cursor()
+    cur.execute("""
+        SELECT symbol FROM stocks
+        WHERE name IS NOT NULL
+          AND updated_at >= now() - make_interval(days => %s);
+    """, (int(max_age_days),))
+    return {row[0] for row in cur.fetchall()}
+
+# Spalten der Fundamentaldaten mit SQL-Typ und Schlüssel im Dict von get_fundamentals
+FUNDAMENTAL_FIELDS = [
+    ("market_cap", "bigint", "Marktkapitalisierung (Market Cap)"),
+    ("enterprise_value", "bigint", "Unternehmenswert (Enterprise Value)"),
+    ("revenue", "bigint", "Umsatz (Revenue)"),
+    ("ebitda", "bigint", "EBITDA"),
+    ("pe_ratio", "float", "KGV (PE Ratio)"),
+    ("dividend_yield", "float", "Dividendenrendite (%)"),
+    ("dividend_per_share", "float", "Dividende je Aktie"),
+    ("beta", "float", "Beta"),
+]
+_FUNDAMENTAL_COLUMNS = ", ".join(name for name, _, _ in FUNDAMENTAL_FIELDS)
+
+
+def insert_fundamentals(conn, symbol, data, as_of=None):
+    """
+    Speichert die Fundamentaldaten als Snapshot zum Stichtag as_of (Standard: heute).
+    Stimmen alle Werte mit dem vorherigen Snapshot überein, wird keine Zeile angelegt und ein am
+    selben Tag schon geschriebener Snapshot wieder entfernt (die Werte gelten dann unverändert weiter);
+    sonst überschreibt ein erneuter Abruf am selben Tag dessen Snapshot.
+    Gibt True zurück, wenn sich etwas geändert hat.
+    """
+    params = [data.get(key) for _, _, key in FUNDAMENTAL_FIELDS]
+    if all(value is None for value in params):
+        # Fehlgeschlagener Abruf: den letzten Snapshot nicht mit NULL-Werten überschreiben
+        return False
+    cur = conn.cursor()
+    names = [name for name, _, _ in FUNDAMENTAL_FIELDS]
+    values = ", ".join(f"%s::{sql_type} AS {name}" for name, sql_type, _ in FUNDAMENTAL_FIELDS)
+    updates = ",\n                ".join(f"{name} = EXCLUDED.{name}" for name in names)
+    cur.execute(f"""
+        WITH incoming AS (
+            SELECT %s::varchar AS stock_symbol, COALESCE(%s::date, CURRENT_DATE) AS as_of, {values}
+        ),
+        previous AS (
+            SELECT f.*
+            FROM fundamentals f, incoming
+            WHERE f.stock_symbol = incoming.stock_symbol AND f.as_of < incoming.as_of
+            ORDER BY f.as_of DESC
+            LIMIT 1
+        ),
+        unchanged AS (
+            SELECT EXISTS (
+                SELECT 1 FROM previous, incoming
+                WHERE ({", ".join(f"previous.{name}" for name in names)})
+                      IS NOT DISTINCT FROM
+                      ({", ".join(f"incoming.{name}" for name in names)})
+            ) AS value
+        ),
+        removed AS (
+            DELETE FROM fundamentals f
+            USING incoming
+            WHERE f.stock_symbol = incoming.stock_symbol AND f.as_of = incoming.as_of
+              AND (SELECT value FROM unchanged)
+            RETURNING 1
+        ),
+        upserted AS (
+            INSERT INTO fundamentals (stock_symbol, as_of, {_FUNDAMENTAL_COLUMNS})
+            SELECT stock_symbol, as_of, {_FUNDAMENTAL_COLUMNS}
+            FROM incoming
+            WHERE NOT (SELECT value FROM unchanged)
+            ON CONFLICT (stock_symbol, as_of) DO UPDATE SET
+                {updates}
+            WHERE ({", ".join(f"fundamentals.{name}" for name in names)})
+                  IS DISTINCT FROM
+                  ({", ".join(f"EXCLUDED.{name}" for name in names)})
+            RETURNING 1
+        )
+        SELECT (SELECT count(*) FROM removed) + (SELECT count(*) FROM upserted);
+    """, (symbol, as_of, *params))
+    written = cur.fetchone()[0] > 0
+    conn.commit()
+    return written
+
+PRICE_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def _price_frame(symbol, df):
+    """
+    Bringt einen yfinance-Kursverlauf spaltenweise in das Format von prices_daily.
+    NaN-Werte werden vektorisiert behandelt, Volume wird als nullable Integer geführt.
+    """
+    frame = pd.DataFrame({
+        "stock_symbol": symbol,
+        "date": pd.DatetimeIndex(df.index).date,
+    })
+    for col in PRICE_COLUMNS[:-1]:
+        frame[col.lower()] = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64")
+    frame["volume"] = pd.to_numeric(df["Volume"], errors="coerce").round().astype("Int64").array
+    # Doppelte Tage würden den Upsert auf (stock_symbol, date) scheitern lassen
+    return frame.drop_duplicates(subset=["date"], keep="last")
+
+
+PRICE_UPSERT = """
+    ON CONFLICT (stock_symbol, date) DO UPDATE SET
+        open = EXCLUDED.open,
+        high = EXCLUDED.high,
+        low = EXCLUDED.low,
+        close = EXCLUDED.close,
+        volume = EXCLUDED.volume
+"""
+
+
+def _copy_prices(cur, frame):
+    # Gesamten Frame als CSV in einem Rutsch per COPY in eine Staging-Tabelle übertragen
+    # (leeres Feld = NULL) und von dort per Upsert übernehmen
+    buffer = io.StringIO()
+    frame.to_csv(buffer, header=False, index=False, na_rep="")
+    count("bytes_copied.prices", buffer.tell())
+    buffer.seek(0)
+    cur.execute("""
+        CREATE TEMP TABLE prices_staging (
+            stock_symbol VARCHAR(10),
+            date DATE,
+            open FLOAT,
+            high FLOAT,
+            low FLOAT,
+            close FLOAT,
+            volume BIGINT
+        ) ON COMMIT DROP;
+    """)
+    cur.copy_expert(
+        "COPY prices_staging (stock_symbol, date, open, high, low, close, volume) "
+        "FROM STDIN WITH (FORMAT csv)",
+        buffer
+    )
+    cur.execute("""
+        INSERT INTO prices_daily (stock_symbol, date, open, high, low, close, volume)
+        SELECT stock_symbol, date, open, high, low, close, volume FROM prices_staging
+    """ + PRICE_UPSERT)
+
+
+def _values_prices(cur, frame, page_size=1000):
+    # Fallback: mehrzeilige INSERT ... VALUES in Batches
+    rows = frame.astype(object).where(frame.notna(), None).itertuples(index=False, name=None)
+    execute_values(cur, """
+        INSERT INTO prices_daily (
+            stock_symbol, date, open, high, low, close, volume
+        ) VALUES %s
+    """ + PRICE_UPSERT, list(rows), page_size=page_size)
+
+
+def _rowwise_prices(cur, symbol, df):
+    # Ursprünglicher Pfad: ein INSERT pro Handelstag (nur noch zum Vergleich)
     for date, row in df.iterrows():
         cur.execute("""
             INSERT INTO prices_daily (
                 stock_symbol, date, open, high, low, close, volume
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s);
-        """, (
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """ + PRICE_UPSERT, (
             symbol,
             date.date(),
             float_or_none(row.get("Open")),
@@ -50,13 +221,280 @@ def insert_prices(conn, symbol, df):
             float_or_none(row.get("Close")),
             int(row.get("Volume")) if not pd.isna(row.get("Volume")) else None
         ))
+
+
+def insert_prices(conn, symbol, df, method="copy"):
+    """
+    Schreibt den Kursverlauf eines Symbols per Upsert auf (stock_symbol, date) in prices_daily.
+    Bereits vorhandene Tage werden aktualisiert, es wird nichts gelöscht.
+
+    method: "copy" (COPY FROM STDIN), "values" (mehrzeiliges INSERT) oder "rows" (ein INSERT je Zeile).
+    Schlägt COPY fehl (z.B. weil der Pooler es nicht unterstützt), wird auf "values" zurückgegriffen;
+    Integritäts- und Datenfehler werden nach einem Rollback weitergereicht.
+    Gibt ein Dict mit Zeilenanzahl, Methode und Dauer in Sekunden zurück.
+    """
+    start = time.perf_counter()
+    cur = conn.cursor()
+
+    if method == "rows":
+        _rowwise_prices(cur, symbol, df)
+    else:
+        frame = _price_frame(symbol, df)
+        if method == "copy":
+            try:
+                _copy_prices(cur, frame)
+            except (psycopg2.IntegrityError, psycopg2.DataError):
+                # Fehler in den Daten selbst (Fremdschlüssel, Wertebereich): VALUES würde genauso
+                # scheitern und die eigentliche Ursache verdecken
+                conn.rollback()
+                raise
+            except psycopg2.Error as e:
+                print(f"COPY fehlgeschlagen, nutze VALUES-Fallback: {e}")
+                count("errors.copy_fallback")
+                conn.rollback()
+                cur = conn.cursor()
+                method = "values"
+        if method == "values":
+            _values_prices(cur, frame)
+    conn.commit()
+
+    return {
+        "rows": len(df) if method == "rows" else len(frame),
+        "method": method,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+INTRADAY_UPSERT = """
+    ON CONFLICT (stock_symbol, interval, ts) DO UPDATE SET
+        open = EXCLUDED.open,
+        high = EXCLUDED.high,
+        low = EXCLUDED.low,
+        close = EXCLUDED.close,
+        volume = EXCLUDED.volume
+    WHERE (prices_intraday.open, prices_intraday.high, prices_intraday.low,
+           prices_intraday.close, prices_intraday.volume)
+          IS DISTINCT FROM
+          (EXCLUDED.open, EXCLUDED.high, EXCLUDED.low, EXCLUDED.close, EXCLUDED.volume)
+"""
+
+
+def _intraday_frame(symbol, interval, df):
+    """
+    Bringt Intraday-Kurse (DatetimeIndex mit Zeitzone, Spalten wie PRICE_COLUMNS) spaltenweise
+    in das Format von prices_intraday.
+    """
+    index = pd.DatetimeIndex(df.index)
+    frame = pd.DataFrame({
+        "stock_symbol": symbol,
+        "interval": interval,
+        "ts": index.tz_convert("UTC") if index.tz is not None else index.tz_localize("UTC"),
+    })
+    for col in PRICE_COLUMNS[:-1]:
+        frame[col.lower()] = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64")
+    frame["volume"] = pd.to_numeric(df["Volume"], errors="coerce").round().astype("Int64").array
+    # Überlappende Abrufe liefern dieselben Bars mehrfach
+    return frame.drop_duplicates(subset=["ts"], keep="last")
+
+
+def insert_intraday(conn, symbol, interval, df):
+    """
+    Schreibt Intraday-Kurse eines Symbols per COPY in eine Staging-Tabelle und von dort per Upsert
+    auf (stock_symbol, interval, ts) in prices_intraday. Bars aus überlappenden Zeitfenstern werden
+    nur geschrieben, wenn sich ihre Werte geändert haben. Fehlende Monatspartitionen werden angelegt.
+    Gibt ein Dict mit Zeilenanzahl (geladen/geschrieben) und Dauer in Sekunden zurück.
+    """
+    start = time.perf_counter()
+    frame = _intraday_frame(symbol, interval, df)
+    if frame.empty:
+        return {"rows": 0, "written": 0, "seconds": 0.0}
+
+    cur = conn.cursor()
+    ensure_intraday_partitions(cur, zip(frame["ts"].dt.year, frame["ts"].dt.month))
+
+    buffer = io.StringIO()
+    frame.to_csv(buffer, header=False, index=False, na_rep="", date_format="%Y-%m-%d %H:%M:%S%z")
+    count("bytes_copied.intraday", buffer.tell())
+    buffer.seek(0)
+    cur.execute("""
+        CREATE TEMP TABLE intraday_staging (
+            stock_symbol VARCHAR(10),
+            interval VARCHAR(5),
+            ts TIMESTAMPTZ,
+            open FLOAT,
+            high FLOAT,
+            low FLOAT,
+            close FLOAT,
+            volume BIGINT
+        ) ON COMMIT DROP;
+    """)
+    cur.copy_expert(
+        "COPY intraday_staging (stock_symbol, interval, ts, open, high, low, close, volume) "
+        "FROM STDIN WITH (FORMAT csv)",
+        buffer
+    )
+    cur.execute("""
+        INSERT INTO prices_intraday (stock_symbol, interval, ts, open, high, low, close, volume)
+        SELECT stock_symbol, interval, ts, open, high, low, close, volume FROM intraday_staging
+    """ + INTRADAY_UPSERT)
+    written = cur.rowcount
+    conn.commit()
+
+    return {"rows": len(frame), "written": written, "seconds": time.perf_counter() - start}
+
+
+def get_latest_intraday_ts(conn, symbol, interval):
+    """Jüngster gespeicherter Zeitstempel eines Symbols und Intervalls oder None"""
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT MAX(ts) FROM prices_intraday
+        WHERE stock_symbol = %s AND interval = %s;
+    """, (symbol, interval))
+    return cur.fetchone()[0]
+
+
+def get_latest_price_dates(conn, symbols):
+    """
+    Liefert je Symbol das jüngste gespeicherte Datum aus prices_daily.
+    Symbole ohne Kursdaten fehlen im Ergebnis.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT stock_symbol, MAX(date)
+        FROM prices_daily
+        WHERE stock_symbol = ANY(%s)
+        GROUP BY stock_symbol;
+    """, (list(symbols),))
+    return {symbol: latest for symbol, latest in cur.fetchall()}
+
+def get_closes(conn, symbol, since=None, before=None, limit=None):
+    """
+    Liefert (Datum, Schlusskurs) eines Symbols aufsteigend sortiert.
+    Mit before und limit werden die letzten limit Kurse vor diesem Datum geliefert.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT date, close FROM (
+            SELECT date, close
+            FROM prices_daily
+            WHERE stock_symbol = %(symbol)s
+              AND (%(since)s::date IS NULL OR date >= %(since)s::date)
+              AND (%(before)s::date IS NULL OR date < %(before)s::date)
+            ORDER BY date DESC
+            LIMIT %(limit)s
+        ) AS last_rows
+        ORDER BY date;
+    """, {"symbol": symbol, "since": since, "before": before, "limit": limit})
+    rows = cur.fetchall()
+    return [row[0] for row in rows], [row[1] for row in rows]
+
+
+def get_indicator_state(conn, symbol, before):
+    """
+    Letzte materialisierte Indikatorzeile vor before: (Datum, avg_gain_14, avg_loss_14) oder None.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT date, avg_gain_14, avg_loss_14
+        FROM indicators_daily
+        WHERE stock_symbol = %s AND date < %s
+        ORDER BY date DESC
+        LIMIT 1;
+    """, (symbol, before))
+    return cur.fetchone()
+
+
+def upsert_indicators(conn, symbol, dates, values, columns):
+    """
+    Schreibt materialisierte Indikatoren (Dict Spalte -> Array je Datum) per Upsert in indicators_daily.
+    """
+    frame = pd.DataFrame({"date": dates, **{col: values[col] for col in columns}})
+    frame.insert(0, "stock_symbol", symbol)
+    rows = frame.astype(object).where(frame.notna(), None).itertuples(index=False, name=None)
+    column_list = ", ".join(["stock_symbol", "date"] + columns)
+    updates = ", ".join(f"{col} = EXCLUDED.{col}" for col in columns)
+
+    cur = conn.cursor()
+    execute_values(cur, f"""
+        INSERT INTO indicators_daily ({column_list}) VALUES %s
+        ON CONFLICT (stock_symbol, date) DO UPDATE SET {updates}
+    """, list(rows), page_size=1000)
+    conn.commit()
+    return len(frame)
+
+def create_portfolio(conn, name):
+    """Legt ein Portfolio an (oder liefert das vorhandene mit diesem Namen) und gibt die id zurück"""
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO portfolios (name) VALUES (%s)
+        ON CONFLICT (name) DO UPDATE SET name = EXCLUDED.name
+        RETURNING id;
+    """, (name,))
+    portfolio_id = cur.fetchone()[0]
+    conn.commit()
+    return portfolio_id
+
+def add_transaction(conn, portfolio_id, symbol, date, quantity, price=None):
+    """
+    Bucht einen Kauf (quantity > 0) oder Verkauf (quantity < 0). Ohne price gilt der Schlusskurs des Tages.
+    Bereits berechnete Portfoliowerte ab diesem Datum werden verworfen und beim nächsten Refresh neu berechnet.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO portfolio_transactions (portfolio_id, stock_symbol, date, quantity, price)
+        VALUES (%s, %s, %s, %s, %s);
+    """, (portfolio_id, symbol, date, quantity, price))
+    cur.execute("DELETE FROM portfolio_values WHERE portfolio_id = %s AND date >= %s;", (portfolio_id, date))
     conn.commit()
 
+def get_portfolio_transactions(conn):
+    """Alle Transaktionen aller Portfolios (portfolio_id, name, symbol, date, quantity, price)"""
+    return pd.read_sql("""
+        SELECT t.portfolio_id, p.name, t.stock_symbol AS symbol, t.date, t.quantity, t.price
+        FROM portfolio_transactions t
+        JOIN portfolios p ON p.id = t.portfolio_id
+        ORDER BY t.portfolio_id, t.date, t.id
+    """, conn)
+
+def get_last_portfolio_values(conn):
+    """Je Portfolio das letzte berechnete Datum und der Wert an diesem Tag"""
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT DISTINCT ON (portfolio_id) portfolio_id, date, value
+        FROM portfolio_values
+        ORDER BY portfolio_id, date DESC;
+    """)
+    return {portfolio_id: (date, value) for portfolio_id, date, value in cur.fetchall()}
+
+def upsert_portfolio_values(conn, frame):
+    """Schreibt Portfoliowerte (portfolio_id, date, value, daily_return) per Upsert"""
+    rows = frame[["portfolio_id", "date", "value", "daily_return"]].astype(object)
+    rows = rows.where(rows.notna(), None).itertuples(index=False, name=None)
+    cur = conn.cursor()
+    execute_values(cur, """
+        INSERT INTO portfolio_values (portfolio_id, date, value, daily_return) VALUES %s
+        ON CONFLICT (portfolio_id, date) DO UPDATE SET
+            value = EXCLUDED.value,
+            daily_return = EXCLUDED.daily_return
+    """, list(rows), page_size=1000)
+    conn.commit()
+    return len(frame)
+
+def get_portfolio_returns(conn, since=None):
+    """Gespeicherte Tagesrenditen aller Portfolios (portfolio_id, date, value, daily_return)"""
+    return pd.read_sql("""
+        SELECT portfolio_id, date, value, daily_return
+        FROM portfolio_values
+        WHERE %(since)s::date IS NULL OR date >= %(since)s::date
+        ORDER BY portfolio_id, date
+    """, conn, params={"since": since})
+
 def clear_old_data(conn):
     cur = conn.cursor()
+    # Fundamentaldaten bleiben als Historie (Snapshots je Stichtag) erhalten
     cur.execute("DELETE FROM prices_daily;")
-    cur.execute("DELETE FROM fundamentals;")
     conn.commit()
+    bump_data_version(conn)
 
 def float_or_none(value):
     return float(value) if pd.notna(value) else None
@@ -64,16 +502,52 @@ def float_or_none(value):
 def is_valid_symbol(symbol: str) -> bool:
     """
     Prüft, ob das eingegebene Symbol gültig ist (d.h. Daten existieren bei yfinance).
+    Nutzt den gemeinsamen Info-Cache aus stock_data_yfinance.
     """
-    try:
-        ticker = yf.Ticker(symbol)
-        info = ticker.info
-        return bool(info and "longName" in info)
-    except Exception:
-        return False
+    return stock_data_yfinance.is_valid_symbol(symbol)
 
 def get_symbol_name_mapping(conn):
     cur = conn.cursor()
     cur.execute("SELECT symbol, name FROM stocks;")
     rows = cur.fetchall()
     return {symbol: name for symbol, name in rows if name}
+
+def bump_data_version(conn):
+    """
+    Erhöht den Datenstand, damit gecachte Dashboard-Abfragen neu geladen werden.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO data_version (id, version) VALUES (1, 1)
+        ON CONFLICT (id) DO UPDATE SET
+            version = data_version.version + 1,
+            updated_at = now()
+        RETURNING version;
+    """)
+    version = cur.fetchone()[0]
+    conn.commit()
+    return version
+
+def get_data_version(conn):
+    """
+    Liefert den aktuellen Datenstand oder None, falls die Tabelle data_version fehlt.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT version FROM data_version WHERE id = 1;")
+    except psycopg2.errors.UndefinedTable:
+        conn.rollback()
+        return None
+    row = cur.fetchone()
+    return row[0] if row else 0
+
+
+def get_stocks_version(conn):
+    """
+    Stand der Tabelle stocks (Anzahl Symbole und letzte Änderung der Stammdaten). Ändert sich nur
+    durch neue Symbole oder Stammdaten, nicht bei jedem Kurs-Update wie data_version.
+    """
+    cur = conn.cursor()
+    cur.execute("SELECT count(*), max(updated_at) FROM stocks;")
+    count, updated_at = cur.fetchone()
+    return f"{count}:{updated_at.isoformat() if updated_at else ''}"
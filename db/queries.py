@@ -0,0 +1,143 @@
+# db/queries.py
+# lesende Abfragen für das Dashboard
+
+import pandas as pd
+
+def get_price_date_bounds(conn, symbols):
+    """
+    Liefert (erstes Datum, letztes Datum) der gespeicherten Kurse für die Symbole,
+    (None, None) wenn keine Kurse vorhanden sind.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT MIN(date), MAX(date)
+        FROM prices_daily
+        WHERE stock_symbol = ANY(%s);
+    """, (list(symbols),))
+    return cur.fetchone()
+
+def load_prices(conn, symbols, start=None, end=None):
+    """
+    Lädt die Tageskurse der Symbole im Zeitraum [start, end] (jeweils optional).
+    Filter und Sortierung laufen in der Datenbank über den Index (stock_symbol, date).
+    """
+    query = """
+        SELECT stock_symbol as symbol, date as datum, close as price, volume, open, high, low
+        FROM prices_daily
+        WHERE stock_symbol = ANY(%(symbols)s)
+          AND (%(start)s::date IS NULL OR date >= %(start)s::date)
+          AND (%(end)s::date IS NULL OR date <= %(end)s::date)
+        ORDER BY stock_symbol, date
+    """
+    params = {"symbols": list(symbols), "start": start, "end": end}
+    return pd.read_sql(query, conn, params=params)
+
+def load_closes(conn, symbols, start=None, end=None):
+    """
+    Lädt nur die Schlusskurse (symbol, datum, price) der Symbole im Zeitraum [start, end],
+    z.B. für Renditen und Korrelationen über viele Symbole.
+    """
+    query = """
+        SELECT stock_symbol as symbol, date as datum, close as price
+        FROM prices_daily
+        WHERE stock_symbol = ANY(%(symbols)s)
+          AND (%(start)s::date IS NULL OR date >= %(start)s::date)
+          AND (%(end)s::date IS NULL OR date <= %(end)s::date)
+        ORDER BY stock_symbol, date
+    """
+    params = {"symbols": list(symbols), "start": start, "end": end}
+    return pd.read_sql(query, conn, params=params)
+
+FUNDAMENTAL_SELECT = """
+               stock_symbol       as symbol,
+               as_of              as stand,
+               market_cap         as marktkapitalisierung,
+               enterprise_value   as unternehmenswert,
+               revenue            as umsatz,
+               ebitda,
+               pe_ratio           as kgv,
+               dividend_yield     as dividendenrendite,
+               dividend_per_share as dividende_je_aktie,
+               beta
+"""
+
+def load_fundamentals(conn, symbols, as_of=None):
+    """
+    Lädt genau eine Zeile Fundamentaldaten je Symbol: die aktuellen Werte (letzter Snapshot)
+    oder mit as_of den zum Stichtag gültigen Snapshot (letzter Snapshot <= as_of).
+    """
+    # Je Symbol ein Rückwärts-Indexscan auf (stock_symbol, as_of). Nicht über die View
+    # fundamentals_latest: deren Filter auf stock_symbol wird nicht in den LATERAL-Join über stocks
+    # geschoben, sie würde für jede Aktie ausgewertet.
+    query = f"""
+        SELECT {FUNDAMENTAL_SELECT}
+        FROM unnest(%(symbols)s::varchar[]) AS s(symbol)
+        CROSS JOIN LATERAL (
+            SELECT *
+            FROM fundamentals
+            WHERE stock_symbol = s.symbol
+              AND (%(as_of)s::date IS NULL OR as_of <= %(as_of)s::date)
+            ORDER BY as_of DESC
+            LIMIT 1
+        ) f
+        ORDER BY stock_symbol
+    """
+    return pd.read_sql(query, conn, params={"symbols": list(symbols), "as_of": as_of})
+
+def load_fundamentals_history(conn, symbols, start=None, end=None):
+    """
+    Alle Snapshots der Symbole im Zeitraum [start, end], eine Zeile je Änderung.
+    Der zu Beginn des Zeitraums gültige Snapshot ist enthalten, auch wenn er älter ist.
+    """
+    query = f"""
+        SELECT {FUNDAMENTAL_SELECT}
+        FROM fundamentals f
+        WHERE stock_symbol = ANY(%(symbols)s)
+          AND (%(end)s::date IS NULL OR as_of <= %(end)s::date)
+          AND (%(start)s::date IS NULL OR as_of >= (
+              SELECT COALESCE(MAX(p.as_of), %(start)s::date)
+              FROM fundamentals p
+              WHERE p.stock_symbol = f.stock_symbol AND p.as_of <= %(start)s::date
+          ))
+        ORDER BY stock_symbol, as_of
+    """
+    params = {"symbols": list(symbols), "start": start, "end": end}
+    return pd.read_sql(query, conn, params=params)
+
+def load_indicators(conn, symbols, start=None, end=None):
+    """
+    Lädt Kurse mit den von der Pipeline materialisierten Indikatoren im Zeitraum [start, end].
+    Tage ohne materialisierte Indikatoren fehlen im Ergebnis.
+    """
+    query = """
+        SELECT p.stock_symbol as symbol, p.date as datum, p.close as price,
+               i.sma_20, i.sma_50, i.rsi_14, i.volatility_20, i.bb_upper, i.bb_lower
+        FROM prices_daily p
+        JOIN indicators_daily i ON i.stock_symbol = p.stock_symbol AND i.date = p.date
+        WHERE p.stock_symbol = ANY(%(symbols)s)
+          AND (%(start)s::date IS NULL OR p.date >= %(start)s::date)
+          AND (%(end)s::date IS NULL OR p.date <= %(end)s::date)
+        ORDER BY p.stock_symbol, p.date
+    """
+    params = {"symbols": list(symbols), "start": start, "end": end}
+    return pd.read_sql(query, conn, params=params)
+
+def load_latest_closes(conn, symbols):
+    """Letzter gespeicherter Schlusskurs je Symbol (symbol, datum, price)"""
+    query = """
+        SELECT DISTINCT ON (stock_symbol) stock_symbol as symbol, date as datum, close as price
+        FROM prices_daily
+        WHERE stock_symbol = ANY(%(symbols)s)
+        ORDER BY stock_symbol, date DESC
+    """
+    return pd.read_sql(query, conn, params={"symbols": list(symbols)})
+
+def load_portfolio_values(conn, portfolio_id):
+    """Wertreihe eines Portfolios (datum, wert, rendite)"""
+    query = """
+        SELECT date as datum, value as wert, daily_return as rendite
+        FROM portfolio_values
+        WHERE portfolio_id = %(portfolio_id)s
+        ORDER BY date
+    """
+    return pd.read_sql(query, conn, params={"portfolio_id": portfolio_id})
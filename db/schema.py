@@ -1,4 +1,11 @@
-def create_tables(conn):
+import datetime
+
+
+def create_tables(conn, partition_by_year=False, years=None):
+    """
+    Legt alle Tabellen an. Mit partition_by_year wird prices_daily als nach Jahren
+    partitionierte Tabelle angelegt (Partitionen für years, Standard: letzte 5 Jahre bis nächstes Jahr).
+    """
     cur = conn.cursor()
 
     cur.execute("""
@@ -6,13 +13,19 @@ def create_tables(conn):
             symbol VARCHAR(10) PRIMARY KEY,
             name TEXT,
             sector TEXT,
-            industry TEXT
+            industry TEXT,
+            updated_at TIMESTAMPTZ
         );
     """)
+    # Bestehende Datenbanken: Zeitpunkt der letzten Aktualisierung der Stammdaten (Bulk-Import)
+    cur.execute("ALTER TABLE stocks ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ;")
 
+    # Fundamentaldaten als datierte Snapshots: eine Zeile je Symbol und Stichtag, an dem sich ein
+    # Wert geändert hat (unveränderte Abrufe legen keine neue Zeile an, siehe insert_fundamentals)
     cur.execute("""
         CREATE TABLE IF NOT EXISTS fundamentals (
             stock_symbol VARCHAR(10) NOT NULL REFERENCES stocks(symbol) ON DELETE CASCADE,
+            as_of DATE NOT NULL DEFAULT CURRENT_DATE,
             market_cap BIGINT,
             enterprise_value BIGINT,
             revenue BIGINT,
@@ -23,19 +36,297 @@ def create_tables(conn):
             beta FLOAT
         );
     """)
+    # Bestehende Datenbanken: bisherige Zeilen gelten als Snapshot vom Tag der Migration. Mehrere
+    # Zeilen eines Symbols bekommen so denselben Stichtag, daher vor dem eindeutigen Index bereinigen.
+    cur.execute("ALTER TABLE fundamentals ADD COLUMN IF NOT EXISTS as_of DATE NOT NULL DEFAULT CURRENT_DATE;")
+    _dedupe_fundamentals(cur)
+    _create_fundamentals_views(cur)
+
+    if partition_by_year:
+        _create_partitioned_prices_daily(cur, years)
+    else:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS prices_daily (
+                id SERIAL PRIMARY KEY,
+                stock_symbol VARCHAR(10) NOT NULL REFERENCES stocks(symbol) ON DELETE CASCADE,
+                date DATE NOT NULL,
+                open FLOAT,
+                high FLOAT,
+                low FLOAT,
+                close FLOAT,
+                volume BIGINT
+            );
+        """)
 
+        # Eindeutiger Schlüssel für Upserts der Kursdaten, deckt auch Filter/Sortierung nach (symbol, date) ab
+        cur.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS prices_daily_symbol_date_uidx
+            ON prices_daily (stock_symbol, date);
+        """)
+
+    # Von der Pipeline materialisierte Indikatoren (inkl. RSI-Zustand für inkrementelle Updates)
     cur.execute("""
-        CREATE TABLE IF NOT EXISTS prices_daily (
-            id SERIAL PRIMARY KEY,
+        CREATE TABLE IF NOT EXISTS indicators_daily (
             stock_symbol VARCHAR(10) NOT NULL REFERENCES stocks(symbol) ON DELETE CASCADE,
             date DATE NOT NULL,
+            sma_20 FLOAT,
+            sma_50 FLOAT,
+            rsi_14 FLOAT,
+            volatility_20 FLOAT,
+            bb_upper FLOAT,
+            bb_lower FLOAT,
+            avg_gain_14 FLOAT,
+            avg_loss_14 FLOAT,
+            PRIMARY KEY (stock_symbol, date)
+        );
+    """)
+
+    # Intraday-Kurse (Alpha Vantage), monatlich nach ts partitioniert; Partitionen legt
+    # insert_intraday beim Laden an. Der Schlüssel deckt auch Abfragen je Symbol und Intervall ab.
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS prices_intraday (
+            stock_symbol VARCHAR(10) NOT NULL REFERENCES stocks(symbol) ON DELETE CASCADE,
+            interval VARCHAR(5) NOT NULL,
+            ts TIMESTAMPTZ NOT NULL,
             open FLOAT,
             high FLOAT,
             low FLOAT,
             close FLOAT,
-            volume BIGINT
+            volume BIGINT,
+            PRIMARY KEY (stock_symbol, interval, ts)
+        ) PARTITION BY RANGE (ts);
+    """)
+
+    # Portfolios: Bestände ergeben sich aus den Transaktionen (Menge < 0 = Verkauf),
+    # portfolio_values hält die täglich fortgeschriebene Wertreihe für inkrementelle Updates
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS portfolios (
+            id SERIAL PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS portfolio_transactions (
+            id SERIAL PRIMARY KEY,
+            portfolio_id INT NOT NULL REFERENCES portfolios(id) ON DELETE CASCADE,
+            stock_symbol VARCHAR(10) NOT NULL REFERENCES stocks(symbol),
+            date DATE NOT NULL,
+            quantity FLOAT NOT NULL,
+            price FLOAT
+        );
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS portfolio_transactions_portfolio_date_idx
+        ON portfolio_transactions (portfolio_id, date);
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS portfolio_values (
+            portfolio_id INT NOT NULL REFERENCES portfolios(id) ON DELETE CASCADE,
+            date DATE NOT NULL,
+            value FLOAT NOT NULL,
+            daily_return FLOAT,
+            PRIMARY KEY (portfolio_id, date)
         );
     """)
 
+    # Versionszähler, den die Pipeline nach jedem Schreibvorgang erhöht (Cache-Invalidierung im Dashboard)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS data_version (
+            id INT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+            version BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+    """)
+    cur.execute("INSERT INTO data_version (id) VALUES (1) ON CONFLICT (id) DO NOTHING;")
+
     conn.commit()
     print("Tabellen erfolgreich erstellt.")
+
+
+def ensure_prices_daily_key(conn):
+    """
+    Migration für bestehende Datenbanken: entfernt doppelte (stock_symbol, date)-Zeilen
+    (die jüngste id bleibt erhalten) und legt den eindeutigen Index an.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        DELETE FROM prices_daily a
+        USING prices_daily b
+        WHERE a.stock_symbol = b.stock_symbol
+          AND a.date = b.date
+          AND a.id < b.id;
+    """)
+    removed = cur.rowcount
+    cur.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS prices_daily_symbol_date_uidx
+        ON prices_daily (stock_symbol, date);
+    """)
+    conn.commit()
+    print(f"Eindeutiger Index auf prices_daily angelegt ({removed} Duplikate entfernt).")
+
+
+
+def _dedupe_fundamentals(cur):
+    # Mehrfache Zeilen je (stock_symbol, as_of) entfernen, die zuletzt geschriebene bleibt erhalten
+    cur.execute("""
+        DELETE FROM fundamentals a
+        USING fundamentals b
+        WHERE a.stock_symbol = b.stock_symbol
+          AND a.as_of = b.as_of
+          AND a.ctid < b.ctid;
+    """)
+    return cur.rowcount
+
+
+def _create_fundamentals_views(cur):
+    # Schlüssel (stock_symbol, as_of): Upserts je Stichtag und Stichtagsabfragen als
+    # Rückwärts-Indexscan ("letzter Snapshot <= Datum")
+    cur.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS fundamentals_symbol_as_of_uidx
+        ON fundamentals (stock_symbol, as_of);
+    """)
+    # Aktuelle Werte je Symbol: ein Indexzugriff je Aktie statt alle Snapshots zu sortieren
+    cur.execute("""
+        CREATE OR REPLACE VIEW fundamentals_latest AS
+        SELECT f.*
+        FROM stocks s
+        CROSS JOIN LATERAL (
+            SELECT *
+            FROM fundamentals
+            WHERE stock_symbol = s.symbol
+            ORDER BY as_of DESC
+            LIMIT 1
+        ) f;
+    """)
+
+
+def ensure_fundamentals_key(conn):
+    """
+    Migration für bestehende Datenbanken: ergänzt as_of, entfernt mehrfache Zeilen je
+    (stock_symbol, as_of) (die zuletzt geschriebene bleibt erhalten) und legt Index und View an.
+    """
+    cur = conn.cursor()
+    cur.execute("ALTER TABLE fundamentals ADD COLUMN IF NOT EXISTS as_of DATE NOT NULL DEFAULT CURRENT_DATE;")
+    removed = _dedupe_fundamentals(cur)
+    _create_fundamentals_views(cur)
+    conn.commit()
+    print(f"Snapshot-Schlüssel auf fundamentals angelegt ({removed} Duplikate entfernt).")
+
+
+def _default_partition_years():
+    current = datetime.date.today().year
+    return range(current - 5, current + 2)
+
+
+def _create_partitioned_prices_daily(cur, years=None):
+    # Der Primärschlüssel muss den Partitionsschlüssel enthalten, daher (stock_symbol, date) statt id
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS prices_daily (
+            stock_symbol VARCHAR(10) NOT NULL REFERENCES stocks(symbol) ON DELETE CASCADE,
+            date DATE NOT NULL,
+            open FLOAT,
+            high FLOAT,
+            low FLOAT,
+            close FLOAT,
+            volume BIGINT,
+            PRIMARY KEY (stock_symbol, date)
+        ) PARTITION BY RANGE (date);
+    """)
+    _create_price_partitions(cur, years or _default_partition_years())
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS prices_daily_default
+        PARTITION OF prices_daily DEFAULT;
+    """)
+
+
+def _create_price_partitions(cur, years):
+    for year in years:
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS prices_daily_{int(year)}
+            PARTITION OF prices_daily
+            FOR VALUES FROM ('{int(year)}-01-01') TO ('{int(year) + 1}-01-01');
+        """)
+
+
+def create_price_partitions(conn, years):
+    """
+    Legt Jahrespartitionen für prices_daily an (z.B. jährlich für das kommende Jahr aufrufen).
+    Liegen im Default-Partition bereits Zeilen des Jahres, schlägt das Anlegen fehl.
+    """
+    cur = conn.cursor()
+    _create_price_partitions(cur, years)
+    conn.commit()
+
+
+def ensure_intraday_partitions(cur, months):
+    """
+    Legt fehlende Monatspartitionen von prices_intraday an; months sind (Jahr, Monat)-Tupel.
+    Läuft in der Transaktion des Aufrufers.
+    """
+    for year, month in sorted(set(months)):
+        next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS prices_intraday_{int(year)}_{int(month):02d}
+            PARTITION OF prices_intraday
+            FOR VALUES FROM ('{int(year)}-{int(month):02d}-01 00:00+00')
+                       TO ('{int(next_year)}-{int(next_month):02d}-01 00:00+00');
+        """)
+
+
+def is_prices_daily_partitioned(conn):
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT c.relkind = 'p'
+        FROM pg_class c
+        WHERE c.oid = to_regclass('prices_daily');
+    """)
+    row = cur.fetchone()
+    return bool(row and row[0])
+
+
+def migrate_prices_daily(conn, partition_by_year=False):
+    """
+    Migriert eine bestehende prices_daily-Tabelle.
+
+    Ohne partition_by_year werden nur Duplikate entfernt und der eindeutige Index angelegt.
+    Mit partition_by_year wird die Tabelle nach prices_daily_legacy umbenannt, partitioniert
+    neu angelegt und befüllt. Die Legacy-Tabelle bleibt zur Kontrolle bestehen und kann
+    danach manuell gelöscht werden.
+    """
+    if is_prices_daily_partitioned(conn):
+        print("prices_daily ist bereits partitioniert.")
+        return
+
+    ensure_prices_daily_key(conn)
+    if not partition_by_year:
+        return
+
+    cur = conn.cursor()
+    try:
+        cur.execute("ALTER TABLE prices_daily RENAME TO prices_daily_legacy;")
+        cur.execute("ALTER TABLE prices_daily_legacy RENAME CONSTRAINT prices_daily_pkey TO prices_daily_legacy_pkey;")
+        cur.execute("ALTER INDEX prices_daily_symbol_date_uidx RENAME TO prices_daily_legacy_symbol_date_uidx;")
+
+        cur.execute("""
+            SELECT EXTRACT(YEAR FROM MIN(date))::int, EXTRACT(YEAR FROM MAX(date))::int
+            FROM prices_daily_legacy;
+        """)
+        first_year, last_year = cur.fetchone()
+        years = set(_default_partition_years())
+        if first_year is not None:
+            years.update(range(first_year, last_year + 1))
+
+        _create_partitioned_prices_daily(cur, sorted(years))
+        cur.execute("""
+            INSERT INTO prices_daily (stock_symbol, date, open, high, low, close, volume)
+            SELECT stock_symbol, date, open, high, low, close, volume
+            FROM prices_daily_legacy;
+        """)
+        moved = cur.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    print(f"prices_daily partitioniert ({moved} Zeilen übernommen, alte Tabelle: prices_daily_legacy).")
@@ -0,0 +1,145 @@
+# downsampling.py
+# Serverseitiges Ausdünnen von Kurszeitreihen vor dem Rendern mit Plotly.
+# Kerzen und Volumen werden auf eine gröbere Auflösung aggregiert (OHLCV), Linien mit LTTB
+# (Largest-Triangle-Three-Buckets) auf eine feste Punktzahl reduziert. So bleibt die Zahl der
+# gerenderten Punkte unabhängig vom gewählten Zeitraum begrenzt.
+import numpy as np
+import pandas as pd
+
+# Auflösungen von fein nach grob: (pandas-Frequenz, ungefähre Dauer einer Periode)
+RESOLUTIONS = [
+    ("1min", pd.Timedelta(minutes=1)),
+    ("5min", pd.Timedelta(minutes=5)),
+    ("15min", pd.Timedelta(minutes=15)),
+    ("30min", pd.Timedelta(minutes=30)),
+    ("1h", pd.Timedelta(hours=1)),
+    ("1D", pd.Timedelta(days=1)),
+    ("W", pd.Timedelta(weeks=1)),
+    ("M", pd.Timedelta(days=30.44)),
+    ("Q", pd.Timedelta(days=91.31)),
+    ("Y", pd.Timedelta(days=365.25)),
+]
+# Kalendergebundene Perioden (nicht per floor rundbar)
+_PERIOD_RULES = {"W", "M", "Q", "Y"}
+
+# Mindestbreite einer Kerze bzw. eines Balkens in Pixeln, Linien: ein Punkt je Pixel
+MIN_BAR_PX = 4
+
+
+def max_points(width_px, px_per_point=1):
+    """Maximale Anzahl Punkte für eine Chartbreite in Pixeln"""
+    return max(2, int(width_px // px_per_point))
+
+
+def choose_resolution(start, end, max_points, native="1D"):
+    """
+    Feinste Auflösung (nicht feiner als native), bei der der Zeitraum [start, end]
+    höchstens max_points Perioden umfasst.
+    """
+    span = pd.Timestamp(end) - pd.Timestamp(start)
+    rules = [rule for rule, _ in RESOLUTIONS]
+    for rule, length in RESOLUTIONS[rules.index(native):]:
+        if span / length <= max_points:
+            return rule
+    return RESOLUTIONS[-1][0]
+
+
+def _bucket(dates, rule):
+    if rule in _PERIOD_RULES:
+        # Periodenbeginn, Zeitzone für die Periode kurz entfernen
+        tz = dates.dt.tz
+        local = dates.dt.tz_localize(None) if tz is not None else dates
+        start = local.dt.to_period(rule).dt.start_time
+        return start.dt.tz_localize(tz) if tz is not None else start
+    return dates.dt.floor(rule)
+
+
+def resample_ohlcv(df, rule, date_col="datum", symbol_col="symbol",
+                   columns=("open", "high", "low", "price", "volume")):
+    """
+    Aggregiert eine lange Kurstabelle je Symbol auf die Auflösung rule:
+    open = erster, high = Maximum, low = Minimum, price (Schluss) = letzter Wert, volume = Summe.
+    Als Zeitpunkt einer Periode wird ihr erster Handelszeitpunkt verwendet (keine Labels in der Zukunft).
+    """
+    if df.empty:
+        return df
+    how = {"open": "first", "high": "max", "low": "min", "price": "last", "close": "last", "volume": "sum"}
+    agg = {col: how[col] for col in columns if col in df.columns}
+    agg[date_col] = "first"
+
+    frame = df.sort_values([symbol_col, date_col])
+    bucket = _bucket(frame[date_col], rule).rename("_bucket")
+    out = frame.groupby([frame[symbol_col], bucket], observed=True, sort=False).agg(agg)
+    return out.reset_index(level="_bucket", drop=True).reset_index()[[symbol_col, *agg]]
+
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: Indizes von höchstens n_out Punkten, die den Verlauf von (x, y)
+    optisch erhalten. Erster und letzter Punkt bleiben immer erhalten; NaN-Werte werden vorher entfernt.
+    """
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    valid = np.flatnonzero(~np.isnan(y))
+    n = len(valid)
+    if n <= n_out:
+        return valid
+    if n_out < 3:
+        return valid[[0, n - 1]][:n_out]
+    xv, yv = x[valid], y[valid]
+
+    # Innere Punkte in n_out - 2 Buckets aufteilen
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Durchschnitt des nächsten Buckets als dritter Eckpunkt
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = xv[nlo:nhi].mean(), yv[nlo:nhi].mean()
+        area = np.abs((xv[a] - avg_x) * (yv[lo:hi] - yv[a]) - (xv[a] - xv[lo:hi]) * (avg_y - yv[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return valid[selected]
+
+
+def downsample_lines(df, n_out, x_col="datum", y_col="price", symbol_col="symbol"):
+    """Reduziert jede Linie (je Symbol) einer langen Tabelle mit LTTB auf höchstens n_out Punkte"""
+    if df.empty:
+        return df
+    frame = df.sort_values([symbol_col, x_col])
+    keep = []
+    for _, positions in frame.groupby(symbol_col, observed=True, sort=False).indices.items():
+        part = frame.iloc[positions]
+        x = pd.to_datetime(part[x_col]).to_numpy(dtype="datetime64[ns]").astype("int64")
+        keep.append(positions[lttb(x, part[y_col].to_numpy(dtype="float64"), n_out)])
+    return frame.iloc[np.concatenate(keep)] if keep else frame.iloc[:0]
+
+
+# Zeilen, aus denen die JSON-Größe je Wert geschätzt wird
+PAYLOAD_SAMPLE_ROWS = 50
+
+
+def _json_bytes_per_value(frame):
+    sample = frame.head(PAYLOAD_SAMPLE_ROWS)
+    values = sample.shape[0] * sample.shape[1]
+    return len(sample.to_json(orient="values", date_format="iso")) / values if values else 0.0
+
+
+def payload_metrics(raw, reduced):
+    """
+    Punkte und geschätzte JSON-Größe vor und nach dem Ausdünnen (Näherung für die Nutzlast an den
+    Browser): Zeilen x Spalten x Bytes je Wert. Die Bytes je Wert kommen aus den
+    ersten PAYLOAD_SAMPLE_ROWS Zeilen, damit nicht bei jedem Rerun der ganze Zeitraum serialisiert wird.
+    """
+    per_value = _json_bytes_per_value(reduced if len(reduced) else raw)
+    raw_bytes = int(raw.size * per_value)
+    reduced_bytes = int(reduced.size * per_value)
+    return {
+        "points_before": len(raw),
+        "points_after": len(reduced),
+        "bytes_before": raw_bytes,
+        "bytes_after": reduced_bytes,
+        "reduction": 1 - reduced_bytes / raw_bytes if raw_bytes else 0.0,
+    }
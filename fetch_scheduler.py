@@ -0,0 +1,276 @@
+# fetch_scheduler.py
+# Zentrale Steuerung aller Anfragen an externe Datenquellen (yfinance, Alpha Vantage):
+# Rate-Limits je Anbieter über Token-Buckets, Wiederholungen mit exponentiellem Backoff und
+# Jitter, Abarbeitung nach Priorität (Dashboard vor Massen-Backfills).
+import contextvars
+import heapq
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 10
+
+# Anfragen pro Sekunde und Burst-Größe je Anbieter
+DEFAULT_LIMITS = {
+    "yfinance": (2.0, 5),
+    "alphavantage": (5 / 60, 1),
+}
+
+_current_priority = contextvars.ContextVar("fetch_priority", default=PRIORITY_BULK)
+
+
+class RateLimitError(Exception):
+    """Der Anbieter hat die Anfrage gedrosselt (z.B. HTTP 429 oder Alpha-Vantage-"Note")."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class SchedulerShutdown(Exception):
+    """Der Scheduler wurde beendet, bevor der Auftrag ausgeführt werden konnte."""
+
+
+@contextmanager
+def priority(value):
+    """Setzt die Priorität für alle Anfragen, die in diesem Block (im selben Thread) gestellt werden."""
+    token = _current_priority.set(value)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class TokenBucket:
+    """Token-Bucket: rate Tokens pro Sekunde, höchstens capacity auf Vorrat."""
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = float(capacity)
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self):
+        """Sekunden bis ein Token verfügbar ist (0, wenn sofort)."""
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self._refill()
+        self.tokens -= 1
+
+
+class _Job:
+    __slots__ = ("provider", "fn", "args", "kwargs", "future", "attempt", "context")
+
+    def __init__(self, provider, fn, args, kwargs):
+        # Der Abruf läuft im Kontext des Aufrufers (z.B. dessen Lauf in instrumentation)
+        self.context = contextvars.copy_context()
+        self.provider = provider
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        self.attempt = 0
+
+
+def _fail(job, exc):
+    # Vom Aufrufer abgebrochene Futures nicht anfassen
+    if not job.future.done():
+        job.future.set_exception(exc)
+
+
+class FetchScheduler:
+    """
+    Führt Abrufe in einem Pool von Worker-Threads aus.
+
+    Es wird immer der Auftrag mit der kleinsten Prioritätszahl gestartet, dessen Anbieter gerade
+    ein Token hat (eine Warteschlange je Anbieter). Scheitert ein Abruf mit einem wiederholbaren
+    Fehler, wird er nach base_delay * 2^Versuch Sekunden (voller Jitter, höchstens max_delay,
+    bzw. retry_after des Anbieters) erneut versucht: Bei einer Drosselung (RateLimitError) pausiert
+    der ganze Anbieter so lange und der Auftrag kommt sofort zurück in die Warteschlange, damit
+    danach wieder die wichtigste Anfrage zuerst läuft; bei sonstigen Fehlern (retryable(exc) ist
+    True) wird nur der Auftrag zurückgestellt. Nach max_retries Wiederholungen wird der Fehler an
+    den Aufrufer weitergegeben statt ihn zu verschlucken. shutdown() lässt alle noch offenen
+    Aufträge mit SchedulerShutdown scheitern.
+    """
+
+    def __init__(self, limits=None, workers=4, max_retries=5, base_delay=1.0, max_delay=60.0,
+                 retryable=None, clock=time.monotonic, rng=random.random):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retryable = retryable or (lambda exc: False)
+        self.clock = clock
+        self.rng = rng
+        self._buckets = {}
+        # Anbieter -> Heap aus (Priorität, Reihenfolge, Auftrag)
+        self._queues = {}
+        # Anbieter -> Zeitpunkt, bis zu dem nach einer Drosselung nichts gestartet wird
+        self._paused = {}
+        # Zurückgestellte Aufträge (Timer), damit shutdown() sie beenden kann
+        self._timers = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._stats = {}
+        for provider, (rate, burst) in {**DEFAULT_LIMITS, **(limits or {})}.items():
+            self.set_limit(provider, rate, burst)
+        self._workers = [threading.Thread(target=self._run, daemon=True, name=f"fetch-{i}")
+                         for i in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def set_limit(self, provider, rate, burst=1):
+        with self._cond:
+            self._buckets[provider] = TokenBucket(rate, burst, self.clock)
+            self._cond.notify_all()
+
+    def submit(self, provider, fn, *args, priority=None, **kwargs):
+        """Reiht einen Abruf ein und gibt ein Future zurück."""
+        job = _Job(provider, fn, args, kwargs)
+        self._enqueue(job, _current_priority.get() if priority is None else priority)
+        return job.future
+
+    def call(self, provider, fn, *args, priority=None, **kwargs):
+        """Wie submit, wartet aber auf das Ergebnis (Fehler werden weitergereicht)."""
+        return self.submit(provider, fn, *args, priority=priority, **kwargs).result()
+
+    def _enqueue(self, job, prio, timer=None):
+        with self._cond:
+            if timer is not None:
+                self._timers.pop(timer, None)
+            if self._stopped:
+                # Sonst wartet der Aufrufer ewig auf ein Future, das kein Worker mehr bearbeitet
+                _fail(job, SchedulerShutdown("Fetch-Scheduler wurde beendet"))
+                return
+            heapq.heappush(self._queues.setdefault(job.provider, []), (prio, next(self._seq), job))
+            self._count(job.provider, "queued")
+            self._cond.notify()
+
+    def _count(self, provider, key, amount=1):
+        stats = self._stats.setdefault(provider, {"queued": 0, "requests": 0, "retries": 0,
+                                                  "throttled": 0, "failures": 0})
+        stats[key] += amount
+
+    def _next_job(self):
+        # Höchste Priorität zuerst, aber nur Anbieter mit verfügbarem Token: je Anbieter zählt nur
+        # der Kopf seiner Warteschlange
+        with self._cond:
+            while not self._stopped:
+                best = None
+                wait = None
+                for provider, queue in self._queues.items():
+                    if not queue or (best is not None and queue[0] >= best[0]):
+                        continue
+                    bucket = self._buckets.get(provider)
+                    delay = max(bucket.wait_time() if bucket else 0.0,
+                                self._paused.get(provider, 0.0) - self.clock())
+                    if delay <= 0.0:
+                        best = (queue[0], queue, bucket)
+                    else:
+                        wait = delay if wait is None else min(wait, delay)
+                if best is not None:
+                    _, queue, bucket = best
+                    if bucket:
+                        bucket.take()
+                    return heapq.heappop(queue)
+                self._cond.wait(timeout=wait)
+            return None
+
+    def _run(self):
+        while True:
+            entry = self._next_job()
+            if entry is None:
+                return
+            prio, _, job = entry
+            if job.future.cancelled():
+                continue
+            with self._cond:
+                self._count(job.provider, "requests")
+            try:
+                result = job.context.run(job.fn, *job.args, **job.kwargs)
+            except Exception as exc:
+                self._handle_error(job, prio, exc)
+            else:
+                job.future.set_result(result)
+
+    def _handle_error(self, job, prio, exc):
+        throttled = isinstance(exc, RateLimitError)
+        with self._cond:
+            if throttled:
+                self._count(job.provider, "throttled")
+            if (throttled or self.retryable(exc)) and job.attempt < self.max_retries:
+                self._count(job.provider, "retries")
+            else:
+                self._count(job.provider, "failures")
+                job.future.set_exception(exc)
+                return
+
+        delay = min(self.max_delay, self.base_delay * 2 ** job.attempt) * self.rng()
+        if throttled and exc.retry_after:
+            delay = max(delay, exc.retry_after)
+        job.attempt += 1
+        if throttled:
+            with self._cond:
+                self._paused[job.provider] = max(self._paused.get(job.provider, 0.0), self.clock() + delay)
+            self._enqueue(job, prio)
+            return
+        timer = threading.Timer(delay, lambda: self._enqueue(job, prio, timer))
+        timer.daemon = True
+        with self._cond:
+            if self._stopped:
+                _fail(job, SchedulerShutdown("Fetch-Scheduler wurde beendet"))
+                return
+            self._timers[timer] = job
+        timer.start()
+
+    def stats(self):
+        with self._cond:
+            return {provider: dict(values) for provider, values in self._stats.items()}
+
+    def shutdown(self):
+        """Beendet die Worker; wartende und zurückgestellte Aufträge scheitern mit SchedulerShutdown."""
+        with self._cond:
+            self._stopped = True
+            pending = [job for queue in self._queues.values() for _, _, job in queue]
+            self._queues.clear()
+            for timer, job in self._timers.items():
+                timer.cancel()
+                pending.append(job)
+            self._timers.clear()
+            self._cond.notify_all()
+        for job in pending:
+            _fail(job, SchedulerShutdown("Fetch-Scheduler wurde beendet"))
+        for worker in self._workers:
+            worker.join()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def is_transient(exc):
+    # Netzwerkfehler und HTTP 429/5xx, die nicht als RateLimitError ankommen
+    text = f"{type(exc).__name__} {exc}".lower()
+    return any(marker in text for marker in ("too many requests", "429", "timeout", "timed out",
+                                             "connection", "502", "503", "504", "ratelimit"))
+
+
+def get_scheduler():
+    """Gemeinsamer Scheduler für alle Abrufe eines Prozesses."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = FetchScheduler(workers=8, retryable=is_transient)
+        return _scheduler
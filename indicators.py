@@ -0,0 +1,263 @@
+# indicators.py
+# Vektorisierte technische Indikatoren für viele Symbole gleichzeitig.
+# Alle Funktionen arbeiten auf NumPy-Arrays der Form (Symbole x Tage); NaN steht für fehlende Kurse.
+import numpy as np
+import pandas as pd
+
+# Standardkonfiguration, einzelne Fenster können pro Aufruf überschrieben werden
+DEFAULT_CONFIG = {
+    "sma": [20, 50],
+    "ema": [12, 26],
+    "rsi": 14,
+    "macd": (12, 26, 9),
+    "bollinger": (20, 2.0),
+    "atr": 14,
+    "volatility": 20,
+}
+
+
+def to_matrix(df, column="price", symbol_col="symbol", date_col="datum"):
+    """
+    Wandelt eine lange Kurstabelle in eine Matrix (Symbole x Tage) um.
+    Gibt (symbols, dates, matrix) zurück, fehlende Tage sind NaN.
+    """
+    wide = df.pivot_table(index=symbol_col, columns=date_col, values=column, aggfunc="last", observed=True)
+    return wide.index.to_numpy(), wide.columns.to_numpy(), wide.to_numpy(dtype="float64")
+
+
+def _as_2d(x):
+    x = np.asarray(x, dtype="float64")
+    return x[np.newaxis, :] if x.ndim == 1 else x
+
+
+def _rolling_sums(x, window):
+    """Summe, Quadratsumme und Anzahl gültiger Werte je Fenster (Fensterende = Spalte)"""
+    valid = ~np.isnan(x)
+    # Um den Zeilenmittelwert verschieben, damit die Quadratsummen nicht auslöschen
+    with np.errstate(all="ignore"):
+        shift = np.nanmean(x, axis=1, keepdims=True)
+    shift = np.where(np.isnan(shift), 0.0, shift)
+    centered = np.where(valid, x - shift, 0.0)
+
+    def window_sum(values):
+        csum = np.cumsum(values, axis=1)
+        out = csum.copy()
+        out[:, window:] = csum[:, window:] - csum[:, :-window]
+        return out
+
+    return window_sum(centered), window_sum(centered ** 2), window_sum(valid.astype("float64")), shift
+
+
+def sma(x, window):
+    """Einfacher gleitender Durchschnitt; NaN solange das Fenster nicht vollständig ist"""
+    x = _as_2d(x)
+    s, _, n, shift = _rolling_sums(x, window)
+    out = s / window + shift
+    out[n < window] = np.nan
+    return out
+
+
+def rolling_std(x, window, ddof=1):
+    """Gleitende Standardabweichung; NaN solange das Fenster nicht vollständig ist"""
+    x = _as_2d(x)
+    s, sq, n, _ = _rolling_sums(x, window)
+    var = (sq - s ** 2 / window) / (window - ddof)
+    out = np.sqrt(np.maximum(var, 0.0))
+    out[n < window] = np.nan
+    return out
+
+
+def ewm(x, alpha, min_periods=0):
+    """
+    Exponentiell gewichteter Mittelwert (wie pandas ewm(adjust=False, ignore_na=True)), je Zeile ab
+    dem ersten gültigen Wert. Fehlende Werte werden übersprungen, der letzte Wert wird fortgeschrieben;
+    eine Lücke zählt nicht als Tag, an dem das Gewicht älterer Werte weiter abnimmt (anders als
+    pandas' Standard ignore_na=False).
+    Die Rekursion läuft über die Tage, jeder Schritt ist über alle Symbole vektorisiert.
+    """
+    x = _as_2d(x)
+    out = np.empty_like(x)
+    prev = np.full(x.shape[0], np.nan)
+    count = np.zeros(x.shape[0])
+    for t in range(x.shape[1]):
+        value = x[:, t]
+        valid = ~np.isnan(value)
+        count += valid
+        prev = np.where(valid, np.where(np.isnan(prev), value, alpha * value + (1 - alpha) * prev), prev)
+        out[:, t] = np.where(count >= max(min_periods, 1), prev, np.nan)
+    return out
+
+
+def ema(x, span):
+    """Exponentieller gleitender Durchschnitt mit alpha = 2 / (span + 1)"""
+    return ewm(x, 2.0 / (span + 1))
+
+
+def _diff(x):
+    out = np.full_like(x, np.nan)
+    out[:, 1:] = x[:, 1:] - x[:, :-1]
+    return out
+
+
+def _gains_losses(delta):
+    gain = np.where(np.isnan(delta), np.nan, np.maximum(delta, 0.0))
+    loss = np.where(np.isnan(delta), np.nan, np.maximum(-delta, 0.0))
+    return gain, loss
+
+
+def rsi_components(close, window=14):
+    """Geglätteter durchschnittlicher Gewinn und Verlust (Zustand des RSI)"""
+    gain, loss = _gains_losses(_diff(_as_2d(close)))
+    return ewm(gain, 1.0 / window, min_periods=window), ewm(loss, 1.0 / window, min_periods=window)
+
+
+def rsi_from_components(avg_gain, avg_loss):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    # Keine Verluste im Fenster: RSI = 100
+    return np.where((avg_loss == 0) & ~np.isnan(avg_gain), 100.0, out)
+
+
+def rsi(close, window=14):
+    """Relative Strength Index mit Wilder-Glättung (alpha = 1 / window)"""
+    return rsi_from_components(*rsi_components(close, window))
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """MACD-Linie, Signallinie und Histogramm"""
+    close = _as_2d(close)
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+def bollinger(close, window=20, num_std=2.0):
+    """Bollinger-Bänder (Mitte, oben, unten) mit Populations-Standardabweichung"""
+    close = _as_2d(close)
+    mid = sma(close, window)
+    std = rolling_std(close, window, ddof=0)
+    return mid, mid + num_std * std, mid - num_std * std
+
+
+def atr(high, low, close, window=14):
+    """Average True Range mit Wilder-Glättung"""
+    high, low, close = _as_2d(high), _as_2d(low), _as_2d(close)
+    prev_close = np.full_like(close, np.nan)
+    prev_close[:, 1:] = close[:, :-1]
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    return ewm(true_range, 1.0 / window, min_periods=window)
+
+
+def rolling_volatility(close, window=20, periods_per_year=252):
+    """Annualisierte Volatilität der Log-Renditen über window Tage"""
+    close = _as_2d(close)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_returns = _diff(np.log(close))
+    return rolling_std(log_returns, window, ddof=1) * np.sqrt(periods_per_year)
+
+
+def compute_indicators(close, high=None, low=None, config=None):
+    """
+    Berechnet alle konfigurierten Indikatoren für eine Kursmatrix (Symbole x Tage).
+
+    config überschreibt einzelne Einträge aus DEFAULT_CONFIG, z.B. {"sma": [10, 200], "rsi": 7};
+    ein Eintrag mit None wird ausgelassen. ATR wird nur mit high und low berechnet.
+    Gibt ein Dict Name -> Matrix zurück, z.B. "sma_20", "rsi_14", "macd", "bb_upper".
+    """
+    cfg = {**DEFAULT_CONFIG, **(config or {})}
+    close = _as_2d(close)
+    result = {}
+
+    for window in cfg.get("sma") or []:
+        result[f"sma_{window}"] = sma(close, window)
+    for span in cfg.get("ema") or []:
+        result[f"ema_{span}"] = ema(close, span)
+    if cfg.get("rsi"):
+        result[f"rsi_{cfg['rsi']}"] = rsi(close, cfg["rsi"])
+    if cfg.get("macd"):
+        result["macd"], result["macd_signal"], result["macd_hist"] = macd(close, *cfg["macd"])
+    if cfg.get("bollinger"):
+        result["bb_mid"], result["bb_upper"], result["bb_lower"] = bollinger(close, *cfg["bollinger"])
+    if cfg.get("atr") and high is not None and low is not None:
+        result[f"atr_{cfg['atr']}"] = atr(high, low, close, cfg["atr"])
+    if cfg.get("volatility"):
+        result[f"volatility_{cfg['volatility']}"] = rolling_volatility(close, cfg["volatility"])
+
+    return result
+
+
+def indicators_frame(df, config=None):
+    """
+    Indikatoren für eine lange Kurstabelle (symbol, datum, price, high, low) als lange Tabelle
+    mit einer Spalte je Indikator, z.B. für die Anzeige im Dashboard.
+    """
+    symbols, dates, close = to_matrix(df, "price")
+    _, _, high = to_matrix(df, "high")
+    _, _, low = to_matrix(df, "low")
+    result = compute_indicators(close, high, low, config)
+
+    index = pd.MultiIndex.from_product([symbols, dates], names=["symbol", "datum"])
+    frame = pd.DataFrame({name: values.ravel() for name, values in result.items()}, index=index)
+    frame["price"] = close.ravel()
+    return frame.dropna(subset=["price"]).reset_index()
+
+
+# --------------------------
+# MATERIALISIERTE INDIKATOREN (Tabelle indicators_daily)
+# --------------------------
+# Spalten, die die Pipeline nach dem Import speichert. avg_gain_14/avg_loss_14 sind der
+# Glättungszustand des RSI, damit neue Tage ohne die ganze Historie fortgeschrieben werden können.
+MATERIALIZED_COLUMNS = ["sma_20", "sma_50", "rsi_14", "volatility_20", "bb_upper", "bb_lower",
+                        "avg_gain_14", "avg_loss_14"]
+# Anzahl vorheriger Schlusskurse, die für ein inkrementelles Update reichen (längstes Fenster: SMA 50)
+HISTORY_DAYS = 50
+
+
+def _materialized_from(close, avg_gain, avg_loss):
+    _, bb_upper, bb_lower = bollinger(close, 20, 2.0)
+    return {
+        "sma_20": sma(close, 20),
+        "sma_50": sma(close, 50),
+        "rsi_14": rsi_from_components(avg_gain, avg_loss),
+        "volatility_20": rolling_volatility(close, 20),
+        "bb_upper": bb_upper,
+        "bb_lower": bb_lower,
+        "avg_gain_14": avg_gain,
+        "avg_loss_14": avg_loss,
+    }
+
+
+def materialized_indicators(close):
+    """
+    Alle materialisierten Indikatoren für die vollständige Kurshistorie eines Symbols (1D-Array).
+    Gibt ein Dict Spalte -> 1D-Array gleicher Länge zurück.
+    """
+    close = _as_2d(close)
+    avg_gain, avg_loss = rsi_components(close, 14)
+    return {name: values[0] for name, values in _materialized_from(close, avg_gain, avg_loss).items()}
+
+
+def update_materialized_indicators(history_close, new_close, avg_gain, avg_loss):
+    """
+    Schreibt die materialisierten Indikatoren für neue Tage fort.
+
+    history_close: die letzten (bis zu HISTORY_DAYS) Schlusskurse vor den neuen Tagen,
+    avg_gain/avg_loss: RSI-Zustand am letzten dieser Tage, new_close: Kurse der neuen Tage.
+    Gleitende Fenster werden nur über history_close + new_close gerechnet, der RSI setzt die
+    Wilder-Glättung ab dem gespeicherten Zustand fort. Gibt Arrays für die neuen Tage zurück.
+    """
+    history_close = np.asarray(history_close, dtype="float64")
+    new_close = np.asarray(new_close, dtype="float64")
+    n_new = len(new_close)
+    close = _as_2d(np.concatenate([history_close, new_close]))
+
+    gain, loss = _gains_losses(_diff(close)[:, -n_new:])
+    alpha = 1.0 / 14
+    # Gespeicherten Zustand als Startwert voranstellen, die Rekursion läuft ab dort weiter
+    new_gain = ewm(np.concatenate([[[avg_gain]], gain], axis=1), alpha)[:, 1:]
+    new_loss = ewm(np.concatenate([[[avg_loss]], loss], axis=1), alpha)[:, 1:]
+
+    padding = np.full((1, close.shape[1] - n_new), np.nan)
+    result = _materialized_from(close, np.concatenate([padding, new_gain], axis=1),
+                                np.concatenate([padding, new_loss], axis=1))
+    return {name: values[0, -n_new:] for name, values in result.items()}
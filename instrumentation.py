@@ -0,0 +1,305 @@
+# instrumentation.py
+# Leichtgewichtige Messpunkte für die Pipeline: Dauer je Stufe, Zähler (Zeilen, Bytes, Fehler) und
+# Trefferquoten der Caches. Die Werte laufen prozessweit auf (wie Prometheus-Counter); zusätzlich
+# sammelt jeder Lauf (metrics.run) nur seine eigenen Werte und übergibt sie als Bericht an die Hooks,
+# z.B. als JSON-Datei oder im Prometheus-Textformat. Optional: Profiling eines einzelnen Symbols.
+import contextvars
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+
+class _Collector:
+    """Stufen und Zähler eines Laufs; parent ist der umgebende Lauf (verschachtelte Läufe zählen dort mit)"""
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.stages = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def observe(self, name, seconds):
+        with self.lock:
+            _add_stage(self.stages, name, seconds)
+
+    def count(self, name, amount):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+
+def _add_stage(stages, name, seconds):
+    stage = stages.setdefault(name, {"calls": 0, "seconds": 0.0, "max_seconds": 0.0})
+    stage["calls"] += 1
+    stage["seconds"] += seconds
+    stage["max_seconds"] = max(stage["max_seconds"], seconds)
+
+
+# Laufender Lauf des aktuellen Kontexts. Threads eines Pools erben ihn nicht von selbst: Aufgaben mit
+# contextvars.copy_context().run(fn, ...) übergeben, damit ihre Werte im Bericht des Laufs landen.
+_current_run = contextvars.ContextVar("metrics_run", default=None)
+
+
+class Metrics:
+    """
+    Thread-sichere Sammlung von Stufen-Timern und Zählern.
+
+    stage(name) misst die Dauer eines Blocks (Aufrufe, Summe und Maximum in Sekunden),
+    count(name, amount) erhöht einen Zähler. Beides läuft prozessweit auf (snapshot, Prometheus) und
+    zusätzlich im Lauf des aktuellen Kontexts (run). Hooks (add_hook) bekommen am Ende jedes Laufs
+    den Bericht.
+    """
+
+    def __init__(self):
+        self._stages = {}
+        self._counters = {}
+        self._hooks = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def observe(self, name, seconds):
+        """Eine gemessene Dauer einer Stufe erfassen"""
+        with self._lock:
+            _add_stage(self._stages, name, seconds)
+        run = _current_run.get()
+        while run is not None:
+            run.observe(name, seconds)
+            run = run.parent
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+        run = _current_run.get()
+        while run is not None:
+            run.count(name, amount)
+            run = run.parent
+
+    def snapshot(self):
+        """Aufgelaufene Werte seit Prozessstart (bzw. reset)"""
+        with self._lock:
+            return {
+                "stages": {name: dict(values) for name, values in self._stages.items()},
+                "counters": dict(self._counters),
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+
+    def add_hook(self, hook):
+        """hook(report) wird nach jedem Lauf aufgerufen"""
+        with self._lock:
+            self._hooks.append(hook)
+
+    def remove_hook(self, hook):
+        with self._lock:
+            self._hooks.remove(hook)
+
+    @contextmanager
+    def run(self, name, **labels):
+        """
+        Misst einen Pipeline-Lauf. Der Bericht enthält nur Stufen und Zähler dieses Laufs: aus dem
+        Block selbst und aus Threads, die den Kontext übernommen haben (contextvars.copy_context),
+        nicht aus gleichzeitig laufenden anderen Läufen. Dazu kommt der aktuelle Stand von Caches,
+        Scheduler und Pool (seit Prozessstart aufgelaufen). Der Bericht wird nach dem Block an alle
+        Hooks übergeben und steht danach im yield-Dict.
+        """
+        collector = _Collector(parent=_current_run.get())
+        token = _current_run.set(collector)
+        started = datetime.now(timezone.utc)
+        start = time.perf_counter()
+        report = {}
+        error = None
+        try:
+            yield report
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            _current_run.reset(token)
+            try:
+                caches = cache_stats()
+            except Exception as e:
+                # Wie bei den Hooks: fehlende Statistik darf den Lauf nicht scheitern lassen
+                print(f"Cache-Statistik fehlgeschlagen: {e}")
+                caches = {}
+            with collector.lock:
+                stages = {name: dict(values, mean_seconds=values["seconds"] / values["calls"])
+                          for name, values in collector.stages.items()}
+                counters = dict(collector.counters)
+            report.update({
+                "run": name,
+                "labels": labels,
+                "started": started.isoformat(),
+                "seconds": time.perf_counter() - start,
+                "ok": error is None,
+                "error": None if error is None else repr(error),
+                "stages": stages,
+                "counters": counters,
+                "caches": caches,
+            })
+            with self._lock:
+                hooks = list(self._hooks)
+            for hook in hooks:
+                try:
+                    hook(report)
+                except Exception as e:
+                    # Ein defekter Hook darf den Lauf nicht scheitern lassen
+                    print(f"Instrumentierungs-Hook fehlgeschlagen: {e}")
+
+
+metrics = Metrics()
+stage = metrics.stage
+count = metrics.count
+
+
+def cache_stats():
+    """Trefferquoten der Caches, Stand des Fetch-Schedulers und des Connection-Pools"""
+    # Erst hier importieren: diese Module nutzen selbst die Messpunkte
+    import fetch_scheduler
+    from db import connection
+    from price_cache import price_cache
+    from stock_data_yfinance import info_cache
+
+    stats = {
+        "info_cache": info_cache.stats(),
+        "price_cache": price_cache.stats(),
+    }
+    # Keinen Scheduler oder Pool nur für die Statistik anlegen
+    if fetch_scheduler._scheduler is not None:
+        stats["scheduler"] = fetch_scheduler._scheduler.stats()
+    if connection._shared_pool is not None:
+        stats["db_pool"] = connection._shared_pool.stats()
+    return stats
+
+
+# --------------------------
+# AUSGABE
+# --------------------------
+def json_hook(path):
+    """Hook, der jeden Bericht als eine JSON-Zeile an path anhängt"""
+    lock = threading.Lock()
+
+    def hook(report):
+        with lock, open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(report, default=str) + "\n")
+
+    return hook
+
+
+def to_prometheus(snapshot, caches=None, prefix="pipeline"):
+    """Aufgelaufene Werte (Metrics.snapshot) und Cache-Statistiken im Prometheus-Textformat"""
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        if not samples:
+            return
+        lines.append(f"# HELP {prefix}_{name} {help_text}")
+        lines.append(f"# TYPE {prefix}_{name} {kind}")
+        for labels, value in samples:
+            label_text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+            lines.append(f"{prefix}_{name}{{{label_text}}} {float(value)!r}" if labels
+                         else f"{prefix}_{name} {float(value)!r}")
+
+    stages = snapshot["stages"]
+    metric("stage_seconds_total", "counter", "Summe der Laufzeit je Stufe",
+           [({"stage": s}, v["seconds"]) for s, v in sorted(stages.items())])
+    metric("stage_calls_total", "counter", "Aufrufe je Stufe",
+           [({"stage": s}, v["calls"]) for s, v in sorted(stages.items())])
+    metric("stage_max_seconds", "gauge", "Längster einzelner Aufruf je Stufe",
+           [({"stage": s}, v["max_seconds"]) for s, v in sorted(stages.items())])
+    for name, value in sorted(snapshot["counters"].items()):
+        metric(f"{name.replace('.', '_')}_total", "counter", f"Zähler {name}", [({}, value)])
+
+    caches = caches or {}
+    cache_samples = [(name, caches[name]) for name in ("info_cache", "price_cache") if name in caches]
+    metric("cache_hits_total", "counter", "Cache-Treffer",
+           [({"cache": name}, s["hits"]) for name, s in cache_samples])
+    metric("cache_misses_total", "counter", "Cache-Fehlschläge",
+           [({"cache": name}, s["misses"]) for name, s in cache_samples])
+    metric("cache_hit_ratio", "gauge", "Cache-Trefferquote",
+           [({"cache": name}, s["hit_rate"]) for name, s in cache_samples])
+    metric("fetch_total", "counter", "Abrufe je Anbieter und Ergebnis (Fetch-Scheduler)",
+           [({"provider": provider, "kind": kind}, value)
+            for provider, values in sorted(caches.get("scheduler", {}).items())
+            for kind, value in sorted(values.items())])
+    metric("db_pool", "gauge", "Connection-Pool",
+           [({"stat": key}, value) for key, value in sorted(caches.get("db_pool", {}).items())])
+    return "\n".join(lines) + "\n"
+
+
+def prometheus_hook(path):
+    """
+    Hook, der nach jedem Lauf die aufgelaufenen Werte nach path schreibt (z.B. für den
+    Textfile-Collector des node_exporter). Die Datei wird atomar ersetzt.
+    """
+    def hook(report):
+        text = to_prometheus(metrics.snapshot(), report.get("caches"))
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    return hook
+
+
+def format_report(report):
+    """Kurzer Textbericht eines Laufs: Stufen nach Gesamtdauer, Zähler, Cache-Trefferquoten"""
+    lines = [f"{report['run']} {report['labels']}: {report['seconds']:.2f}s" + ("" if report["ok"] else " (Fehler)")]
+    for name, s in sorted(report["stages"].items(), key=lambda item: -item[1]["seconds"]):
+        lines.append(f"  {name:<22} {s['seconds']:8.3f}s  {s['calls']:6d}x  Ø {s['mean_seconds'] * 1000:8.1f} ms")
+    for name, value in sorted(report["counters"].items()):
+        lines.append(f"  {name:<22} {value}")
+    for name in ("info_cache", "price_cache"):
+        if name in report["caches"]:
+            s = report["caches"][name]
+            lines.append(f"  {name:<22} {s['hit_rate']:.0%} Treffer ({s['hits']}/{s['hits'] + s['misses']})")
+    return "\n".join(lines)
+
+
+# --------------------------
+# PROFILING
+# --------------------------
+def profile(fn, *args, profiler="cprofile", limit=30, output=None, **kwargs):
+    """
+    Führt fn(*args, **kwargs) unter einem Profiler aus und gibt (Ergebnis, Bericht als Text) zurück.
+    profiler: "cprofile" (Standardbibliothek, Top limit Funktionen nach kumulierter Zeit) oder
+    "pyinstrument" (Sampling, muss installiert sein). Mit output wird das Rohprofil
+    (.prof für cProfile, .html für pyinstrument) zusätzlich gespeichert.
+    """
+    if profiler == "pyinstrument":
+        from pyinstrument import Profiler
+
+        prof = Profiler()
+        prof.start()
+        try:
+            result = fn(*args, **kwargs)
+        finally:
+            prof.stop()
+        if output:
+            with open(output, "w", encoding="utf-8") as f:
+                f.write(prof.output_html())
+        return result, prof.output_text(unicode=True)
+
+    prof = cProfile.Profile()
+    try:
+        result = prof.runcall(fn, *args, **kwargs)
+    finally:
+        if output:
+            prof.dump_stats(output)
+    buffer = io.StringIO()
+    pstats.Stats(prof, stream=buffer).sort_stats("cumulative").print_stats(limit)
+    return result, buffer.getvalue()
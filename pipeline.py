@@ -1,27 +1,320 @@
 # pipeline.py
-from db.connection import connect
-from db.persistence import clear_old_data, save_stock_basic, insert_fundamentals, insert_prices, is_valid_symbol
-from stock_data_yfinance import get_fundamentals, get_1y_history, get_basic_data
+import argparse
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from db.connection import connect, get_pool
+from db.persistence import (
+    clear_old_data, save_stock_basic, insert_fundamentals, insert_prices, is_valid_symbol, get_latest_price_dates,
+    bump_data_version, get_closes, get_indicator_state, upsert_indicators, insert_intraday, get_latest_intraday_ts
+)
+from stock_data_yfinance import (
+    get_fundamentals, get_1y_history, get_basic_data, get_history_since, prefetch_histories
+)
+from data_provider import fetch_many
+from fetch_scheduler import PRIORITY_BULK, priority as fetch_priority
+from instrumentation import metrics, stage, count, json_hook, prometheus_hook, format_report, profile
+from portfolio import refresh_portfolio_values
+from indicators import MATERIALIZED_COLUMNS, HISTORY_DAYS, materialized_indicators, update_materialized_indicators
 import yfinance as yf
 
-def run_data_pipeline(conn, symbol: str):
-    if not is_valid_symbol(symbol):
+SYMBOLS_CSV = os.path.join(os.path.dirname(__file__), "db", "symbols.csv")
+
+
+def fetch_symbol_data(symbol: str, since=None, history=None):
+    """
+    Lädt alle Daten eines Symbols von yfinance (ohne Datenbankzugriff).
+    Mit since werden nur Kurse ab diesem Datum geholt, sonst das letzte Jahr.
+    history sind bereits (z.B. mit prefetch_histories) geladene Kurse, dann entfällt der Kursabruf.
+    """
+    with stage("validate"):
+        valid = is_valid_symbol(symbol)
+    if not valid:
         raise ValueError(f"'{symbol}' ist kein gültiges oder unterstütztes Symbol.")
 
     # Kursdaten vorab laden
-    df = get_1y_history(symbol)
+    with stage("fetch_history"):
+        if history is not None:
+            df = history
+        elif since is None:
+            df = get_1y_history(symbol)
+        else:
+            # Letzten gespeicherten Tag erneut holen, er kann noch unvollständig gewesen sein
+            df = get_history_since(symbol, since)
     if df is None:
         raise ValueError(f"Keine Kursdaten für {symbol} gefunden.")
+    count("rows_fetched", len(df))
+
+    with stage("fetch_fundamentals"):
+        fundamentals = get_fundamentals(symbol)
+    with stage("fetch_basic"):
+        basic = get_basic_data(symbol)
+    return {
+        "history": df,
+        "fundamentals": fundamentals,
+        "basic": basic,
+    }
+
+
+def store_symbol_data(conn, symbol: str, data):
+    """
+    Schreibt die mit fetch_symbol_data geladenen Daten in die Datenbank.
+    """
+    basic_data = data["basic"]
+
+    # Stammdaten zuerst, prices_daily und fundamentals referenzieren stocks
+    with stage("write_basic"):
+        save_stock_basic(
+            conn,
+            symbol,
+            name=basic_data.get("name"),
+            sector=basic_data.get("sector"),
+            industry=basic_data.get("industry")
+        )
+    if data["history"].empty:
+        price_stats = {"rows": 0, "method": None, "seconds": 0.0}
+    else:
+        with stage("write_prices"):
+            price_stats = insert_prices(conn, symbol, data["history"])
+        count("rows_written.prices", price_stats["rows"])
+        # Indikatoren ab dem ersten neu geschriebenen Tag fortschreiben
+        with stage("write_indicators"):
+            count("rows_written.indicators",
+                  materialize_indicators(conn, symbol, since=min(data["history"].index).date()))
+    with stage("write_fundamentals"):
+        if insert_fundamentals(conn, symbol, data["fundamentals"]):
+            count("rows_written.fundamentals")
+    bump_data_version(conn)
+
+    return price_stats
+
+
+def materialize_indicators(conn, symbol: str, since=None):
+    """
+    Aktualisiert indicators_daily für alle Kurstage ab since.
+
+    Gibt es einen gespeicherten Zustand am Handelstag direkt vor since, werden nur die neuen Tage
+    aus den letzten HISTORY_DAYS Kursen und dem RSI-Zustand berechnet. Sonst (erster Lauf,
+    Lücke) wird die ganze Historie des Symbols neu berechnet. Gibt die Anzahl geschriebener Zeilen zurück.
+    """
+    if since is not None:
+        new_dates, new_close = get_closes(conn, symbol, since=since)
+        if not new_dates:
+            return 0
+        history_dates, history_close = get_closes(conn, symbol, before=since, limit=HISTORY_DAYS)
+        state = get_indicator_state(conn, symbol, since)
+        if (state and history_dates and state[0] == history_dates[-1]
+                and state[1] is not None and state[2] is not None):
+            values = update_materialized_indicators(history_close, new_close, state[1], state[2])
+            return upsert_indicators(conn, symbol, new_dates, values, MATERIALIZED_COLUMNS)
+
+    # Vollständige Neuberechnung
+    dates, close = get_closes(conn, symbol)
+    if not dates:
+        return 0
+    values = materialized_indicators(close)
+    return upsert_indicators(conn, symbol, dates, values, MATERIALIZED_COLUMNS)
+
+
+def run_data_pipeline(conn, symbol: str, incremental=True):
+    """
+    Lädt und speichert ein Symbol. Im inkrementellen Modus werden nur die
+    Handelstage ab dem letzten gespeicherten Datum nachgeladen.
+    """
+    with metrics.run("run_data_pipeline", symbol=symbol):
+        with stage("latest_dates"):
+            since = get_latest_price_dates(conn, [symbol]).get(symbol) if incremental else None
+        data = fetch_symbol_data(symbol, since=since)
+        return store_symbol_data(conn, symbol, data)
+
+
+def run_intraday_pipeline(conn, symbol: str, interval="60min", output_size=None):
+    """
+    Lädt Intraday-Kurse eines Symbols von Alpha Vantage und speichert sie in prices_intraday.
+
+    Ohne gespeicherte Bars wird der volle Zeitraum geladen (output_size="full"), sonst nur so viel,
+    dass die Lücke seit dem letzten gespeicherten Bar geschlossen wird (intraday_requests: die
+    letzten 100 Bars, die letzten 30 Tage oder monatsweise); geschrieben werden nur Bars ab dem
+    letzten gespeicherten Zeitstempel (der letzte Bar erneut, er kann noch unvollständig gewesen sein).
+    """
+    from alpha_vantage_test.alpha_vantage_api import get_intraday, parse_intraday, intraday_requests, combine_intraday
+
+    latest = get_latest_intraday_ts(conn, symbol, interval)
+    fetches = [(output_size, None)] if output_size else intraday_requests(latest, interval)
+    df = combine_intraday([parse_intraday(get_intraday(symbol, interval, size, month)) for size, month in fetches])
+    if latest is not None:
+        df = df[df.index >= latest]
+
+    save_stock_basic(conn, symbol)
+    stats = insert_intraday(conn, symbol, interval, df)
+    if stats["written"]:
+        bump_data_version(conn)
+    return stats
+
+
+def run_intraday_batch_pipeline(conn, symbols, interval="60min", provider=None):
+    """
+    Wie run_intraday_pipeline für viele Symbole: alle Abrufe laufen gleichzeitig in einer
+    Event-Loop über den asynchronen Alpha-Vantage-Provider (oder provider), der eine Session mit
+    begrenzten Verbindungen je Host teilt; danach wird nacheinander über conn geschrieben.
+    Gibt (stats je Symbol, Fehler je Symbol) zurück.
+    """
+    from alpha_vantage_test.alpha_vantage_api import intraday_requests, combine_intraday
+    from alpha_vantage_test.alpha_vantage_async import AlphaVantageProvider
+
+    symbols = list(dict.fromkeys(s.upper() for s in symbols if s))
+    latest = {symbol: get_latest_intraday_ts(conn, symbol, interval) for symbol in symbols}
+
+    async def fetch(av, symbol):
+        frames = await asyncio.gather(*(av.intraday(symbol, interval, size, month)
+                                        for size, month in intraday_requests(latest[symbol], interval)))
+        return combine_intraday(frames)
+
+    async def fetch_all():
+        if provider is not None:
+            return await fetch_many(lambda symbol: fetch(provider, symbol), symbols)
+        async with AlphaVantageProvider() as av:
+            return await fetch_many(lambda symbol: fetch(av, symbol), symbols)
+
+    frames, errors = asyncio.run(fetch_all())
+
+    stats = {}
+    for symbol, df in frames.items():
+        if latest[symbol] is not None:
+            df = df[df.index >= latest[symbol]]
+        save_stock_basic(conn, symbol)
+        stats[symbol] = insert_intraday(conn, symbol, interval, df)
+    if any(s["written"] for s in stats.values()):
+        bump_data_version(conn)
+    return stats, errors
+
+
+def run_batch_pipeline(symbols, max_workers=8, pool_size=4, pool=None, incremental=True, priority=PRIORITY_BULK):
+    """
+    Führt die Pipeline für mehrere Symbole parallel aus.
+
+    Die yfinance-Abfragen laufen in einem Thread-Pool mit max_workers Threads,
+    geschrieben wird über den gemeinsamen Connection-Pool (oder pool) mit höchstens
+    pool_size gleichzeitigen Verbindungen.
+    Die Abrufe laufen mit priority durch den Fetch-Scheduler (PRIORITY_INTERACTIVE für das Dashboard).
+    Kurse werden vorab für alle Symbole parallel geladen (prefetch_histories, ein Request je Symbol);
+    Symbole, deren Kurse dabei nicht geladen werden konnten, werden mit diesem Fehler zurückgegeben.
+    Fehler werden pro Symbol gesammelt statt den ganzen Lauf abzubrechen.
+    Danach werden die Portfolio-Wertreihen mit den neuen Kursen fortgeschrieben.
+    Dauer je Stufe und Zähler laufen in instrumentation.metrics auf, der Lauf-Bericht geht an dessen Hooks.
+    Gibt eine Liste von Dicts mit symbol, ok, error, price_stats und seconds zurück.
+    """
+    symbols = list(dict.fromkeys(s.upper() for s in symbols if s))
+    if not symbols:
+        return []
+
+    pool = pool or get_pool()
+    write_slots = threading.BoundedSemaphore(pool_size)
+
+    latest_dates = {}
+
+    def process(symbol):
+        start = time.perf_counter()
+        try:
+            with fetch_priority(priority):
+                data = fetch_symbol_data(symbol, since=latest_dates.get(symbol), history=histories.get(symbol))
+            with write_slots, pool.connection() as conn:
+                price_stats = store_symbol_data(conn, symbol, data)
+            return {"symbol": symbol, "ok": True, "error": None,
+                    "price_stats": price_stats, "seconds": time.perf_counter() - start}
+        except Exception as e:
+            return {"symbol": symbol, "ok": False, "error": e,
+                    "price_stats": None, "seconds": time.perf_counter() - start}
+
+    with metrics.run("run_batch_pipeline", symbols=len(symbols)):
+        if incremental:
+            with stage("latest_dates"), pool.connection() as conn:
+                latest_dates.update(get_latest_price_dates(conn, symbols))
+
+        with fetch_priority(priority), stage("prefetch_histories"):
+            histories, history_errors = prefetch_histories(symbols, starts=latest_dates)
+
+        # Der Kursabruf wurde im Scheduler schon wiederholt, ein zweiter Versuch je Symbol bringt nichts
+        results = [{"symbol": symbol, "ok": False, "error": error, "price_stats": None, "seconds": 0.0}
+                   for symbol, error in history_errors.items()]
+        if results:
+            count("symbols_failed", len(results))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Mit dem Kontext des Laufs, damit Stufen und Zähler der Worker in dessen Bericht landen
+            futures = [executor.submit(contextvars.copy_context().run, process, symbol)
+                       for symbol in symbols if symbol not in history_errors]
+            for future in as_completed(futures):
+                result = future.result()
+                count("symbols_ok" if result["ok"] else "symbols_failed")
+                results.append(result)
+
+        # Portfolio-Wertreihen mit den neuen Kursen fortschreiben (auch für das Dashboard)
+        try:
+            with stage("refresh_portfolio_values"), pool.connection() as conn:
+                count("rows_written.portfolio_values", refresh_portfolio_values(conn))
+        except Exception as e:
+            # Die Kurse sind gespeichert, der nächste Lauf holt die Bewertung nach
+            print(f"Fehler beim Aktualisieren der Portfolio-Werte: {e}")
+            count("errors.refresh_portfolio_values")
+
+    order = {symbol: i for i, symbol in enumerate(symbols)}
+    results.sort(key=lambda r: order[r["symbol"]])
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pipeline für mehrere Symbole parallel ausführen")
+    parser.add_argument("symbols", nargs="*", help="Symbole (Standard: alle aus db/symbols.csv)")
+    parser.add_argument("--workers", type=int, default=8, help="Anzahl paralleler Abrufe")
+    parser.add_argument("--pool-size", type=int, default=4, help="Maximale Anzahl DB-Verbindungen")
+    parser.add_argument("--full", action="store_true", help="Immer das ganze letzte Jahr laden")
+    parser.add_argument("--intraday", metavar="INTERVAL",
+                        help="Intraday-Kurse von Alpha Vantage laden statt Tageskursen, z.B. 60min")
+    parser.add_argument("--report", action="store_true", help="Dauer je Stufe, Zähler und Cache-Trefferquoten ausgeben")
+    parser.add_argument("--metrics-json", metavar="PATH", help="Lauf-Bericht als JSON-Zeile an PATH anhängen")
+    parser.add_argument("--metrics-prom", metavar="PATH", help="Metriken im Prometheus-Textformat nach PATH schreiben")
+    parser.add_argument("--profile", metavar="SYMBOL", help="Nur SYMBOL verarbeiten, unter dem Profiler")
+    parser.add_argument("--profiler", choices=["cprofile", "pyinstrument"], default="cprofile")
+    parser.add_argument("--profile-output", metavar="PATH", help="Rohprofil speichern (.prof bzw. .html)")
+    args = parser.parse_args()
+
+    if args.report:
+        metrics.add_hook(lambda report: print(format_report(report)))
+    if args.metrics_json:
+        metrics.add_hook(json_hook(args.metrics_json))
+    if args.metrics_prom:
+        metrics.add_hook(prometheus_hook(args.metrics_prom))
+
+    symbol_list = args.symbols or pd.read_csv(SYMBOLS_CSV, header=None)[0].tolist()
+
+    if args.profile:
+        with get_pool().connection() as conn:
+            price_stats, text = profile(run_data_pipeline, conn, args.profile.upper(), incremental=not args.full,
+                                        profiler=args.profiler, output=args.profile_output)
+        print(text)
+        print(f"✅ {args.profile.upper()}: {price_stats}")
+    elif args.intraday:
+        start = time.perf_counter()
+        with get_pool().connection() as conn:
+            stats, errors = run_intraday_batch_pipeline(conn, symbol_list, args.intraday)
+        for symbol, error in errors.items():
+            print(f"❌ {symbol}: {error}")
+        written = sum(s["written"] for s in stats.values())
+        print(f"✅ {len(stats)}/{len(stats) + len(errors)} Symbole, {written} Intraday-Bars "
+              f"in {time.perf_counter() - start:.1f}s.")
+    else:
+        start = time.perf_counter()
+        results = run_batch_pipeline(symbol_list, max_workers=args.workers, pool_size=args.pool_size,
+                                     incremental=not args.full)
+        elapsed = time.perf_counter() - start
 
-    fundamentals_data = get_fundamentals(symbol)
-    basic_data = get_basic_data(symbol)
-
-    insert_prices(conn, symbol, df)
-    insert_fundamentals(conn, symbol, fundamentals_data)
-    save_stock_basic(
-        conn,
-        symbol,
-        name=basic_data.get("name"),
-        sector=basic_data.get("sector"),
-        industry=basic_data.get("industry")
-    )
\ No newline at end of file
+        failed = [r for r in results if not r["ok"]]
+        for r in failed:
+            print(f"❌ {r['symbol']}: {r['error']}")
+        print(f"✅ {len(results) - len(failed)}/{len(results)} Symbole in {elapsed:.1f}s verarbeitet.")
@@ -0,0 +1,167 @@
+# portfolio.py
+# Portfolio-Bewertung und Risikokennzahlen.
+# Alle Portfolios werden gemeinsam bewertet: eine Kursmatrix (Symbole x Tage) für die Vereinigung
+# aller gehaltenen Symbole, die Transaktionen werden vektorisiert darauf abgebildet. Die Wertreihen
+# werden in portfolio_values fortgeschrieben, bei einem Refresh werden nur neue Tage bewertet.
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from db import queries
+from db.persistence import (
+    get_portfolio_transactions, get_last_portfolio_values, upsert_portfolio_values, get_portfolio_returns,
+    bump_data_version
+)
+from indicators import to_matrix
+
+TRADING_DAYS = 252
+# Kalendertage vor dem ersten neuen Tag, aus denen der letzte bekannte Kurs fortgeschrieben wird
+LOOKBACK_DAYS = 10
+# Transaktionen je Block bei der Bewertung (begrenzt den Speicher: Block x Tage)
+TRANSACTION_BLOCK = 2000
+
+
+def _ffill(x):
+    """Schreibt den letzten gültigen Wert je Zeile fort (führende NaN bleiben NaN)"""
+    idx = np.where(np.isnan(x), 0, np.arange(x.shape[1]))
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    return np.take_along_axis(x, idx, axis=1)
+
+
+def valuation(transactions, symbols, dates, close):
+    """
+    Wert und Zahlungsströme aller Portfolios je Tag.
+
+    transactions: Tabelle mit portfolio_id, symbol, date, quantity, price (None = Schlusskurs);
+    symbols/dates/close: Kursmatrix (Symbole x Tage, fortgeschrieben).
+    Gibt (portfolio_ids, values, flows) zurück, values/flows als Matrix (Portfolios x Tage).
+    Der Bestand einer Transaktion zählt ab ihrem Datum, Käufe/Verkäufe gehen als Zahlungsstrom ein.
+    """
+    dates = pd.DatetimeIndex(dates)
+    symbol_pos = {symbol: i for i, symbol in enumerate(symbols)}
+    tx = transactions[transactions["symbol"].isin(symbol_pos)]
+
+    portfolio_ids, p_idx = np.unique(tx["portfolio_id"].to_numpy(), return_inverse=True)
+    s_idx = tx["symbol"].map(symbol_pos).to_numpy()
+    d_idx = dates.searchsorted(pd.to_datetime(tx["date"]).to_numpy())
+    quantity = tx["quantity"].to_numpy(dtype="float64")
+    prices = np.nan_to_num(close)
+
+    values = np.zeros((len(portfolio_ids), len(dates)))
+    days = np.arange(len(dates))
+    for start in range(0, len(tx), TRANSACTION_BLOCK):
+        block = slice(start, start + TRANSACTION_BLOCK)
+        held = days[np.newaxis, :] >= d_idx[block, np.newaxis]
+        np.add.at(values, p_idx[block], quantity[block, np.newaxis] * prices[s_idx[block]] * held)
+
+    # Zahlungsströme am Buchungstag: Transaktionspreis, sonst Schlusskurs
+    in_range = d_idx < len(dates)
+    trade_price = tx["price"].to_numpy(dtype="float64")
+    trade_price = np.where(np.isnan(trade_price), prices[s_idx, np.minimum(d_idx, len(dates) - 1)], trade_price)
+    flows = np.zeros_like(values)
+    np.add.at(flows, (p_idx[in_range], d_idx[in_range]), (quantity * trade_price)[in_range])
+    return portfolio_ids, values, flows
+
+
+def daily_returns(values, flows):
+    """
+    Zeitgewichtete Tagesrenditen (Portfolios x Tage): Käufe und Verkäufe zählen nicht als Rendite.
+    NaN, solange das Portfolio am Vortag keinen Wert hatte.
+    """
+    prev = np.full_like(values, np.nan)
+    prev[:, 1:] = values[:, :-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(prev > 0, (values - flows) / prev - 1.0, np.nan)
+
+
+def risk_metrics(returns, periods_per_year=TRADING_DAYS, var_level=0.95, risk_free=0.0):
+    """
+    Kennzahlen je Portfolio aus einer Renditematrix (Portfolios x Tage, NaN = kein Wert),
+    alle aus derselben Matrix berechnet: Gesamtrendite, Volatilität, Sharpe Ratio,
+    maximaler Drawdown und historischer Value at Risk (Tagesverlust, der mit var_level nicht überschritten wird).
+    """
+    returns = np.asarray(returns, dtype="float64")
+    filled = np.nan_to_num(returns)
+    growth = np.cumprod(1.0 + filled, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.nanmean(returns, axis=1)
+        std = np.nanstd(returns, axis=1, ddof=1)
+        sharpe = np.where(std > 0, (mean - risk_free / periods_per_year) / std * np.sqrt(periods_per_year), np.nan)
+        var = -np.nanquantile(returns, 1.0 - var_level, axis=1)
+    return {
+        "total_return": growth[:, -1] - 1.0,
+        "volatility": std * np.sqrt(periods_per_year),
+        "sharpe": sharpe,
+        "max_drawdown": (growth / np.maximum.accumulate(growth, axis=1) - 1.0).min(axis=1),
+        "var": var,
+        "days": (~np.isnan(returns)).sum(axis=1),
+    }
+
+
+def refresh_portfolio_values(conn):
+    """
+    Schreibt die Wertreihen aller Portfolios bis zum letzten Kurstag fort.
+
+    Je Portfolio werden nur Tage nach dem letzten gespeicherten Wert bewertet (neue Portfolios ab
+    ihrer ersten Transaktion). Alle Portfolios teilen sich eine Kursabfrage und eine Kursmatrix.
+    Gibt die Anzahl geschriebener Zeilen zurück.
+    """
+    tx = get_portfolio_transactions(conn)
+    if tx.empty:
+        return 0
+    last = get_last_portfolio_values(conn)
+    first_tx = tx.groupby("portfolio_id")["date"].min()
+    starts = pd.Series({p: last[p][0] + timedelta(days=1) if p in last else first_tx[p] for p in first_tx.index})
+
+    closes = queries.load_closes(conn, sorted(tx["symbol"].unique()), starts.min() - timedelta(days=LOOKBACK_DAYS))
+    if closes.empty:
+        return 0
+    symbols, dates, close = to_matrix(closes, "price")
+    portfolio_ids, values, flows = valuation(tx, symbols, dates, _ffill(close))
+    returns = daily_returns(values, flows)
+
+    # Nur die neuen Tage je Portfolio schreiben
+    dates = pd.DatetimeIndex(dates)
+    new = dates.to_numpy()[np.newaxis, :] >= pd.to_datetime(starts.reindex(portfolio_ids)).to_numpy()[:, np.newaxis]
+    rows_p, rows_d = np.nonzero(new)
+    if len(rows_p) == 0:
+        return 0
+    frame = pd.DataFrame({
+        "portfolio_id": portfolio_ids[rows_p].astype(int),
+        "date": dates[rows_d].date,
+        "value": values[rows_p, rows_d],
+        "daily_return": returns[rows_p, rows_d],
+    })
+    written = upsert_portfolio_values(conn, frame)
+    bump_data_version(conn)
+    return written
+
+
+def portfolio_metrics(conn, since=None, **kwargs):
+    """
+    Risikokennzahlen aller Portfolios aus den gespeicherten Wertreihen (eine Abfrage, eine
+    gemeinsame Renditematrix). Gibt einen DataFrame mit einer Zeile je Portfolio zurück.
+    """
+    df = get_portfolio_returns(conn, since)
+    if df.empty:
+        return pd.DataFrame()
+    wide = df.pivot(index="portfolio_id", columns="date", values="daily_return")
+    metrics = risk_metrics(wide.to_numpy(dtype="float64"), **kwargs)
+    result = pd.DataFrame(metrics, index=wide.index)
+    result["value"] = df.groupby("portfolio_id")["value"].last()
+    return result.reset_index()
+
+
+def holdings(transactions, latest_prices):
+    """
+    Aktueller Bestand je Symbol mit Marktwert und Gewicht.
+    transactions: Transaktionen eines Portfolios, latest_prices: Series Symbol -> letzter Schlusskurs.
+    """
+    positions = transactions.groupby("symbol")["quantity"].sum()
+    positions = positions[positions.abs() > 1e-9]
+    frame = pd.DataFrame({"menge": positions, "kurs": latest_prices.reindex(positions.index)})
+    frame["marktwert"] = frame["menge"] * frame["kurs"]
+    total = frame["marktwert"].sum()
+    frame["gewicht"] = frame["marktwert"] / total if total else np.nan
+    return frame.sort_values("marktwert", ascending=False)
@@ -0,0 +1,218 @@
+# price_cache.py
+# Lokaler Parquet-Cache für Tageskurse (OHLCV) vor yfinance und Postgres.
+# Ablage: <PRICE_CACHE_DIR>/<SYMBOL>/<JAHR>.parquet, gelesen wird memory-mapped und nur der
+# angefragte Zeitraum (Row-Group-Statistiken). Ohne pyarrow ist der Cache deaktiviert.
+import os
+import threading
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optionale Abhängigkeit
+    pa = None
+    pq = None
+
+CACHE_DIR = os.getenv("PRICE_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "iox-aktien", "prices"))
+MAX_BYTES = int(os.getenv("PRICE_CACHE_MAX_BYTES", str(512 * 1024 ** 2)))
+# Kleine Row-Groups (etwa ein Monat), damit Zeitraum-Abfragen ganze Dateien überspringen können
+ROW_GROUP_SIZE = 32
+# Toleranz am Anfang eines Zeitraums (Wochenenden/Feiertage), bis zu der ein Zeitraum als abgedeckt gilt
+START_TOLERANCE_DAYS = 5
+
+PRICE_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def _to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return pd.Timestamp(value).date()
+
+
+class PriceCache:
+    """
+    Spaltenorientierter Cache für Tageskurse, partitioniert nach Symbol und Jahr.
+
+    write() hängt neue Tage an (vorhandene Tage werden überschrieben), read_range() liest nur
+    den angefragten Zeitraum. Überschreitet der Cache max_bytes, werden die am längsten nicht
+    benutzten Dateien gelöscht (LRU über die Änderungszeit, die bei jedem Lesen aktualisiert wird).
+    """
+
+    def __init__(self, root=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # Gesamtgröße der Dateien, beim ersten Schreiben einmal ermittelt und danach fortgeschrieben
+        self._size = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return pq is not None
+
+    def _symbol_dir(self, symbol):
+        return os.path.join(self.root, symbol.upper())
+
+    def _path(self, symbol, year):
+        return os.path.join(self._symbol_dir(symbol), f"{int(year)}.parquet")
+
+    def _years(self, symbol):
+        directory = self._symbol_dir(symbol)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(int(name.split(".")[0]) for name in os.listdir(directory) if name.endswith(".parquet"))
+
+    def _date_stats(self, path, which):
+        # Min/Max des Datums aus den Metadaten, ohne Daten zu lesen
+        metadata = pq.ParquetFile(path, memory_map=True).metadata
+        column = metadata.schema.names.index("date")
+        groups = [metadata.row_group(i).column(column).statistics for i in range(metadata.num_row_groups)]
+        values = [getattr(stats, which) for stats in groups if stats is not None and stats.has_min_max]
+        if not values:
+            return None
+        return _to_date(min(values) if which == "min" else max(values))
+
+    def coverage(self, symbol):
+        """(erstes, letztes) lückenlos gecachtes Datum eines Symbols (Jahresdateien ohne Lücke) oder (None, None)"""
+        if not self.enabled:
+            return None, None
+        years = self._years(symbol)
+        if not years:
+            return None, None
+        # Nur der lückenlose Block bis zum letzten Jahr zählt (ein verdrängtes Jahr dazwischen
+        # darf nicht als abgedeckt gelten)
+        first = len(years) - 1
+        while first > 0 and years[first - 1] == years[first] - 1:
+            first -= 1
+        years = years[first:]
+        return (self._date_stats(self._path(symbol, years[0]), "min"),
+                self._date_stats(self._path(symbol, years[-1]), "max"))
+
+    def covers(self, symbol, start, end):
+        """True, wenn der Cache den Zeitraum [start, end] für das Symbol vollständig enthält"""
+        first, last = self.coverage(symbol)
+        if first is None or start is None or end is None:
+            return False
+        return first <= _to_date(start) + timedelta(days=START_TOLERANCE_DAYS) and last >= _to_date(end)
+
+    def read_range(self, symbol, start=None, end=None):
+        """
+        Kurse eines Symbols im Zeitraum [start, end] im yfinance-Format
+        (DatetimeIndex, Spalten Open/High/Low/Close/Volume) oder None, wenn nichts gecacht ist.
+        """
+        if not self.enabled:
+            return None
+        start = _to_date(start) if start is not None else None
+        end = _to_date(end) if end is not None else None
+
+        filters = []
+        if start is not None:
+            filters.append(("date", ">=", start))
+        if end is not None:
+            filters.append(("date", "<=", end))
+
+        tables = []
+        for year in self._years(symbol):
+            if (start and year < start.year) or (end and year > end.year):
+                continue
+            path = self._path(symbol, year)
+            tables.append(pq.read_table(path, memory_map=True, filters=filters or None))
+            os.utime(path)  # für die LRU-Verdrängung als benutzt markieren
+
+        with self._lock:
+            if not tables or sum(t.num_rows for t in tables) == 0:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        df = pa.concat_tables(tables).to_pandas()
+        df.index = pd.DatetimeIndex(pd.to_datetime(df.pop("date")), name="Date")
+        return df.rename(columns=str.capitalize)[PRICE_COLUMNS].sort_index()
+
+    def write(self, symbol, df):
+        """
+        Hängt Kurse im yfinance-Format an den Cache an. Bereits gecachte Tage werden ersetzt.
+        """
+        if not self.enabled or df is None or df.empty:
+            return 0
+
+        frame = df[PRICE_COLUMNS].rename(columns=str.lower)
+        frame.insert(0, "date", pd.DatetimeIndex(df.index).date)
+        frame["volume"] = pd.to_numeric(frame["volume"], errors="coerce").astype("float64")
+        years = pd.Series([d.year for d in frame["date"]], index=frame.index)
+
+        os.makedirs(self._symbol_dir(symbol), exist_ok=True)
+        for year, part in frame.groupby(years):
+            path = self._path(symbol, year)
+            if os.path.exists(path):
+                existing = pq.read_table(path, memory_map=True).to_pandas()
+                existing["date"] = [_to_date(d) for d in existing["date"]]
+                part = pd.concat([existing, part], ignore_index=True)
+            part = part.drop_duplicates(subset=["date"], keep="last").sort_values("date")
+
+            table = pa.Table.from_pandas(part, preserve_index=False,
+                                         schema=pa.schema([("date", pa.date32()), ("open", pa.float64()),
+                                                           ("high", pa.float64()), ("low", pa.float64()),
+                                                           ("close", pa.float64()), ("volume", pa.float64())]))
+            # Erst in eine temporäre Datei schreiben, damit parallele Leser nie eine halbe Datei sehen
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            pq.write_table(table, tmp_path, row_group_size=ROW_GROUP_SIZE)
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            new_size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+            with self._lock:
+                if self._size is not None:
+                    self._size += new_size - old_size
+
+        # Verzeichnis nur durchsuchen, wenn die fortgeschriebene Größe das Limit überschreitet
+        with self._lock:
+            over = self._size is None or self._size > self.max_bytes
+        if over:
+            self.evict()
+        return len(frame)
+
+    def size(self):
+        total = 0
+        for directory, _, files in os.walk(self.root):
+            total += sum(os.path.getsize(os.path.join(directory, f)) for f in files if f.endswith(".parquet"))
+        return total
+
+    def evict(self, max_bytes=None):
+        """Löscht die am längsten nicht benutzten Dateien, bis der Cache höchstens max_bytes groß ist"""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        files = []
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                if name.endswith(".parquet"):
+                    path = os.path.join(directory, name)
+                    stat = os.stat(path)
+                    files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for _, size, path in sorted(files):
+            if total <= max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        with self._lock:
+            self._size = total
+        return removed
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+price_cache = PriceCache()
@@ -0,0 +1,135 @@
+# screener.py
+# Screener über alle Symbole in stocks: Filter und Sortierung werden in eine einzige
+# mengenbasierte SQL-Abfrage übersetzt (jüngste Fundamentaldaten, letzter Kurs, 50-Tage-Momentum).
+# Feldnamen und Operatoren sind fest vorgegeben, Werte werden immer als Parameter gebunden.
+import re
+from typing import NamedTuple
+
+import pandas as pd
+
+# Feldname -> (SQL-Ausdruck in der Abfrage, Beschreibung)
+FIELDS = {
+    "symbol": ("symbol", "Symbol"),
+    "name": ("name", "Name"),
+    "sektor": ("sector", "Sektor"),
+    "branche": ("industry", "Branche"),
+    "kurs": ("kurs", "Letzter Schlusskurs"),
+    "marktkapitalisierung": ("marktkapitalisierung", "Marktkapitalisierung (Market Cap)"),
+    "umsatz": ("umsatz", "Umsatz (Revenue)"),
+    "ebitda": ("ebitda", "EBITDA"),
+    "kgv": ("kgv", "KGV (PE Ratio)"),
+    "dividendenrendite": ("dividendenrendite", "Dividendenrendite in %"),
+    "beta": ("beta", "Beta"),
+    "momentum_50": ("momentum_50", "Kursänderung über 50 Handelstage (0.1 = +10 %)"),
+    "momentum_dezil": ("momentum_dezil", "Dezil des 50-Tage-Momentums (10 = beste 10 %)"),
+}
+TEXT_FIELDS = {"symbol", "name", "sektor", "branche"}
+OPERATORS = {"<", "<=", ">", ">=", "=", "!="}
+
+MOMENTUM_DAYS = 50
+
+
+class Filter(NamedTuple):
+    field: str
+    op: str
+    value: object
+
+
+_OPERATOR_RE = r"(?:<=|>=|!=|=|<|>)"
+# Ein Filter "feld op wert"; getrennt wird nur dort, wo nach Komma bzw. "and"/"und" ein
+# vollständiger weiterer Filter beginnt, damit Werte wie "Oil and Gas" zusammenbleiben.
+# Werte können zusätzlich in Anführungszeichen stehen.
+_FILTER_RE = re.compile(
+    rf"\s*(\w+)\s*({_OPERATOR_RE})\s*(\"[^\"]*\"|'[^']*'|.+?)\s*"
+    rf"(?:(?:,|\band\b|\bund\b)(?=\s*\w+\s*{_OPERATOR_RE})|,?\s*$)",
+    re.IGNORECASE,
+)
+
+
+def parse_filters(text):
+    """
+    Liest Filter der Form "kgv < 15, dividendenrendite > 3, sektor = Oil and Gas"
+    (getrennt durch Komma oder "and"/"und"). Unbekannte Felder lösen ValueError aus.
+    """
+    filters = []
+    text = text or ""
+    pos = 0
+    while text[pos:].strip():
+        match = _FILTER_RE.match(text, pos)
+        if not match:
+            raise ValueError(f"Ungültiger Filter: '{text[pos:].strip()}'")
+        pos = match.end()
+        field, op, raw = match.group(1).lower(), match.group(2), match.group(3).strip("'\"")
+        if field not in FIELDS:
+            raise ValueError(f"Unbekanntes Feld '{field}', erlaubt: {', '.join(FIELDS)}")
+        if field in TEXT_FIELDS:
+            value = raw
+        else:
+            try:
+                value = float(raw.rstrip("%"))
+            except ValueError:
+                raise ValueError(f"'{raw}' ist keine Zahl (Feld {field})") from None
+        filters.append(Filter(field, op, value))
+    return filters
+
+
+def build_screen_query(filters, order_by="marktkapitalisierung", descending=True, limit=100):
+    """Übersetzt Filter und Sortierung in (SQL, Parameter). Nur Felder aus FIELDS sind erlaubt."""
+    conditions, params = [], {"momentum_offset": MOMENTUM_DAYS + 1, "limit": int(limit)}
+    for i, f in enumerate(filters):
+        if f.field not in FIELDS or f.op not in OPERATORS:
+            raise ValueError(f"Ungültiger Filter: {f}")
+        op = "<>" if f.op == "!=" else f.op
+        conditions.append(f"{FIELDS[f.field][0]} {op} %(v{i})s")
+        params[f"v{i}"] = f.value
+    if order_by not in FIELDS:
+        raise ValueError(f"Unbekanntes Sortierfeld '{order_by}'")
+
+    where = " AND ".join(conditions) or "TRUE"
+    direction = "DESC" if descending else "ASC"
+    query = f"""
+        WITH recent_prices AS (
+            -- Nur das letzte Quartal lesen (Index auf (stock_symbol, date)), reicht für 50 Handelstage
+            SELECT stock_symbol, close,
+                   row_number() OVER (PARTITION BY stock_symbol ORDER BY date DESC) AS rn
+            FROM prices_daily
+            WHERE date >= (SELECT MAX(date) FROM prices_daily) - INTERVAL '100 days'
+        ),
+        momentum AS (
+            SELECT stock_symbol,
+                   MAX(close) FILTER (WHERE rn = 1) AS kurs,
+                   MAX(close) FILTER (WHERE rn = 1)
+                       / NULLIF(MAX(close) FILTER (WHERE rn = %(momentum_offset)s), 0) - 1 AS momentum_50
+            FROM recent_prices
+            WHERE rn IN (1, %(momentum_offset)s)
+            GROUP BY stock_symbol
+        ),
+        universe AS (
+            SELECT s.symbol, s.name, s.sector, s.industry,
+                   m.kurs,
+                   f.market_cap     AS marktkapitalisierung,
+                   f.revenue        AS umsatz,
+                   f.ebitda,
+                   f.pe_ratio       AS kgv,
+                   f.dividend_yield AS dividendenrendite,
+                   f.beta,
+                   m.momentum_50,
+                   CASE WHEN m.momentum_50 IS NOT NULL THEN
+                       ntile(10) OVER (PARTITION BY m.momentum_50 IS NULL ORDER BY m.momentum_50)
+                   END AS momentum_dezil
+            FROM stocks s
+            LEFT JOIN fundamentals_latest f ON f.stock_symbol = s.symbol
+            LEFT JOIN momentum m ON m.stock_symbol = s.symbol
+        )
+        SELECT * FROM universe
+        WHERE {where}
+        ORDER BY {FIELDS[order_by][0]} {direction} NULLS LAST, symbol
+        LIMIT %(limit)s
+    """
+    return query, params
+
+
+def screen(conn, filters, order_by="marktkapitalisierung", descending=True, limit=100):
+    """Führt den Screener über alle Symbole aus und gibt die Treffer als DataFrame zurück"""
+    query, params = build_screen_query(filters, order_by, descending, limit)
+    return pd.read_sql(query, conn, params=params)
@@ -1,19 +1,145 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from datetime import date, timedelta
+
 import yfinance as yf
 import pandas as pd
 
+from data_provider import DataProvider
+from fetch_scheduler import get_scheduler, RateLimitError
+from instrumentation import count
+from price_cache import price_cache, PRICE_COLUMNS, START_TOLERANCE_DAYS
+
+
+class InfoCache:
+    """
+    Thread-safe per-symbol cache for the Ticker.info payload.
+    Entries expire after ttl seconds, at most maxsize symbols are kept (LRU).
+    """
+
+    def __init__(self, ttl=900, maxsize=1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, symbol: str):
+        key = symbol.upper()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, info = entry
+                if time.monotonic() - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return info
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, symbol: str, info):
+        key = symbol.upper()
+        with self._lock:
+            self._entries[key] = (time.monotonic(), info)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+info_cache = InfoCache()
+
+
+def _is_rate_limited(exc):
+    # yfinance meldet HTTP 429 je nach Version als YFRateLimitError oder nur über den Text
+    return type(exc).__name__ == "YFRateLimitError" or "too many requests" in str(exc).lower()
+
+
+def _submit(fn, *args, **kwargs):
+    """
+    Queues a yfinance request in the shared fetch scheduler (rate limit, retries with backoff,
+    priority) and returns its future. Throttling is raised as RateLimitError once the retries are used up.
+    """
+    def request():
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if _is_rate_limited(e):
+                raise RateLimitError(str(e)) from e
+            raise
+
+    return get_scheduler().submit("yfinance", request)
+
+
+def _fetch(fn, *args, **kwargs):
+    """Like _submit, but waits for the result."""
+    return _submit(fn, *args, **kwargs).result()
+
+
+def get_info(symbol: str):
+    """
+    Gets the Ticker.info payload, fetched at most once per symbol within the cache TTL.
+    """
+    info = info_cache.get(symbol)
+    if info is None:
+        info = _fetch(lambda: yf.Ticker(symbol).get_info())
+        # Leere Antworten nicht cachen, damit ein erneuter Versuch möglich bleibt
+        if info:
+            info_cache.put(symbol, info)
+    return info
+
+
+def is_valid_symbol(symbol: str) -> bool:
+    """
+    Checks whether yfinance knows the symbol (uses the shared info cache).
+    """
+    try:
+        info = get_info(symbol)
+        return bool(info and "longName" in info)
+    except RateLimitError:
+        # Gedrosselt heißt nicht ungültig, der Aufrufer soll den Fehler sehen
+        raise
+    except Exception:
+        return False
+
+
 def get_basic_data(symbol: str):
     """
     Gets name, sector, industry from yfinance.
     """
     try:
-        info = yf.Ticker(symbol).get_info()
+        info = get_info(symbol)
         return {
             "name": info.get("longName"),
             "sector": info.get("sector"),
             "industry": info.get("industry")
         }
+    except RateLimitError:
+        raise
     except Exception as e:
         print(f"Fehler beim Abrufen der Basisdaten: {e}")
+        count("errors.fetch_basic")
         return {}
 
 
@@ -22,8 +148,7 @@ def get_fundamentals(symbol: str):
     Gets central fundamental data from yfinance.
     """
     try:
-        ticker = yf.Ticker(symbol)
-        info = ticker.get_info()
+        info = get_info(symbol)
 
         if not info:
             raise Exception("Keine Info-Daten verfügbar.")
@@ -39,21 +164,178 @@ def get_fundamentals(symbol: str):
             "Beta": info.get("beta"),
         }
 
+    except RateLimitError:
+        raise
     except Exception as e:
         print(f"Fehler beim Abrufen der Fundamentaldaten: {e}")
+        count("errors.fetch_fundamentals")
         return {}
 
+def _history_from_cache(symbol: str, start):
+    """
+    Serves daily prices from start onwards from the local price cache. Only the days after the
+    last cached day are fetched from yfinance (the last cached day itself again, it may have been
+    incomplete). Returns None if the cache does not reach back to start.
+    """
+    first, last = price_cache.coverage(symbol)
+    # Ein paar Tage Toleranz für Wochenenden/Feiertage am Anfang des Zeitraums
+    if last is None or first > start + timedelta(days=START_TOLERANCE_DAYS):
+        return None
+
+    if last < date.today():
+        try:
+            fresh = _fetch(lambda: yf.Ticker(symbol).history(start=last, interval="1d"))
+            price_cache.write(symbol, fresh[PRICE_COLUMNS] if not fresh.empty else fresh)
+        except Exception as e:
+            # Offline: mit dem gecachten Stand weiterarbeiten
+            print(f"Fehler beim Aktualisieren der Kursdaten für {symbol}, nutze Cache: {e}")
+            count("errors.price_cache_refresh")
+
+    df = price_cache.read_range(symbol, start)
+    return df if df is not None else pd.DataFrame(columns=PRICE_COLUMNS)
+
+
 def get_1y_history(symbol: str):
     """
-    Get daily price data for last year from yfinance
+    Get daily price data for last year (local price cache first, then yfinance)
     """
-    ticker = yf.Ticker(symbol)
-    df = ticker.history(period="1y", interval="1d")  # täglicher Kursverlauf über 1 Jahr
+    df = _history_from_cache(symbol, date.today() - timedelta(days=365))
+    if df is not None and not df.empty:
+        return df
+
+    # täglicher Kursverlauf über 1 Jahr
+    df = _fetch(lambda: yf.Ticker(symbol).history(period="1y", interval="1d"))
 
     if df.empty:
         print(f"Keine Kursdaten gefunden für {symbol}.")
+        count("errors.empty_history")
         return None
 
     # Stelle sicher, dass alle erwarteten Spalten vorhanden sind
-    return df[["Open", "High", "Low", "Close", "Volume"]].copy()
+    df = df[PRICE_COLUMNS].copy()
+    price_cache.write(symbol, df)
+    return df
+
+
+def get_history_since(symbol: str, start):
+    """
+    Get daily price data from start (inclusive) until today (local price cache first, then yfinance).
+    Returns an empty frame if there is nothing new, None if the request failed.
+    """
+    df = _history_from_cache(symbol, start)
+    if df is not None:
+        return df
+
+    try:
+        df = _fetch(lambda: yf.Ticker(symbol).history(start=start, interval="1d"))
+    except RateLimitError:
+        raise
+    except Exception as e:
+        print(f"Fehler beim Abrufen der Kursdaten für {symbol}: {e}")
+        count("errors.fetch_history")
+        return None
+
+    if df.empty:
+        return pd.DataFrame(columns=PRICE_COLUMNS)
+
+    df = df[PRICE_COLUMNS].copy()
+    price_cache.write(symbol, df)
+    return df
+
+
+class YFinanceProvider(DataProvider):
+    """
+    Async data provider for yfinance. yfinance itself is blocking, so each request runs in a
+    thread of the provider's own pool (concurrency threads, not asyncio's shared default executor)
+    and goes through the shared fetch scheduler, which applies the yfinance rate limit.
+    On timeout the awaiting task is cancelled; the thread finishes its request in the background.
+
+    run_batch_pipeline does not use this provider: it queues its price requests in the fetch
+    scheduler directly (prefetch_histories). The provider is for async callers that mix yfinance
+    with other sources in one event loop.
+    """
+
+    name = "yfinance"
+
+    def __init__(self, concurrency=8, **kwargs):
+        # The fetch scheduler applies the rate limit and retries throttled requests
+        kwargs.setdefault("limit", False)
+        kwargs.setdefault("max_retries", 0)
+        super().__init__(concurrency=concurrency, **kwargs)
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="yfinance-provider")
+
+    async def _in_thread(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def history(self, symbol, start=None):
+        if start is None:
+            return await self._call(self._in_thread, get_1y_history, symbol)
+        return await self._call(self._in_thread, get_history_since, symbol, start)
+
+    async def close(self):
+        # Requests still running after a timeout finish in the background
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def prefetch_histories(symbols, starts=None):
+    """
+    Daily prices for many symbols, fetched in parallel. yfinance has no multi-ticker history
+    endpoint (yf.download also sends one chart request per ticker), so every symbol is one request
+    and one rate-limit token; the requests are queued in the fetch scheduler together and run on
+    its workers in parallel. The number of requests only drops through the price cache.
+
+    starts maps symbol -> first date to load (inclusive); symbols without a start get the last
+    year. Symbols the local price cache already covers are only refreshed from their last cached day.
+    Returns (frames, errors): frames maps symbol -> DataFrame with PRICE_COLUMNS (empty if there
+    is nothing new), errors maps symbol -> exception for symbols that could not be loaded.
+    """
+    starts = starts or {}
+    one_year_ago = date.today() - timedelta(days=365)
+    wanted = {s: starts.get(s) or one_year_ago for s in dict.fromkeys(symbols)}
+
+    # Ab wann pro Symbol wirklich geladen werden muss: bei abgedecktem Cache nur ab dem letzten Tag
+    fetch_from = {}
+    for symbol, start in wanted.items():
+        first, last = price_cache.coverage(symbol)
+        covered = last is not None and first <= start + timedelta(days=START_TOLERANCE_DAYS)
+        if not covered:
+            fetch_from[symbol] = start
+        elif last < date.today():
+            fetch_from[symbol] = last
+
+    futures = {
+        symbol: _submit(lambda symbol=symbol, start=start: yf.Ticker(symbol).history(start=start, interval="1d"))
+        for symbol, start in fetch_from.items()
+    }
+
+    frames, errors = {}, {}
+    for symbol, future in futures.items():
+        try:
+            df = future.result()
+        except Exception as e:
+            count("errors.fetch_history")
+            if isinstance(e, RateLimitError) or not price_cache.enabled or fetch_from[symbol] == wanted[symbol]:
+                errors[symbol] = e
+            else:
+                # Offline: mit dem gecachten Stand weiterarbeiten
+                print(f"Fehler beim Aktualisieren der Kursdaten für {symbol}, nutze Cache: {e}")
+            continue
+
+        if df is None or df.empty:
+            # Ohne Cache und ohne vorhandene Kurse ist das ein Fehler, sonst gibt es nur nichts Neues
+            if fetch_from[symbol] == wanted[symbol] and symbol not in starts:
+                count("errors.empty_history")
+                errors[symbol] = ValueError(f"Keine Kursdaten gefunden für {symbol}.")
+            continue
+        df = df[PRICE_COLUMNS]
+        if price_cache.enabled:
+            price_cache.write(symbol, df)
+        else:
+            frames[symbol] = df[pd.DatetimeIndex(df.index).date >= wanted[symbol]].copy()
 
+    for symbol, start in wanted.items():
+        if symbol in errors or symbol in frames:
+            continue
+        df = price_cache.read_range(symbol, start)
+        frames[symbol] = df if df is not None else pd.DataFrame(columns=PRICE_COLUMNS)
+    return frames, errors
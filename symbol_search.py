@@ -0,0 +1,175 @@
+# symbol_search.py
+# In-Memory-Suchindex über Symbol, Name, Sektor und Branche aller Aktien in stocks.
+# Präfixsuche über sortierte Schlüssel (bisect), Tippfehler-tolerante Suche über Trigramme je Feld
+# und Wort. Der Index wird einmal aufgebaut und nur neu erstellt, wenn sich die Tabelle stocks ändert.
+import bisect
+import re
+import unicodedata
+from typing import NamedTuple
+
+import numpy as np
+
+# Punkte je Trefferart, der beste Treffer eines Symbols zählt
+SCORE_EXACT_SYMBOL = 100.0
+SCORE_SYMBOL_PREFIX = 90.0
+SCORE_NAME_PREFIX = 80.0
+SCORE_WORD_PREFIX = 70.0
+SCORE_SECTOR_PREFIX = 50.0
+# Höchstpunktzahl der unscharfen Suche (Anteil gemeinsamer Trigramme) auf Symbol/Name bzw. Sektor/Branche
+SCORE_FUZZY = 40.0
+SCORE_FUZZY_SECTOR = 30.0
+MIN_FUZZY_SIMILARITY = 0.3
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text):
+    """Kleinschreibung ohne Akzente, z.B. 'Société Générale' -> 'societe generale'"""
+    text = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in text if not unicodedata.combining(c)).casefold().strip()
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Match(NamedTuple):
+    symbol: str
+    name: str
+    score: float
+
+
+class SymbolIndex:
+    """
+    Suchindex für (symbol, name, sector, industry)-Zeilen.
+    search() liefert die besten k Treffer: exakte Symbole vor Symbol-Präfixen vor Namens-Präfixen
+    vor Wortanfängen im Namen vor Sektor/Branche vor unscharfen Treffern (Tippfehler in Symbol,
+    Name, Sektor oder Branche, verglichen je Feld und je Wort). Gleichstände werden alphabetisch
+    nach Symbol entschieden.
+    """
+
+    def __init__(self, rows):
+        rows = sorted({row[0]: row for row in rows if row[0]}.values())
+        self.symbols = [row[0] for row in rows]
+        self.names = [row[1] or "" for row in rows]
+        self._position = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+        entries = []
+        # Unscharfe Suche: jeder Text (ganzes Feld oder einzelnes Wort) kommt nur einmal in den
+        # Trigramm-Index; fuzzy_pairs ordnet ihn den Symbolen mit der jeweiligen Höchstpunktzahl zu
+        texts = {}
+        fuzzy_pairs = []
+
+        def add_fuzzy(text, i, score):
+            for key in {text, *_WORD_RE.findall(text)}:
+                if len(key) >= 2:
+                    fuzzy_pairs.append((texts.setdefault(key, len(texts)), i, score))
+
+        for i, (symbol, name, sector, industry) in enumerate(rows):
+            symbol_key, name_key = normalize(symbol), normalize(name)
+            entries.append((symbol_key, i, SCORE_SYMBOL_PREFIX))
+            add_fuzzy(symbol_key, i, SCORE_FUZZY)
+            if name_key:
+                entries.append((name_key, i, SCORE_NAME_PREFIX))
+                for word in _WORD_RE.findall(name_key)[1:]:
+                    entries.append((word, i, SCORE_WORD_PREFIX))
+                add_fuzzy(name_key, i, SCORE_FUZZY)
+            for text in (sector, industry):
+                if text:
+                    entries.append((normalize(text), i, SCORE_SECTOR_PREFIX))
+                    add_fuzzy(normalize(text), i, SCORE_FUZZY_SECTOR)
+
+        entries.sort()
+        self._keys = [key for key, _, _ in entries]
+        self._ids = np.array([i for _, i, _ in entries], dtype=np.int64)
+        self._ranks = np.array([rank for _, _, rank in entries], dtype="float64")
+
+        grams = {}
+        gram_counts = np.zeros(len(texts))
+        for text, t in texts.items():
+            own_grams = trigrams(text)
+            gram_counts[t] = len(own_grams)
+            for gram in own_grams:
+                grams.setdefault(gram, []).append(t)
+        self._grams = {gram: np.array(ids, dtype=np.int64) for gram, ids in grams.items()}
+        self._gram_counts = gram_counts
+        # Paare (Text, Symbol, Punkte) nach Text sortiert; _text_start[t]:_text_start[t + 1] sind die Paare von t
+        fuzzy_pairs.sort()
+        pair_texts = np.array([t for t, _, _ in fuzzy_pairs], dtype=np.int64)
+        self._pair_ids = np.array([i for _, i, _ in fuzzy_pairs], dtype=np.int64)
+        self._pair_scores = np.array([score for _, _, score in fuzzy_pairs], dtype="float64")
+        self._text_start = np.searchsorted(pair_texts, np.arange(len(texts) + 1))
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def label(self, symbol):
+        """Anzeigetext 'SYMBOL – Name' für Auswahllisten"""
+        i = self._position.get(symbol)
+        if i is None or not self.names[i]:
+            return symbol
+        return f"{symbol} – {self.names[i]}"
+
+    def name(self, symbol):
+        """Firmenname eines Symbols, sonst das Symbol selbst"""
+        i = self._position.get(symbol)
+        return self.names[i] if i is not None and self.names[i] else symbol
+
+    @staticmethod
+    def symbol_for(label):
+        """Symbol zu einem Anzeigetext aus label()"""
+        return label.split(" – ", 1)[0].strip().upper() if label else ""
+
+    def labels(self, limit=None):
+        """Anzeigetexte aller (bzw. der ersten limit) Symbole, alphabetisch"""
+        return [self.label(s) for s in self.symbols[:limit]]
+
+    def search(self, query, k=20):
+        """Die besten k Treffer für query (Präfix- und unscharfe Suche)"""
+        q = normalize(query)
+        if not q or not self.symbols:
+            return []
+        scores = np.zeros(len(self.symbols))
+
+        # Präfixe: alle Schlüssel im Bereich [q, q + höchstes Zeichen)
+        lo = bisect.bisect_left(self._keys, q)
+        hi = bisect.bisect_left(self._keys, q + "\uffff", lo)
+        if hi > lo:
+            np.maximum.at(scores, self._ids[lo:hi], self._ranks[lo:hi])
+        exact = self._position.get(query.strip().upper())
+        if exact is not None:
+            scores[exact] = SCORE_EXACT_SYMBOL
+
+        # Unscharf: Anteil gemeinsamer Trigramme (Dice-Koeffizient) je Feld bzw. Wort, das beste zählt
+        if len(q) >= 3:
+            query_grams = trigrams(q)
+            postings = [self._grams[g] for g in query_grams if g in self._grams]
+            if postings:
+                shared = np.bincount(np.concatenate(postings), minlength=len(self._gram_counts))
+                similarity = 2.0 * shared / (len(query_grams) + self._gram_counts)
+                hits = np.flatnonzero(similarity >= MIN_FUZZY_SIMILARITY)
+                if len(hits):
+                    # Alle Paare der getroffenen Texte: je Text der Bereich _text_start[t]:_text_start[t + 1]
+                    lengths = self._text_start[hits + 1] - self._text_start[hits]
+                    offsets = np.repeat(self._text_start[hits] - (np.cumsum(lengths) - lengths), lengths)
+                    pairs = offsets + np.arange(lengths.sum())
+                    fuzzy = np.repeat(similarity[hits], lengths) * self._pair_scores[pairs]
+                    np.maximum.at(scores, self._pair_ids[pairs], fuzzy)
+
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            # Alle Kandidaten mit mindestens der k-besten Punktzahl behalten, damit Gleichstände an der
+            # Grenze nicht zufällig, sondern nach Symbol entschieden werden
+            kth = np.partition(scores[candidates], len(candidates) - k)[len(candidates) - k]
+            candidates = candidates[scores[candidates] >= kth]
+        # Höhere Punktzahl zuerst, bei Gleichstand alphabetisch (Zeilen sind nach Symbol sortiert)
+        candidates = candidates[np.lexsort((candidates, -scores[candidates]))][:k]
+        return [Match(self.symbols[i], self.names[i], float(scores[i])) for i in candidates]
+
+
+def build_index(conn):
+    """Baut den Index aus der Tabelle stocks"""
+    cur = conn.cursor()
+    cur.execute("SELECT symbol, name, sector, industry FROM stocks;")
+    return SymbolIndex(cur.fetchall())
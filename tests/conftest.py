@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Module liegen im Projektverzeichnis (kein installiertes Paket)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
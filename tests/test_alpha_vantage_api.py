@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from alpha_vantage_test.alpha_vantage_api import combine_intraday, intraday_requests, parse_intraday
+
+
+def _payload(start, bars, step=timedelta(hours=1)):
+    series = {
+        (start + i * step).strftime("%Y-%m-%d %H:%M:%S"): {
+            "1. open": f"{100 + i}.0", "2. high": "101.0", "3. low": "99.0", "4. close": "100.5", "5. volume": "1000"
+        }
+        for i in range(bars)
+    }
+    return {"Meta Data": {"6. Time Zone": "US/Eastern"}, "Time Series (60min)": series}
+
+
+def test_parse_intraday_matches_from_dict():
+    data = _payload(datetime(2024, 3, 8, 10), 72)
+    df = parse_intraday(data)
+
+    frame = pd.DataFrame.from_dict(data["Time Series (60min)"], orient="index").astype("float64")
+    index = pd.to_datetime(frame.index).tz_localize("US/Eastern", ambiguous="NaT", nonexistent="NaT")
+    frame.index = index.tz_convert("UTC")
+    frame = frame[frame.index.notna()].sort_index()
+
+    # 2024-03-10 02:00 gibt es in New York nicht (Sommerzeit), der Bar wird verworfen
+    assert len(df) == 71
+    assert str(df.index.tz) == "UTC" and df.index.is_monotonic_increasing
+    np.testing.assert_array_equal(df.to_numpy(), frame.to_numpy())
+    assert (df.index == frame.index).all()
+
+
+def test_intraday_requests_cover_the_gap():
+    now = pd.Timestamp("2024-06-14 20:00", tz="UTC")
+    assert intraday_requests(None, "60min", now) == [("full", None)]
+    assert intraday_requests(now - timedelta(hours=50), "60min", now) == [("compact", None)]
+    # Länger als 100 Bars: compact würde eine Lücke lassen
+    assert intraday_requests(now - timedelta(hours=101), "60min", now) == [("full", None)]
+    assert intraday_requests(now - timedelta(hours=3), "1min", now) == [("full", None)]
+    assert intraday_requests(datetime(2024, 3, 28, 15), "60min", now) == [
+        ("full", "2024-03"), ("full", "2024-04"), ("full", "2024-05"), ("full", "2024-06")]
+
+
+def test_combine_intraday_prefers_latest_fetch():
+    first = parse_intraday(_payload(datetime(2024, 5, 1, 10), 5))
+    second = parse_intraday(_payload(datetime(2024, 5, 1, 13), 5))
+    df = combine_intraday([first, second])
+    assert len(df) == 8 and df.index.is_monotonic_increasing
+    assert df["Open"].iloc[3] == 100.0
@@ -0,0 +1,165 @@
+# Der asynchrone Alpha-Vantage-Provider gegen einen lokalen HTTP-Stub-Server, der
+# TIME_SERIES_INTRADAY-Antworten mit fester Latenz liefert: alle Symbole kommen an, Verbindungen
+# werden wiederverwendet (Keep-Alive), das Limit je Host wird eingehalten, gedrosselte Anfragen
+# (HTTP 429) werden wiederholt und zu langsame Anfragen nach dem Timeout abgebrochen.
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from alpha_vantage_test.alpha_vantage_async import AlphaVantageProvider
+from data_provider import fetch_many
+
+SYMBOLS = [f"SYM{i}" for i in range(60)]
+
+
+def intraday_payload(symbol, bars=100):
+    start = datetime(2024, 3, 1, 10, 0)
+    series = {
+        (start + timedelta(hours=i)).strftime("%Y-%m-%d %H:%M:%S"): {
+            "1. open": "100.0", "2. high": "101.0", "3. low": "99.0", "4. close": "100.5", "5. volume": "1000"
+        }
+        for i in range(bars)
+    }
+    return {"Meta Data": {"2. Symbol": symbol, "6. Time Zone": "US/Eastern"}, "Time Series (60min)": series}
+
+
+class _Server(ThreadingHTTPServer):
+    # Großer Listen-Backlog, sonst warten gleichzeitige Verbindungsaufbauten auf SYN-Wiederholungen
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class StubServer:
+    """
+    Alpha-Vantage-Stub auf localhost. Jede Antwort dauert latency Sekunden, Symbole mit Präfix SLOW
+    slow_latency; jede throttle_every-te Anfrage wird mit HTTP 429 abgelehnt (0 = nie).
+    Zählt Verbindungen, Anfragen und die höchste Zahl gleichzeitig bearbeiteter Anfragen.
+    """
+
+    def __init__(self, latency=0.01, slow_latency=2.0, throttle_every=0):
+        self.latency = latency
+        self.slow_latency = slow_latency
+        self.throttle_every = throttle_every
+        self.connections = 0
+        self.requests = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_port}/query"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # HTTP/1.1: Verbindung bleibt nach der Antwort offen
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def do_GET(self):
+                symbol = parse_qs(urlparse(self.path).query)["symbol"][0]
+                with stub._lock:
+                    stub.requests += 1
+                    stub.active += 1
+                    stub.max_active = max(stub.max_active, stub.active)
+                    throttled = stub.throttle_every and stub.requests % stub.throttle_every == 0
+                try:
+                    time.sleep(stub.slow_latency if symbol.startswith("SLOW") else stub.latency)
+                    status, body = (429, b"{}") if throttled else (200, json.dumps(intraday_payload(symbol)).encode())
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    if throttled:
+                        self.send_header("Retry-After", "0")
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # Client hat nach dem Timeout abgebrochen
+                    pass
+                finally:
+                    with stub._lock:
+                        stub.active -= 1
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def stub_server():
+    """Startet Stub-Server mit den übergebenen Einstellungen, beendet sie nach dem Test"""
+    servers = []
+
+    def start(**kwargs):
+        servers.append(StubServer(**kwargs))
+        return servers[-1]
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+def fetch(stub, symbols, **provider_kwargs):
+    provider = AlphaVantageProvider(base_url=stub.url, api_key="demo", limit=False, base_delay=0.05,
+                                    **provider_kwargs)
+
+    async def run():
+        async with provider:
+            return await fetch_many(provider.intraday, symbols)
+
+    start = time.perf_counter()
+    results, errors = asyncio.run(run())
+    return provider, results, errors, time.perf_counter() - start
+
+
+def test_keep_alive_reuses_connections_within_host_limit(stub_server):
+    stub = stub_server()
+    _, results, errors, _ = fetch(stub, SYMBOLS, concurrency=10, limit_per_host=5)
+
+    assert not errors and set(results) == set(SYMBOLS)
+    assert all(len(df) == 100 for df in results.values())
+    assert stub.requests == len(SYMBOLS)
+    assert stub.connections <= 5 and stub.max_active <= 5
+
+
+def test_throttled_requests_are_retried_on_the_same_connections(stub_server):
+    stub = stub_server(throttle_every=7)
+    provider, results, errors, _ = fetch(stub, SYMBOLS, concurrency=10, limit_per_host=5, max_retries=5)
+
+    assert not errors and set(results) == set(SYMBOLS)
+    assert provider.stats()["throttled"] > 0
+    assert stub.requests == len(SYMBOLS) + provider.stats()["retries"]
+    # Nach HTTP 429 geht die Verbindung zurück in den Pool statt geschlossen zu werden
+    assert stub.connections <= 5
+
+
+def test_slow_requests_are_cancelled_after_timeout(stub_server):
+    stub = stub_server(slow_latency=2.0)
+    symbols = SYMBOLS[:20] + ["SLOW1", "SLOW2"]
+    _, results, errors, elapsed = fetch(stub, symbols, concurrency=10, limit_per_host=10, timeout=0.5,
+                                        max_retries=0)
+
+    assert set(errors) == {"SLOW1", "SLOW2"}
+    assert all(isinstance(e, asyncio.TimeoutError) for e in errors.values())
+    assert len(results) == 20
+    assert elapsed < 2.0
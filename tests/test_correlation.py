@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from correlation import CorrelationCache, PairStats
+
+
+@pytest.fixture
+def returns():
+    rng = np.random.default_rng(7)
+    r = rng.normal(0, 0.01, size=(6, 120))
+    r[rng.random(r.shape) < 0.1] = np.nan
+    dates = list(pd.bdate_range("2024-01-01", periods=r.shape[1]).date)
+    return dates, r
+
+
+def _assert_same(stats, r):
+    expected = PairStats.from_returns(r)
+    np.testing.assert_allclose(stats.n, expected.n)
+    np.testing.assert_allclose(stats.corr(), expected.corr(), equal_nan=True)
+    np.testing.assert_allclose(stats.cov(), expected.cov(), equal_nan=True)
+
+
+def test_shifted_range_drops_the_day_that_left(returns):
+    dates, r = returns
+    symbols = [f"S{i}" for i in range(r.shape[0])]
+    cache = CorrelationCache()
+    cache.stats(symbols, dates[0:100], r[:, 0:100])
+
+    # Datumsbereich um einen Tag verschoben: d1..d100 statt d0..d99
+    stats = cache.stats(symbols, dates[1:101], r[:, 1:101])
+    _assert_same(stats, r[:, 1:101])
+
+
+def test_one_new_day_extends_range(returns):
+    dates, r = returns
+    symbols = [f"S{i}" for i in range(r.shape[0])]
+    cache = CorrelationCache()
+    cache.stats(symbols, dates[0:100], r[:, 0:100])
+    _assert_same(cache.stats(symbols, dates[0:101], r[:, 0:101]), r[:, 0:101])
+
+
+def test_window_moves_by_one_day(returns):
+    dates, r = returns
+    symbols = [f"S{i}" for i in range(r.shape[0])]
+    cache = CorrelationCache()
+    cache.stats(symbols, dates[:100], r[:, :100], window=60)
+    for end in range(101, 104):
+        _assert_same(cache.stats(symbols, dates[:end], r[:, :end], window=60), r[:, end - 60:end])
+
+
+def test_range_extended_backwards_is_recomputed(returns):
+    dates, r = returns
+    symbols = [f"S{i}" for i in range(r.shape[0])]
+    cache = CorrelationCache()
+    cache.stats(symbols, dates[10:100], r[:, 10:100])
+    _assert_same(cache.stats(symbols, dates[5:101], r[:, 5:101]), r[:, 5:101])
+
+
+@pytest.mark.parametrize("window", [None, 60])
+def test_revised_previous_day_is_recomputed(returns, window):
+    dates, r = returns
+    symbols = [f"S{i}" for i in range(r.shape[0])]
+    cache = CorrelationCache()
+    cache.stats(symbols, dates[:100], r[:, :100], window=window)
+
+    # Der zuletzt gespeicherte Tag wird neu geladen und ändert sich, dazu kommt ein neuer Tag
+    revised = r[:, :101].copy()
+    revised[:, 99] += 0.05
+    stats = cache.stats(symbols, dates[:101], revised, window=window)
+    _assert_same(stats, revised[:, -window:] if window else revised)
@@ -0,0 +1,19 @@
+import numpy as np
+import pandas as pd
+
+from downsampling import payload_metrics
+
+
+def test_payload_metrics_estimates_json_size():
+    dates = pd.date_range("2015-01-01", periods=20000, freq="D")
+    rng = np.random.default_rng(3)
+    raw = pd.DataFrame({"datum": dates, "price": 100 + rng.random(len(dates)) * 50,
+                        "sma_20": 100 + rng.random(len(dates)) * 50})
+    reduced = raw.iloc[::20]
+
+    metrics = payload_metrics(raw, reduced)
+    actual = len(raw.to_json(orient="values", date_format="iso"))
+    assert metrics["points_before"] == 20000 and metrics["points_after"] == 1000
+    assert abs(metrics["bytes_before"] - actual) / actual < 0.05
+    assert 0.94 < metrics["reduction"] < 0.96
+    assert payload_metrics(raw.iloc[:0], raw.iloc[:0])["reduction"] == 0.0
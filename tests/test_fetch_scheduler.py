@@ -0,0 +1,94 @@
+import threading
+
+import pytest
+
+from alpha_vantage_test.alpha_vantage_api import check_payload
+from fetch_scheduler import FetchScheduler, RateLimitError, SchedulerShutdown
+
+
+def test_highest_priority_across_providers_first():
+    scheduler = FetchScheduler(limits={"a": (1000.0, 100), "b": (1000.0, 100)}, workers=1)
+    started = threading.Event()
+    release = threading.Event()
+    order = []
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    scheduler.submit("a", block, priority=0)
+    started.wait(5)
+    # Solange der einzige Worker blockiert ist, sammeln sich Aufträge beider Anbieter an
+    futures = [scheduler.submit("a", order.append, "a-bulk", priority=10),
+               scheduler.submit("b", order.append, "b-bulk", priority=10),
+               scheduler.submit("b", order.append, "b-interactive", priority=0),
+               scheduler.submit("a", order.append, "a-interactive", priority=0)]
+    release.set()
+    for future in futures:
+        future.result(5)
+    scheduler.shutdown()
+    assert order == ["b-interactive", "a-interactive", "a-bulk", "b-bulk"]
+
+
+def test_throttled_provider_pauses_and_keeps_priority():
+    scheduler = FetchScheduler(limits={"a": (1000.0, 100)}, workers=1, base_delay=0.05, rng=lambda: 1.0)
+    order = []
+    throttled = []
+
+    def fetch(name):
+        if not throttled:
+            throttled.append(name)
+            raise RateLimitError("Too Many Requests")
+        order.append(name)
+
+    first = scheduler.submit("a", fetch, "bulk-1", priority=10)
+    futures = [scheduler.submit("a", fetch, "bulk-2", priority=10),
+               scheduler.submit("a", fetch, "interactive", priority=0)]
+    for future in [first, *futures]:
+        future.result(5)
+    scheduler.shutdown()
+    # Nach der Pause läuft zuerst die interaktive Anfrage, dann der Backfill in Reihenfolge
+    assert order[0] == "interactive"
+    assert order[1:] == ["bulk-1", "bulk-2"] or order[1:] == ["bulk-2", "bulk-1"]
+    assert scheduler.stats()["a"]["throttled"] == 1
+
+
+def test_shutdown_fails_pending_futures():
+    scheduler = FetchScheduler(limits={"a": (0.001, 1)}, workers=1, base_delay=60.0, rng=lambda: 1.0,
+                               retryable=lambda exc: isinstance(exc, ConnectionError))
+
+    def flaky():
+        raise ConnectionError("connection reset")
+
+    retried = scheduler.submit("a", flaky)
+    # Das einzige Token ist verbraucht, der zweite Auftrag bleibt in der Warteschlange
+    queued = scheduler.submit("a", lambda: "nie")
+    while not scheduler.stats()["a"]["retries"]:
+        threading.Event().wait(0.01)
+    scheduler.shutdown()
+
+    for future in (retried, queued):
+        with pytest.raises(SchedulerShutdown):
+            future.result(1)
+    with pytest.raises(SchedulerShutdown):
+        scheduler.submit("a", lambda: "nie").result(1)
+
+
+@pytest.mark.parametrize("message", [
+    "Thank you for using Alpha Vantage! Our standard API call frequency is 5 calls per minute and 500 calls per day.",
+    "We have detected your API key as DEMO and our standard API rate limit is 25 requests per day.",
+])
+def test_alpha_vantage_throttling_is_rate_limit(message):
+    with pytest.raises(RateLimitError):
+        check_payload({"Information": message})
+
+
+@pytest.mark.parametrize("message", [
+    "the parameter apikey is invalid or missing. Please claim your free API key on "
+    "(https://www.alphavantage.co/support/#api-key).",
+    "Thank you for using Alpha Vantage! This is a premium endpoint. You may subscribe to any of the premium plans.",
+])
+def test_alpha_vantage_information_is_not_retried(message):
+    with pytest.raises(Exception) as info:
+        check_payload({"Information": message})
+    assert not isinstance(info.value, RateLimitError)
@@ -0,0 +1,97 @@
+# Vergleich der Indikatoren mit pandas bei Lücken mitten in der Kursreihe (inkl. Anlaufphase).
+# Gleitende Fenster (SMA, Standardabweichung, Bollinger, Volatilität) sind wie pandas rolling NaN,
+# solange ein Tag im Fenster fehlt.
+# indicators.ewm überspringt fehlende Tage (entspricht pandas ewm(adjust=False, ignore_na=True)):
+# eine Lücke ist ein Tag ohne Handel, nicht ein Tag, an dem das Gewicht alter Werte weiter abnimmt.
+import numpy as np
+import pandas as pd
+import pytest
+
+import indicators
+
+
+@pytest.fixture
+def gapped():
+    rng = np.random.default_rng(1)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (3, 300)), axis=1))
+    high = close * (1 + rng.random(close.shape) * 0.02)
+    low = close * (1 - rng.random(close.shape) * 0.02)
+    # Führende Lücke, einzelne fehlende Tage und ein längerer Ausfall mitten in der Reihe
+    for x in (close, high, low):
+        x[0, :30] = np.nan
+        x[1, [50, 51, 120, 200]] = np.nan
+        x[2, 100:140] = np.nan
+    return close, high, low
+
+
+def _ewm(series, **kwargs):
+    return series.ewm(adjust=False, ignore_na=True, **kwargs).mean().to_numpy()
+
+
+def test_ema_skips_gaps(gapped):
+    close, _, _ = gapped
+    result = indicators.ema(close, 12)
+    for n in range(close.shape[0]):
+        np.testing.assert_allclose(result[n], _ewm(pd.Series(close[n]), span=12), rtol=1e-10, equal_nan=True)
+
+
+def test_ema_differs_from_decaying_gaps(gapped):
+    # Dokumentiert die Abweichung zu pandas' Standard (ignore_na=False) nach einer Lücke
+    close, _, _ = gapped
+    expected = pd.Series(close[2]).ewm(span=12, adjust=False).mean().to_numpy()
+    assert not np.allclose(indicators.ema(close, 12)[2, 140:], expected[140:])
+
+
+def test_rsi_macd_atr_with_gaps(gapped):
+    close, high, low = gapped
+    rsi = indicators.rsi(close, 14)
+    line, signal, _ = indicators.macd(close)
+    atr = indicators.atr(high, low, close, 14)
+    for n in range(close.shape[0]):
+        c, h, l = pd.Series(close[n]), pd.Series(high[n]), pd.Series(low[n])
+        delta = c.diff()
+        avg_gain = _ewm(delta.clip(lower=0), alpha=1 / 14, min_periods=14)
+        avg_loss = _ewm((-delta).clip(lower=0), alpha=1 / 14, min_periods=14)
+        macd_line = _ewm(c, span=12) - _ewm(c, span=26)
+        # Nach einer Lücke fehlt der Vortagesschluss: True Range = Hoch - Tief
+        true_range = pd.concat([h - l, (h - c.shift()).abs(), (l - c.shift()).abs()], axis=1).max(axis=1)
+
+        np.testing.assert_allclose(rsi[n], 100 - 100 / (1 + avg_gain / avg_loss), rtol=1e-9, equal_nan=True)
+        np.testing.assert_allclose(line[n], macd_line, rtol=1e-9, atol=1e-12, equal_nan=True)
+        np.testing.assert_allclose(signal[n], _ewm(pd.Series(macd_line), span=9), rtol=1e-9, atol=1e-12,
+                                   equal_nan=True)
+        np.testing.assert_allclose(atr[n], _ewm(true_range, alpha=1 / 14, min_periods=14), rtol=1e-9,
+                                   equal_nan=True)
+
+
+@pytest.mark.parametrize("window", [5, 20, 50])
+def test_sma_and_rolling_std_with_gaps(gapped, window):
+    close, _, _ = gapped
+    mean = indicators.sma(close, window)
+    std = indicators.rolling_std(close, window)
+    population_std = indicators.rolling_std(close, window, ddof=0)
+    for n in range(close.shape[0]):
+        c = pd.Series(close[n])
+        # pandas: NaN in der Anlaufphase und solange eine Lücke im Fenster liegt
+        np.testing.assert_allclose(mean[n], c.rolling(window).mean(), rtol=1e-10, equal_nan=True)
+        np.testing.assert_allclose(std[n], c.rolling(window).std(), rtol=1e-7, equal_nan=True)
+        np.testing.assert_allclose(population_std[n], c.rolling(window).std(ddof=0), rtol=1e-7, equal_nan=True)
+    assert np.isnan(mean[:, :window - 1]).all() and np.isnan(std[:, :window - 1]).all()
+    # Der 40-Tage-Ausfall von Zeile 2 macht alle Fenster über der Lücke ungültig
+    assert np.isnan(mean[2, 100:140 + window - 1]).all()
+
+
+def test_bollinger_and_volatility_with_gaps(gapped):
+    close, _, _ = gapped
+    mid, upper, lower = indicators.bollinger(close, 20)
+    volatility = indicators.rolling_volatility(close, 20)
+    for n in range(close.shape[0]):
+        c = pd.Series(close[n])
+        rolling_mean, rolling_std = c.rolling(20).mean(), c.rolling(20).std(ddof=0)
+        np.testing.assert_allclose(mid[n], rolling_mean, rtol=1e-10, equal_nan=True)
+        np.testing.assert_allclose(upper[n], rolling_mean + 2 * rolling_std, rtol=1e-9, equal_nan=True)
+        np.testing.assert_allclose(lower[n], rolling_mean - 2 * rolling_std, rtol=1e-9, equal_nan=True)
+        np.testing.assert_allclose(volatility[n], np.log(c).diff().rolling(20).std() * np.sqrt(252), rtol=1e-7,
+                                   equal_nan=True)
+    # Erste Rendite erst am zweiten Tag: 20 Renditen brauchen 21 Kurse
+    assert np.isnan(volatility[1, :20]).all() and not np.isnan(volatility[1, 20])
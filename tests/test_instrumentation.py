@@ -0,0 +1,75 @@
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import instrumentation
+from instrumentation import Metrics
+
+
+@pytest.fixture(autouse=True)
+def no_cache_stats(monkeypatch):
+    monkeypatch.setattr(instrumentation, "cache_stats", lambda: {})
+
+
+def test_concurrent_runs_report_only_their_own_values():
+    metrics = Metrics()
+    both_running = threading.Barrier(2)
+    reports = {}
+
+    def run(name, amount):
+        with metrics.run(name) as report:
+            both_running.wait(5)
+            for _ in range(amount):
+                with metrics.stage(f"stage_{name}"):
+                    metrics.count("rows", 10)
+            both_running.wait(5)
+        reports[name] = report
+
+    threads = [threading.Thread(target=run, args=("a", 3)), threading.Thread(target=run, args=("b", 5))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert set(reports["a"]["stages"]) == {"stage_a"} and reports["a"]["stages"]["stage_a"]["calls"] == 3
+    assert set(reports["b"]["stages"]) == {"stage_b"} and reports["b"]["stages"]["stage_b"]["calls"] == 5
+    assert reports["a"]["counters"] == {"rows": 30} and reports["b"]["counters"] == {"rows": 50}
+    # Prozessweit (Prometheus) laufen beide auf
+    assert metrics.snapshot()["counters"] == {"rows": 80}
+
+
+def test_worker_threads_count_into_the_run_when_given_its_context():
+    metrics = Metrics()
+    with metrics.run("batch") as report:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            for _ in range(8):
+                executor.submit(contextvars.copy_context().run, metrics.count, "symbols_ok")
+            # Ohne Kontext gehört der Zähler zu keinem Lauf
+            executor.submit(metrics.count, "unrelated")
+    assert report["counters"] == {"symbols_ok": 8}
+    assert metrics.snapshot()["counters"] == {"symbols_ok": 8, "unrelated": 1}
+
+
+def test_nested_run_counts_in_outer_run():
+    metrics = Metrics()
+    with metrics.run("outer") as outer:
+        metrics.count("a")
+        with metrics.run("inner") as inner:
+            metrics.count("b")
+    assert inner["counters"] == {"b": 1}
+    assert outer["counters"] == {"a": 1, "b": 1}
+
+
+def test_failing_cache_stats_does_not_fail_the_run(monkeypatch):
+    def broken():
+        raise RuntimeError("pool kaputt")
+
+    monkeypatch.setattr(instrumentation, "cache_stats", broken)
+    metrics = Metrics()
+    seen = []
+    metrics.add_hook(seen.append)
+    with metrics.run("run") as report:
+        metrics.count("x")
+    assert report["ok"] and report["caches"] == {} and seen == [report]
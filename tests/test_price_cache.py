@@ -0,0 +1,36 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from price_cache import PriceCache
+
+
+def _prices(start, end):
+    index = pd.bdate_range(start, end)
+    values = np.linspace(100, 110, len(index))
+    return pd.DataFrame({"Open": values, "High": values, "Low": values, "Close": values,
+                         "Volume": np.full(len(index), 1000.0)}, index=index)
+
+
+def test_evicted_middle_year_is_not_covered(tmp_path):
+    cache = PriceCache(root=str(tmp_path))
+    cache.write("AAA", _prices("2021-01-01", "2023-12-29"))
+    assert cache.covers("AAA", "2021-01-04", "2023-12-29")
+
+    os.remove(os.path.join(tmp_path, "AAA", "2022.parquet"))
+    assert not cache.covers("AAA", "2021-01-04", "2023-12-29")
+    # Der lückenlose Teil ab 2023 bleibt nutzbar
+    assert cache.covers("AAA", "2023-01-02", "2023-12-29")
+
+
+def test_size_is_tracked_and_evicts_over_limit(tmp_path):
+    cache = PriceCache(root=str(tmp_path))
+    cache.write("AAA", _prices("2022-01-01", "2022-12-30"))
+    cache.write("BBB", _prices("2022-01-01", "2022-12-30"))
+    assert cache._size == cache.size()
+
+    cache.max_bytes = cache.size() + 1
+    cache.write("CCC", _prices("2022-01-01", "2022-12-30"))
+    assert cache.size() <= cache.max_bytes
+    assert cache._size == cache.size()
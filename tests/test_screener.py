@@ -0,0 +1,33 @@
+import pytest
+
+from screener import Filter, parse_filters
+
+
+def test_parse_filters_splits_on_comma_and_conjunctions():
+    assert parse_filters("kgv < 15, dividendenrendite > 3% und momentum_dezil = 10 AND beta <= 1.2") == [
+        Filter("kgv", "<", 15.0), Filter("dividendenrendite", ">", 3.0),
+        Filter("momentum_dezil", "=", 10.0), Filter("beta", "<=", 1.2)]
+
+
+def test_parse_filters_keeps_conjunctions_inside_values():
+    assert parse_filters("sektor = Oil and Gas and kgv < 15") == [
+        Filter("sektor", "=", "Oil and Gas"), Filter("kgv", "<", 15.0)]
+    assert parse_filters("branche = Forschung und Entwicklung") == [
+        Filter("branche", "=", "Forschung und Entwicklung")]
+    assert parse_filters("name = Apple, Inc., kgv > 10") == [Filter("name", "=", "Apple, Inc."), Filter("kgv", ">", 10.0)]
+
+
+def test_parse_filters_quoted_values():
+    assert parse_filters("name = 'Procter and Gamble, kgv < 3', beta > 1") == [
+        Filter("name", "=", "Procter and Gamble, kgv < 3"), Filter("beta", ">", 1.0)]
+    assert parse_filters('sektor != "Energy"') == [Filter("sektor", "!=", "Energy")]
+
+
+@pytest.mark.parametrize("text", ["kgv", "kgv < 15, beta", "foo > 1", "kgv < billig"])
+def test_parse_filters_rejects_invalid(text):
+    with pytest.raises(ValueError):
+        parse_filters(text)
+
+
+def test_parse_filters_empty():
+    assert parse_filters("") == [] and parse_filters(None) == [] and parse_filters("kgv < 15,") == [Filter("kgv", "<", 15.0)]
@@ -0,0 +1,48 @@
+import pytest
+
+from symbol_search import SCORE_EXACT_SYMBOL, SymbolIndex
+
+
+@pytest.fixture
+def index():
+    return SymbolIndex([
+        ("MSFT", "Microsoft Corporation", "Technology", "Software—Infrastructure"),
+        ("AAPL", "Apple Inc.", "Technology", "Consumer Electronics"),
+        ("AMZN", "Amazon.com, Inc.", "Consumer Cyclical", "Internet Retail"),
+        ("XOM", "Exxon Mobil Corporation", "Energy", "Oil & Gas Integrated"),
+        ("BNS", "Bank of Nova Scotia", "Financial Services", "Banks—Diversified"),
+        ("A", "Agilent Technologies, Inc.", "Healthcare", "Diagnostics & Research"),
+    ])
+
+
+def test_prefix_order(index):
+    matches = index.search("a")
+    # Exaktes Symbol vor Symbol-Präfix vor Namens-Präfix
+    assert [m.symbol for m in matches[:3]] == ["A", "AAPL", "AMZN"]
+    assert matches[0].score == SCORE_EXACT_SYMBOL
+    assert [m.symbol for m in index.search("micro")] == ["MSFT"]
+    # Wortanfang im Namen
+    assert index.search("mobil")[0].symbol == "XOM"
+
+
+@pytest.mark.parametrize("query, symbol", [
+    ("appel", "AAPL"),
+    ("microsfot", "MSFT"),
+    ("exon", "XOM"),
+])
+def test_typo_in_symbol_or_name(index, query, symbol):
+    assert index.search(query)[0].symbol == symbol
+
+
+def test_typo_in_sector_and_industry(index):
+    assert [m.symbol for m in index.search("tecnology")][:2] == ["AAPL", "MSFT"]
+    assert index.search("integratd")[0].symbol == "XOM"
+    assert index.search("diagnostiks")[0].symbol == "A"
+
+
+def test_ties_are_cut_alphabetically():
+    rows = [(f"C{i:03d}", f"Company {i}", None, None) for i in range(200)]
+    index = SymbolIndex(list(reversed(rows)))
+    for query in ("comp", "c", "compnay"):
+        matches = index.search(query, k=5)
+        assert [m.symbol for m in matches] == ["C000", "C001", "C002", "C003", "C004"]